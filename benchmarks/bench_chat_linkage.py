@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Chat -> intervention linkage: per-message frame scan vs. one sorted pass.
+
+For members with 1, 5 and 10 years of history (simulate_daily's NumPy engine,
+triggers from rule_engine), draws ~5 member messages per week and links each
+to an intervention within +/-1 day, once with the old find_linked_intervention
+(two pd.to_datetime calls and a filter of the whole frame per message) and
+once with generate_chats.link_interventions. Links are checked for equality
+and the per-member time is extrapolated to a cohort. Run from the repo root:
+
+    python benchmarks/bench_chat_linkage.py --years 1 5 10 --cohort 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "scripts"))
+sys.path.append(os.path.join(ROOT, "benchmarks"))
+
+from bench_rule_engine import member_data
+from generate_chats import link_interventions
+from rule_engine import evaluate_triggers
+
+def legacy_link(interventions_df, msg_dt):
+    """find_linked_intervention as generate_chats.py had it, called once per message."""
+    if interventions_df is None or interventions_df.empty:
+        return ""
+    msg_date = pd.Timestamp(msg_dt)
+    candidates = interventions_df[
+        (pd.to_datetime(interventions_df["date"]).dt.date >= (msg_date - pd.Timedelta(days=1)).date()) &
+        (pd.to_datetime(interventions_df["date"]).dt.date <= (msg_date + pd.Timedelta(days=1)).date())
+    ]
+    if not candidates.empty:
+        return str(candidates.iloc[0].get("rule_id", ""))
+    return ""
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--years", type=int, nargs="+", default=[1, 5, 10])
+    ap.add_argument("--cohort", type=int, default=1000, help="members to extrapolate to")
+    args = ap.parse_args()
+
+    with open(os.path.join(ROOT, "config", "profile.yaml")) as f:
+        base_prof = yaml.safe_load(f)
+    with open(os.path.join(ROOT, "config", "rules.yaml")) as f:
+        rules = yaml.safe_load(f)
+
+    print(f"{'years':>5} {'interventions':>13} {'messages':>8} {'legacy s':>9} {'sorted ms':>10} "
+          f"{'speedup':>8} {'cohort legacy':>14} {'identical':>10}")
+    for years in args.years:
+        rng = np.random.default_rng(years)
+        prof, daily, labs, events = member_data(base_prof, rules, 0, years * 12, rng)
+        interventions = evaluate_triggers(rules["triggers"], daily.drop(columns="member_id"),
+                                          labs=labs.drop(columns="member_id"),
+                                          events=events.drop(columns="member_id"),
+                                          baselines=prof["baselines"])
+        interventions["date"] = pd.to_datetime(interventions["date"])
+        days = pd.to_datetime(daily["date"])
+        msg_days = days.sample(n=len(days) * 5 // 7, replace=True, random_state=years).dt.date.tolist()
+
+        t0 = time.perf_counter()
+        old = [legacy_link(interventions, d) for d in msg_days]
+        t_old = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        new = link_interventions(interventions, msg_days)
+        t_new = time.perf_counter() - t0
+        print(f"{years:>5} {len(interventions):>13} {len(msg_days):>8} {t_old:>9.2f} {t_new * 1e3:>10.1f} "
+              f"{t_old / t_new:>7.0f}x {t_old * args.cohort / 3600:>12.1f} h {str(old == new):>10}")
+
+if __name__ == "__main__":
+    main()
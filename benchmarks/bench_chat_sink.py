@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Chat-log writes: per-flush open/append vs. ChatSink, per format.
+
+Writes --rows chat rows (sim.py's timestamp/sender/message) and times
+  append    CSVUpdater's old pattern: open the CSV, append, close, every --every rows
+  durable   the same with an fsync per append (what crash safety costs that way)
+  sink      ChatSink in csv/ndjson/parquet, fsync on every checkpoint
+then times read_new picking up only the last 10% of rows after a checkpoint.
+Run from the repo root:
+
+    python benchmarks/bench_chat_sink.py --rows 100000 --every 20
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from rag.simulation.chat_sink import ChatSink, read_new
+
+FIELDS = ["timestamp", "sender", "message"]
+
+def chat_rows(n):
+    t0 = datetime(2025, 1, 1, 8)
+    return [{"timestamp": t0 + timedelta(minutes=37 * i), "sender": "Ruby" if i % 2 else "Rohan",
+             "message": f"Message {i}: how did my HRV look after the deload week?"} for i in range(n)]
+
+def legacy_append(path, rows, every, fsync):
+    with open(path, "w", newline="") as f:
+        csv.DictWriter(f, fieldnames=FIELDS).writeheader()
+    for i in range(0, len(rows), every):
+        with open(path, "a", newline="") as f:
+            csv.DictWriter(f, fieldnames=FIELDS).writerows(rows[i:i + every])
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+def sink_write(path, rows, every, flush_rows):
+    with ChatSink(path, FIELDS, flush_rows=flush_rows) as sink:
+        for i in range(0, len(rows), every):
+            sink.write_many(rows[i:i + every])
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1000.0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--every", type=int, default=20, help="rows handed over per call (a simulated day or so)")
+    ap.add_argument("--flush-rows", type=int, default=5000)
+    args = ap.parse_args()
+    rows = chat_rows(args.rows)
+    tail = rows[-args.rows // 10:]
+
+    print(f"{'writer':>14} {'write ms':>9} {'rows/s':>10} {'tail read ms':>13} {'tail rows':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, fsync in (("append", False), ("durable", True)):
+            ms = timed(lambda: legacy_append(os.path.join(tmp, f"{name}.csv"), rows, args.every, fsync))
+            print(f"{name:>14} {ms:>9.0f} {args.rows / ms * 1000:>10.0f} {'-':>13} {'-':>10}")
+        for fmt in ("csv", "ndjson", "parquet"):
+            path = os.path.join(tmp, f"sink.{fmt}")
+            ms = timed(lambda: sink_write(path, rows[:-len(tail)], args.every, args.flush_rows))
+            _, cursor = read_new(path)
+            with ChatSink(path, FIELDS, flush_rows=args.flush_rows, append=True) as sink:
+                sink.write_many(tail)
+            t0 = time.perf_counter()
+            new, _ = read_new(path, cursor)
+            read_ms = (time.perf_counter() - t0) * 1000.0
+            print(f"{'sink ' + fmt:>14} {ms:>9.0f} {(args.rows - len(tail)) / ms * 1000:>10.0f} "
+                  f"{read_ms:>13.1f} {len(new):>10}")
+
+if __name__ == "__main__":
+    main()
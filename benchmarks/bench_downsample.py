@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Chart payload of long daily series: full frames vs. rag.utils.downsample.
+
+Builds --years of synthetic daily RHR/HRV/sleep rows, melts them the way the
+health_ops pages do and, per method, times cutting each series to --width
+points and compares the size of the Vega-Lite spec Altair would send to the
+browser. Run from the repo root:
+
+    python benchmarks/bench_downsample.py --years 10 --width 1200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from rag.utils.downsample import downsample
+
+alt.data_transformers.disable_max_rows()
+
+def daily(years, seed=0):
+    rng = np.random.default_rng(seed)
+    n = 365 * years
+    return pd.DataFrame({
+        "date": pd.date_range("2015-01-01", periods=n, freq="D"),
+        "RHR": 58 + np.cumsum(rng.normal(0, 0.3, n)).clip(-8, 8) + rng.normal(0, 2, n),
+        "HRV": 55 + np.cumsum(rng.normal(0, 0.5, n)).clip(-15, 15) + rng.normal(0, 6, n),
+        "sleep_hours": rng.normal(7.2, 0.8, n),
+    })
+
+def spec_kb(frame):
+    chart = alt.Chart(frame).mark_line().encode(x="date:T", y="value:Q", color="metric:N")
+    return len(json.dumps(chart.to_dict(), default=str).encode("utf-8")) / 1024
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--years", type=int, default=10)
+    ap.add_argument("--width", type=int, default=1200)
+    args = ap.parse_args()
+    long = daily(args.years).melt(id_vars=["date"], var_name="metric", value_name="value")
+
+    print(f"{'method':>7} {'points':>8} {'ms':>7} {'spec KB':>8}")
+    print(f"{'full':>7} {len(long):>8} {'-':>7} {spec_kb(long):>8.0f}")
+    for method in ("lttb", "minmax"):
+        t0 = time.perf_counter()
+        small = downsample(long, "date", "value", args.width, by="metric", method=method)
+        ms = (time.perf_counter() - t0) * 1000.0
+        print(f"{method:>7} {len(small):>8} {ms:>7.1f} {spec_kb(small):>8.0f}")
+
+if __name__ == "__main__":
+    main()
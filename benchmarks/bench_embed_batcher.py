@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Throughput and tail latency of query embedding vs. concurrency.
+
+Compares one MODEL.encode per request (the old `embed([query])` path) with the
+shared EmbeddingBatcher. Run from the repo root:
+
+    python benchmarks/bench_embed_batcher.py --requests 512 --max-wait-ms 5
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.utils.text import MODEL, EmbeddingBatcher
+
+QUERIES = [
+    "What was my latest LDL?",
+    "How is my HRV trending this week?",
+    "Can we reschedule my MRI?",
+    "What should I eat before a workout?",
+    "Why was I told to deload?",
+    "How did travel affect my sleep?",
+    "Is my ApoB improving?",
+    "What's on my schedule tomorrow?",
+]
+
+def direct(text):
+    return MODEL.encode([text], convert_to_numpy=True)[0]
+
+def run(fn, concurrency, n_requests):
+    latencies = []
+
+    def one(i):
+        t0 = time.perf_counter()
+        fn(QUERIES[i % len(QUERIES)] + f" #{i}")
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(n_requests)))
+    wall = time.perf_counter() - t0
+    lat = np.array(latencies) * 1000.0
+    return n_requests / wall, np.percentile(lat, 50), np.percentile(lat, 95), np.percentile(lat, 99)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=512)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    ap.add_argument("--max-batch-size", type=int, default=32)
+    ap.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = ap.parse_args()
+
+    batcher = EmbeddingBatcher(MODEL, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    direct("warmup")
+    batcher.embed_one("warmup")
+
+    print(f"{'mode':<8} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for conc in args.concurrency:
+        for mode, fn in (("direct", direct), ("batched", batcher.embed_one)):
+            rps, p50, p95, p99 = run(fn, conc, args.requests)
+            print(f"{mode:<8} {conc:>5} {rps:>9.1f} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f}")
+    print("batcher stats:", batcher.stats())
+
+if __name__ == "__main__":
+    main()
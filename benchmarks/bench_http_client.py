@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Local /ask round trips: a new connection per call vs. the pooled http_client.
+
+Starts a small keep-alive HTTP/1.1 stub of POST /ask on localhost (or uses
+--url, e.g. a running `python -m rag.main`), then times --requests calls made
+  per-call   requests.post, as the simulators and CLI used to
+  pooled     rag.utils.http_client.post (keep-alive session)
+  async      http_client.apost over async_client(), --concurrency in flight
+and reports req/s. Run from the repo root:
+
+    python benchmarks/bench_http_client.py --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from rag.utils import http_client
+
+PAYLOAD = {"question": "How is my HRV trending?", "role": "Ruby", "since": "2025-01-01"}
+
+class AskStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections open between requests
+    disable_nagle_algorithm = True  # as uvicorn does; headers and body go out as separate writes
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"answer": "Your HRV is up 4% this week.", "role": "Ruby", "sources": []}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def rate(fn, n):
+    t0 = time.perf_counter()
+    fn(n)
+    return n / (time.perf_counter() - t0)
+
+def per_call(url, n):
+    for _ in range(n):
+        requests.post(url, json=PAYLOAD, timeout=30).raise_for_status()
+
+def pooled(url, n):
+    for _ in range(n):
+        http_client.post(url, json=PAYLOAD).raise_for_status()
+
+def pooled_async(url, n, concurrency):
+    async def run():
+        slots = asyncio.Semaphore(concurrency)
+        async with http_client.async_client(pool_size=concurrency) as client:
+            async def one():
+                async with slots:
+                    (await http_client.apost(client, url, json=PAYLOAD)).raise_for_status()
+            await asyncio.gather(*(one() for _ in range(n)))
+    asyncio.run(run())
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", help="existing /ask endpoint (default: local stub)")
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=8)
+    args = ap.parse_args()
+
+    url = args.url
+    if url is None:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), AskStub)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/ask"
+
+    pooled(url, 10)  # warm up the session
+    r_call = rate(lambda n: per_call(url, n), args.requests)
+    r_pool = rate(lambda n: pooled(url, n), args.requests)
+    r_async = rate(lambda n: pooled_async(url, n, args.concurrency), args.requests)
+    print(f"{'requests':>8} {'per-call req/s':>15} {'pooled req/s':>13} {'speedup':>8} "
+          f"{'async req/s':>12} {'concurrency':>12}")
+    print(f"{args.requests:>8} {r_call:>15.0f} {r_pool:>13.0f} {r_pool / r_call:>7.1f}x "
+          f"{r_async:>12.0f} {args.concurrency:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Monthly KPIs: the old multi-groupby/merge computation vs. compute_kpis now.
+
+Tiles the pipeline's daily.csv and chats.csv forward in time to 10, 50 and 100
+years (labs/fitness from data/ are reused as is) and times:
+  legacy  the old aggregation (per-group Python lambdas, four merges) on in-memory frames
+  engine  compute_kpis.monthly_kpis + trend_changes on the same frames
+  full    compute_kpis.main from disk (CSV), everything recomputed
+  close   compute_kpis.main(since=<last month>) after a run that lacked the last month,
+          from CSV and from Parquet (WRITE_PARQUET-style siblings)
+Outputs of legacy and engine, and of close vs. full, are checked for equality.
+Run from the repo root after scripts/run_all.py:
+
+    python benchmarks/bench_kpis.py --years 10 50 100
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "scripts"))
+sys.path.append(ROOT)
+
+import compute_kpis
+from rag.utils.io import write_parquet
+
+def legacy_kpis(daily, chats, labs, fitness):
+    """compute_kpis.main's aggregation before the single-pass engine."""
+    daily, chats, labs, fitness = daily.copy(), chats.copy(), labs.copy(), fitness.copy()
+    daily["month"] = daily["date"].dt.to_period("M").astype(str)
+    chats["month"] = pd.to_datetime(chats["datetime"]).dt.to_period("M").astype(str)
+    kpi = (daily.groupby("month")
+           .agg(adherence_avg=("adherence","mean"),
+                weight_change_kg=("weight_kg", lambda s: s.iloc[-1]-s.iloc[-2]),
+                sleep_avg=("sleep_hours","mean"),
+                stress_avg=("stress_score","mean"))
+           .reset_index())
+    sessions = (daily.assign(sesh=(daily["active_minutes"]>35).astype(int))
+                .groupby("month")["sesh"].sum().reset_index(name="sessions_total"))
+    consults = (chats.groupby("month")["sender"]
+                .agg(consults_attended=lambda s: (s!="member").sum(),
+                     consults_missed=lambda s: 0)
+                .reset_index())
+    labs["month"] = pd.to_datetime(labs["date"]).dt.to_period("M").astype(str)
+    ldl_m = labs[["month","ldl_mgdl"]].copy()
+    ldl_m = ldl_m.set_index("month").reindex(kpi["month"]).ffill().reset_index()
+    ldl_m["ldl_change_mgdl"] = ldl_m["ldl_mgdl"].diff().fillna(0)
+    fitness["month"] = pd.to_datetime(fitness["date"]).dt.to_period("M").astype(str)
+    vo2_m = fitness.groupby("month")["vo2max_est"].mean().reindex(kpi["month"]).ffill().reset_index()
+    vo2_m["vo2max_change"] = vo2_m["vo2max_est"].diff().fillna(0)
+    kpi["rationale_coverage_percent"] = 90
+    out = kpi.merge(sessions, on="month", how="left").merge(consults, on="month", how="left") \
+             .merge(ldl_m[["month","ldl_change_mgdl"]], on="month", how="left") \
+             .merge(vo2_m[["month","vo2max_change"]], on="month", how="left")
+    return compute_kpis.finish(out)
+
+def engine_kpis(daily, chats, labs, fitness):
+    key = compute_kpis.month_key
+    daily = daily.assign(month=key(daily["date"]))
+    chats = chats.assign(month=key(chats["datetime"]))
+    labs = labs.assign(month=key(labs["date"]))
+    fitness = fitness.assign(month=key(fitness["date"]))
+    monthly = compute_kpis.monthly_kpis(daily, chats)
+    out = monthly.merge(compute_kpis.trend_changes(labs, fitness, monthly["month"].tolist()), on="month")
+    return compute_kpis.finish(out)
+
+def tiled(df, col, years, fmt):
+    """Repeat df forward in time until it spans `years` (whole copies, shifted by the span)."""
+    t = pd.to_datetime(df[col])
+    span = (t.max() - t.min()).days + 1
+    copies = max(1, int(years * 365 // span))
+    parts = [df.assign(**{col: (t + pd.Timedelta(days=span * i)).dt.strftime(fmt)}) for i in range(copies)]
+    return pd.concat(parts, ignore_index=True)
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, (time.perf_counter() - t0) * 1000.0
+
+def quiet(fn):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default=os.path.join(ROOT, "data"))
+    ap.add_argument("--years", type=int, nargs="+", default=[10, 50, 100])
+    args = ap.parse_args()
+    warnings.simplefilter("ignore", UserWarning)  # to_period on offset-aware chat times
+
+    base_daily = pd.read_csv(os.path.join(args.data, "daily.csv"))
+    base_chats = pd.read_csv(os.path.join(args.data, "chats.csv"))
+    if "datetime" not in base_chats.columns:
+        sys.exit(f"{args.data}/chats.csv is not pipeline output; run scripts/run_all.py first")
+
+    print(f"{'years':>5} {'months':>6} {'daily':>7} {'chats':>7} {'legacy ms':>10} {'engine ms':>10} "
+          f"{'full ms':>8} {'close csv':>10} {'close pq':>9} {'identical':>10}")
+    for years in args.years:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("labs_quarterly.csv", "fitness.csv"):
+                shutil.copy(os.path.join(args.data, name), tmp)
+            daily = tiled(base_daily, "date", years, "%Y-%m-%d")
+            chats = tiled(base_chats, "datetime", years, "%Y-%m-%d %H:%M %z")
+            last = daily["date"].str[:7].max()
+            paths = {n: os.path.join(tmp, n) for n in ("daily.csv", "chats.csv")}
+
+            mem = (daily.assign(date=pd.to_datetime(daily["date"])), chats,
+                   pd.read_csv(os.path.join(tmp, "labs_quarterly.csv")), pd.read_csv(os.path.join(tmp, "fitness.csv")))
+            old, t_legacy = timed(lambda: legacy_kpis(*mem))
+            new, t_engine = timed(lambda: engine_kpis(*mem))
+
+            daily.to_csv(paths["daily.csv"], index=False)
+            chats.to_csv(paths["chats.csv"], index=False)
+            full, t_full = timed(lambda: quiet(lambda: compute_kpis.main(data=tmp)))
+
+            closes = []
+            for parquet in (False, True):
+                daily[daily["date"].str[:7] < last].to_csv(paths["daily.csv"], index=False)
+                chats[chats["datetime"].str[:7] < last].to_csv(paths["chats.csv"], index=False)
+                if parquet:
+                    for p in paths.values():
+                        write_parquet(pd.read_csv(p), p)
+                quiet(lambda: compute_kpis.main(data=tmp))
+                daily.to_csv(paths["daily.csv"], index=False)
+                chats.to_csv(paths["chats.csv"], index=False)
+                if parquet:
+                    for p in paths.values():
+                        write_parquet(pd.read_csv(p), p)
+                closed, t_close = timed(lambda: quiet(lambda: compute_kpis.main(data=tmp, since=last)))
+                closes.append((closed, t_close))
+
+            same = old.equals(new) and all(c.astype(str).equals(full.astype(str)) for c, _ in closes)
+            print(f"{years:>5} {len(full):>6} {len(daily):>7} {len(chats):>7} {t_legacy:>10.1f} {t_engine:>10.1f} "
+                  f"{t_full:>8.1f} {closes[0][1]:>10.1f} {closes[1][1]:>9.1f} {str(same):>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Latency cost and diversity gain of MMR reranking in retrieve().
+
+For each query, times plain top-k retrieval against MMR retrieval (k x fetch
+multiplier over-fetch + NumPy rerank), and the rerank step alone. It also
+reports the mean pairwise cosine similarity of the returned docs: lower
+means a more diverse context. Run from the repo root:
+
+    python benchmarks/bench_mmr.py --k 3 --repeats 50
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.scripts.retriever import retrieve, mmr_select, collection
+from rag.utils.text import embed, embed_query
+from rag.config.settings import MMR_FETCH_MULTIPLIER
+
+QUERIES = [
+    ("How has my HRV and sleep been lately?", "Advik"),
+    ("What did my last labs show?", "Dr. Warren"),
+    ("How is my fitness progressing?", "Rachel"),
+    ("Summarise my recent travel and interventions", "Ruby"),
+    ("How is adherence trending?", "Neel"),
+]
+
+def mean_pairwise_sim(texts):
+    if len(texts) < 2:
+        return 0.0
+    v = np.asarray(embed(texts), dtype=np.float32)
+    v /= np.linalg.norm(v, axis=1, keepdims=True)
+    sim = v @ v.T
+    iu = np.triu_indices(len(texts), 1)
+    return float(sim[iu].mean())
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        out = fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return out, float(np.median(samples))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--k", type=int, default=3)
+    ap.add_argument("--lambda", dest="lam", type=float, default=0.5)
+    ap.add_argument("--repeats", type=int, default=30)
+    args = ap.parse_args()
+
+    fetch_k = args.k * MMR_FETCH_MULTIPLIER
+    print(f"k={args.k} fetch_k={fetch_k} lambda={args.lam}")
+    print(f"{'role':<11} {'plain ms':>9} {'mmr ms':>8} {'rerank ms':>10} {'sim plain':>10} {'sim mmr':>8}")
+    for query, role in QUERIES:
+        plain, t_plain = timed(lambda: retrieve(query, role, k=args.k), args.repeats)
+        diverse, t_mmr = timed(lambda: retrieve(query, role, k=args.k, mmr=True, mmr_lambda=args.lam), args.repeats)
+
+        qv = embed_query(query)
+        raw = collection.query(query_embeddings=[qv], n_results=fetch_k, include=["embeddings"])
+        _, t_rerank = timed(lambda: mmr_select(qv, raw["embeddings"][0], args.k, args.lam), args.repeats)
+
+        print(f"{role:<11} {t_plain:>9.2f} {t_mmr:>8.2f} {t_rerank:>10.3f} "
+              f"{mean_pairwise_sim([d['text'] for d in plain]):>10.3f} "
+              f"{mean_pairwise_sim([d['text'] for d in diverse]):>8.3f}")
+        print(f"  plain: {[d['id'] for d in plain]}")
+        print(f"  mmr:   {[d['id'] for d in diverse]}")
+
+if __name__ == "__main__":
+    main()
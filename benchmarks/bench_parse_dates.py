@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Date parsing of a large chats file: pd.to_datetime(errors="coerce") vs. rag.utils.io.parse_dates.
+
+Writes a --rows chats CSV per timestamp style (the simulators' naive
+"%Y-%m-%d %H:%M", generate_chats.py's offset-aware "%Y-%m-%d %H:%M %z", a
+US-style 12-hour format and day-first dates), reads it back as health_ops
+does and times parsing the timestamp column both ways, checking the results
+are identical (values, dtype and time zone). Run from the repo root:
+
+    python benchmarks/bench_parse_dates.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from rag.utils.io import parse_dates
+
+STYLES = {
+    "sim": "%Y-%m-%d %H:%M",
+    "pipeline": "%Y-%m-%d %H:%M %z",
+    "us-12h": "%m/%d/%Y %I:%M %p",
+    "dmy-date": "%d/%m/%Y",
+}
+
+def chats(rows, fmt, seed=0):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2025-01-01 08:00", tz="Asia/Singapore")
+    t = (start + pd.to_timedelta(np.sort(rng.integers(0, 60 * 24 * 365 * 3, rows)), unit="min")).strftime(fmt)
+    return pd.DataFrame({"timestamp": t, "sender": rng.choice(["Ruby", "Rohan", "Dr. Warren"], rows),
+                         "message": "How did my HRV look after the deload week?"})
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    args = ap.parse_args()
+
+    print(f"{'style':>9} {'rows':>8} {'unique':>7} {'to_datetime s':>14} {'parse_dates s':>14} {'speedup':>8} {'identical':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for style, fmt in STYLES.items():
+            path = os.path.join(tmp, f"chats_{style}.csv")
+            chats(args.rows, fmt).to_csv(path, index=False)
+            col = pd.read_csv(path)["timestamp"]
+            old, t_old = timed(lambda: pd.to_datetime(col, errors="coerce"))
+            new, t_new = timed(lambda: parse_dates(col))
+            same = new.equals(old) and new.dtype == old.dtype
+            print(f"{style:>9} {len(col):>8} {col.nunique():>7} {t_old:>14.2f} {t_new:>14.2f} "
+                  f"{t_old / t_new:>7.1f}x {str(same):>10}")
+
+if __name__ == "__main__":
+    main()
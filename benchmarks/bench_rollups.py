@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Weekly fitness rollups and 84-day lab adherence windows: per-period filters vs. one pass.
+
+At 1x, 10x and 100x the default 8-month history (daily rows from
+simulate_daily's NumPy engine, labs every 12 weeks), times the aggregation
+simulate_fitness_bodycomp.py and simulate_labs.py used to do (a boolean filter
+of the whole daily frame per week / per quarterly date) against
+weekly_rollups and trailing_adherence, checks the aggregates are identical,
+and times both scripts end to end. Run from the repo root:
+
+    python benchmarks/bench_rollups.py --scales 1 10 100
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+import pandas as pd
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "scripts"))
+
+import simulate_fitness_bodycomp
+import simulate_labs
+from simulate_daily import date_span, simulate_vectorized
+
+def legacy_weekly(daily, start, end, adh_default):
+    daily = daily.assign(date=pd.to_datetime(daily["date"]).dt.date)
+    adh, cardio, strength = [], [], []
+    day = start
+    while day <= end:
+        week_df = daily[(daily["date"] >= day) & (daily["date"] <= day + timedelta(days=6))]
+        adh.append(float(week_df["adherence"].mean()) if len(week_df) > 0 else float(adh_default))
+        cardio.append(int((week_df["active_minutes"] > 35).sum()) if len(week_df) > 0 else 0)
+        strength.append(int((week_df["soreness"] > 3).sum()) if len(week_df) > 0 else 0)
+        day += timedelta(days=7)
+    return adh, cardio, strength
+
+def legacy_trailing(daily, qdates, adh_default):
+    daily = daily.assign(date=pd.to_datetime(daily["date"]).dt.date)
+    out = []
+    for qdate in qdates:
+        dfw = daily[(daily["date"] >= qdate - timedelta(days=84)) & (daily["date"] <= qdate)]
+        out.append(float(dfw["adherence"].mean()) if len(dfw) > 0 else float(adh_default))
+        daily[(daily["date"] >= (qdate - timedelta(days=14))) & (daily["date"] <= qdate)]  # unused recent_events filter
+    return out
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, (time.perf_counter() - t0) * 1000.0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    args = ap.parse_args()
+
+    with open(os.path.join(ROOT, "config", "profile.yaml")) as f:
+        base_prof = yaml.safe_load(f)
+    with open(os.path.join(ROOT, "config", "rules.yaml")) as f:
+        rules = yaml.safe_load(f)
+    adh_default = base_prof.get("adherence", {}).get("base", 0.5)
+
+    print(f"{'scale':>5} {'days':>6} {'weeks':>6} {'labs':>5} {'weekly old ms':>14} {'new ms':>7} "
+          f"{'labs old ms':>12} {'new ms':>7} {'identical':>10} {'fitness ms':>11} {'labs ms':>8}")
+    for scale in args.scales:
+        months = int(base_prof.get("months", 8)) * scale
+        prof = dict(base_prof, months=months, cadence=dict(
+            base_prof.get("cadence", {}), quarterly_labs_weeks=list(range(0, months * 5, 12))))
+        start, end = date_span(prof)
+        daily = simulate_vectorized(prof, rules, pd.DataFrame(columns=["date", "event_type", "intensity"]),
+                                    seed=int(prof.get("seed", 42)))
+        n_weeks = (end - start).days // 7 + 1
+        qdates = [start + timedelta(weeks=w) for w in prof["cadence"]["quarterly_labs_weeks"]
+                  if start + timedelta(weeks=w) <= end]
+
+        old_w, t_old_w = timed(lambda: legacy_weekly(daily, start, end, adh_default))
+        new_w, t_new_w = timed(lambda: simulate_fitness_bodycomp.weekly_rollups(daily, start, n_weeks, adh_default))
+        old_l, t_old_l = timed(lambda: legacy_trailing(daily, qdates, adh_default))
+        new_l, t_new_l = timed(lambda: simulate_labs.trailing_adherence(daily, qdates, 84, adh_default))
+        same = tuple(old_w) == tuple(new_w) and old_l == new_l
+
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            _, t_fit = timed(lambda: simulate_fitness_bodycomp.main(data=tmp, prof=prof, rules=rules, daily=daily))
+            _, t_labs = timed(lambda: simulate_labs.main(data=tmp, prof=prof, rules=rules, daily=daily))
+        print(f"{scale:>5} {len(daily):>6} {n_weeks:>6} {len(qdates):>5} {t_old_w:>14.1f} {t_new_w:>7.1f} "
+              f"{t_old_l:>12.1f} {t_new_l:>7.1f} {str(same):>10} {t_fit:>11.1f} {t_labs:>8.1f}")
+
+if __name__ == "__main__":
+    main()
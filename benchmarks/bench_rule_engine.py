@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Vectorized rule engine vs. the per-day loop it replaced, on a large cohort.
+
+Builds a synthetic cohort (default 1000 members x 10 years of daily rows from
+simulate_daily's NumPy engine, quarterly labs and week-long trips), evaluates
+every trigger in config/rules.yaml in one pass, and times the old
+`daily.iloc[i-6:i+1]` loop (CV-01 + LIP-02 only) on a few members,
+extrapolated to the whole cohort. The CV-01/LIP-02 rows of both are checked
+for equality on those members. Run from the repo root:
+
+    python benchmarks/bench_rule_engine.py --members 1000 --years 10
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "scripts"))
+
+from rule_engine import COLUMNS, compile_rules, evaluate_triggers
+from simulate_daily import date_span, simulate_vectorized
+
+def legacy_triggers(daily, labs, rhr_baseline):
+    """CV-01 and LIP-02 exactly as apply_triggers_interventions.py computed them before."""
+    daily = daily.assign(date=pd.to_datetime(daily["date"]).dt.date)
+    labs = labs.assign(date=pd.to_datetime(labs["date"]).dt.date)
+    rows = []
+    for i in range(6, len(daily)):
+        window = daily.iloc[i-6:i+1]
+        rhr7 = window["rhr_bpm"].mean()
+        hrv_now = window["hrv_ms"].iloc[-1]
+        hrv_prev_3d = window["hrv_ms"].iloc[-4:-1].mean()
+        hrv_drop = (hrv_prev_3d - hrv_now) / max(1e-6, hrv_prev_3d)
+        if rhr7 > rhr_baseline + 5 or hrv_drop > 0.15:
+            d = daily["date"].iloc[i]
+            rows.append([d.isoformat(), "CV-01", "rhr_7d_avg", round(rhr7, 1),
+                         "deload week; sleep hygiene; -20% intensity", "coach",
+                         (d + timedelta(days=7)).isoformat(), "Auto-trigger based on HR trend"])
+    for _, r in labs.iterrows():
+        if r["ldl_mgdl"] > 130:
+            d = r["date"]
+            rows.append([d.isoformat(), "LIP-02", "ldl_mgdl", round(r["ldl_mgdl"], 1),
+                         "tighten diet; +1 cardio; omega-3", "nutritionist",
+                         (d + timedelta(days=84)).isoformat(), "Triggered by LDL at quarterly"])
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+def member_data(base_prof, rules, i, months, rng):
+    prof = dict(base_prof, months=months, seed=int(rng.integers(2**31)),
+                baselines=dict(base_prof["baselines"], rhr_bpm=float(rng.normal(66, 4))))
+    start, end = date_span(prof)
+    days = pd.date_range(start, end, freq="D")
+    week = np.arange(len(days)) // 7
+    travel = (week % int(rng.choice([2, 3, 4])) == 0) & (week > 0)
+    events = pd.DataFrame({"date": days[travel].strftime("%Y-%m-%d"), "event_type": "travel",
+                           "intensity": rng.integers(1, 4, travel.sum())})
+    daily = simulate_vectorized(prof, rules, events, seed=prof["seed"])
+    qdates = days[::91]
+    labs = pd.DataFrame({"date": qdates.strftime("%Y-%m-%d"),
+                         "ldl_mgdl": np.round(rng.normal(132, 10, len(qdates)), 1),
+                         "fasting_glucose_mgdl": np.round(rng.normal(100, 4, len(qdates)), 1)})
+    mid = f"member_{i:06d}"
+    return (prof, daily.assign(member_id=mid), labs.assign(member_id=mid), events.assign(member_id=mid))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--members", type=int, default=1000)
+    ap.add_argument("--years", type=int, default=10)
+    ap.add_argument("--legacy-members", type=int, default=3, help="members timed with the old loop")
+    args = ap.parse_args()
+
+    with open(os.path.join(ROOT, "config", "profile.yaml")) as f:
+        base_prof = yaml.safe_load(f)
+    with open(os.path.join(ROOT, "config", "rules.yaml")) as f:
+        rules = yaml.safe_load(f)
+
+    t0 = time.perf_counter()
+    rng = np.random.default_rng(0)
+    parts = [member_data(base_prof, rules, i, args.years * 12, rng) for i in range(args.members)]
+    daily = pd.concat([p[1] for p in parts], ignore_index=True)
+    labs = pd.concat([p[2] for p in parts], ignore_index=True)
+    events = pd.concat([p[3] for p in parts], ignore_index=True)
+    baselines = pd.DataFrame({"rhr_bpm": [p[0]["baselines"]["rhr_bpm"] for p in parts]},
+                             index=[p[1]["member_id"].iloc[0] for p in parts])
+    print(f"cohort: {args.members} members, {len(daily)} daily rows, {len(labs)} lab rows "
+          f"(built in {time.perf_counter() - t0:.1f}s)")
+
+    compiled = compile_rules(rules["triggers"])
+    t0 = time.perf_counter()
+    fired = evaluate_triggers(compiled, daily, labs=labs, events=events, baselines=baselines)
+    t_engine = time.perf_counter() - t0
+    print(f"engine (all {len(compiled)} rules, all members): {t_engine:.2f}s, "
+          f"{len(daily) / t_engine:,.0f} rows/s, {len(fired)} interventions")
+    print("  " + ", ".join(f"{k}={v}" for k, v in fired["rule_id"].value_counts().sort_index().items()))
+
+    t_legacy, rows, same = 0.0, 0, True
+    for prof, d, l, e in parts[:args.legacy_members]:
+        d, l = d.drop(columns="member_id"), l.drop(columns="member_id")
+        t0 = time.perf_counter()
+        old = legacy_triggers(d, l, prof["baselines"]["rhr_bpm"])
+        t_legacy += time.perf_counter() - t0
+        rows += len(d)
+        new = evaluate_triggers(compiled, d, labs=l, events=e.drop(columns="member_id"),
+                                baselines=prof["baselines"])
+        new = new[new["rule_id"].isin(["CV-01", "LIP-02"])].reset_index(drop=True)
+        same &= old.astype(str).equals(new.astype(str))
+    est = t_legacy / rows * len(daily)
+    print(f"legacy loop (CV-01 + LIP-02): {rows / t_legacy:,.0f} rows/s on {args.legacy_members} members, "
+          f"~{est:.0f}s extrapolated to the cohort ({est / t_engine:.0f}x slower)")
+    print(f"CV-01/LIP-02 identical on those members: {same}")
+
+if __name__ == "__main__":
+    main()
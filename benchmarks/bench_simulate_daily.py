@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Rows/sec of the loop vs. NumPy daily simulator (scripts/simulate_daily.py).
+
+Both engines get the same synthetic event calendar (a travel week every
+other week, ~10% weekly illness) and write CSV to memory. Run from the repo
+root:
+
+    python benchmarks/bench_simulate_daily.py --months 8 120 1200
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "scripts"))
+
+from simulate_daily import COLUMNS, date_span, simulate_loop, simulate_vectorized
+
+def synthetic_events(prof, seed=0):
+    start, end = date_span(prof)
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(start, end, freq="D")
+    week = np.arange(len(days)) // 7
+    rows = []
+    travel = (week % 2 == 0) & (week > 0)
+    rows.append(pd.DataFrame({"date": days[travel].strftime("%Y-%m-%d"), "event_type": "travel",
+                              "intensity": rng.integers(1, 4, travel.sum())}))
+    ill = rng.random(len(days)) < 0.1 / 7 * 4
+    rows.append(pd.DataFrame({"date": days[ill].strftime("%Y-%m-%d"), "event_type": "illness",
+                              "intensity": rng.integers(1, 3, ill.sum())}))
+    return pd.concat(rows, ignore_index=True)
+
+def as_dict(events_df):
+    events = {}
+    for d, t, i in events_df[["date", "event_type", "intensity"]].itertuples(index=False):
+        events.setdefault(d, []).append((t, i))
+    return events
+
+def run_loop(prof, rules, events):
+    random.seed(prof["seed"])
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(COLUMNS)
+    rows = simulate_loop(prof, rules, events)
+    w.writerows(rows)
+    return len(rows)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--months", type=int, nargs="+", default=[8, 120, 1200])
+    args = ap.parse_args()
+
+    with open(os.path.join(ROOT, "config", "profile.yaml")) as f:
+        base_prof = yaml.safe_load(f)
+    with open(os.path.join(ROOT, "config", "rules.yaml")) as f:
+        rules = yaml.safe_load(f)
+
+    print("numpy = generation only; numpy+csv includes DataFrame.to_csv (the loop always writes CSV)")
+    print(f"{'months':>7} {'rows':>8} {'loop rows/s':>12} {'numpy rows/s':>13} {'numpy+csv':>10} {'speedup':>8}")
+    for months in args.months:
+        prof = dict(base_prof, months=months)
+        events_df = synthetic_events(prof)
+        events = as_dict(events_df)
+
+        t0 = time.perf_counter()
+        rows = run_loop(prof, rules, events)
+        t_loop = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        df = simulate_vectorized(prof, rules, events_df)
+        t_np = time.perf_counter() - t0
+        df.to_csv(io.StringIO(), index=False)
+        t_np_csv = time.perf_counter() - t0
+
+        print(f"{months:>7} {rows:>8} {rows / t_loop:>12.0f} {rows / t_np:>13.0f} "
+              f"{rows / t_np_csv:>10.0f} {t_loop / t_np_csv:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Load time and file size of CSV vs. typed Parquet (rag/utils/io.py).
+
+Each dataset in data/ is tiled N times (one copy per synthetic member_id) and
+written as CSV and Parquet. "csv" is what readers did before: read_csv plus
+pd.to_datetime on the date columns. "proj" loads only the columns a caller
+needs (e.g. assemble_facts' date/ldl_mgdl/apob_mgdl). Tiled copies compress
+unusually well, so Parquet sizes are a lower bound. Run from the repo root:
+
+    python benchmarks/bench_storage.py --scales 1 100 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.utils.io import DATE_COLUMNS, parquet_path, read_table, write_parquet
+
+DATASETS = {
+    "daily.csv": ["date", "rhr_bpm", "hrv_ms"],
+    "labs_quarterly.csv": ["date", "ldl_mgdl", "apob_mgdl"],
+    "chats.csv": ["datetime", "timestamp", "sender"],  # pipeline vs. simulation chats
+}
+
+def tiled(df, scale):
+    out = pd.concat([df] * scale, ignore_index=True)
+    out.insert(0, "member_id", np.repeat([f"member_{i:06d}" for i in range(scale)], len(df)))
+    return out
+
+def read_csv_today(path, columns=None):
+    df = pd.read_csv(path, usecols=columns)
+    for c in DATE_COLUMNS:
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c])
+    return df
+
+def timed(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default="data")
+    ap.add_argument("--scales", type=int, nargs="+", default=[1, 100, 1000])
+    ap.add_argument("--repeats", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'dataset':<19} {'scale':>5} {'rows':>8} {'csv MB':>7} {'pq MB':>6} "
+          f"{'csv ms':>8} {'pq ms':>7} {'csv proj':>9} {'pq proj':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, proj in DATASETS.items():
+            base = pd.read_csv(os.path.join(args.data, name))
+            proj = [c for c in proj if c in base.columns]
+            for scale in args.scales:
+                df = tiled(base, scale)
+                path = os.path.join(tmp, name)
+                df.to_csv(path, index=False)
+                write_parquet(df, path)
+                csv_mb = os.path.getsize(path) / 1e6
+                pq_mb = os.path.getsize(parquet_path(path)) / 1e6
+                t_csv = timed(lambda: read_csv_today(path), args.repeats)
+                t_pq = timed(lambda: read_table(path), args.repeats)
+                t_csv_proj = timed(lambda: read_csv_today(path, proj), args.repeats)
+                t_pq_proj = timed(lambda: read_table(path, proj), args.repeats)
+                print(f"{name:<19} {scale:>5} {len(df):>8} {csv_mb:>7.2f} {pq_mb:>6.2f} "
+                      f"{t_csv:>8.1f} {t_pq:>7.1f} {t_csv_proj:>9.1f} {t_pq_proj:>8.1f}")
+
+if __name__ == "__main__":
+    main()
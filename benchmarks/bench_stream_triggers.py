@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Cost of evaluating triggers for one newly arrived day, streaming vs. batch.
+
+For a member with H days of history (default 1, 5 and 20 years), times pushing
+the next 200 days one at a time through stream_triggers.TriggerStream, against
+what a batch-only setup does per new day: rerun rule_engine.evaluate_triggers
+over the whole history. Streaming stays flat as H grows; batch grows with H.
+The fired rows of a full streaming replay are checked against the batch engine.
+Run from the repo root:
+
+    python benchmarks/bench_stream_triggers.py --years 1 5 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "scripts"))
+sys.path.append(os.path.join(ROOT, "benchmarks"))
+
+from bench_rule_engine import member_data
+from rule_engine import COLUMNS, compile_rules, evaluate_triggers
+from stream_triggers import TriggerStream, replay
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--years", type=int, nargs="+", default=[1, 5, 20])
+    ap.add_argument("--new-days", type=int, default=200, help="days pushed after the history")
+    ap.add_argument("--batch-days", type=int, default=5, help="new days timed with a batch rerun")
+    args = ap.parse_args()
+
+    with open(os.path.join(ROOT, "config", "profile.yaml")) as f:
+        base_prof = yaml.safe_load(f)
+    with open(os.path.join(ROOT, "config", "rules.yaml")) as f:
+        rules = yaml.safe_load(f)
+    compiled = compile_rules(rules["triggers"])
+
+    print(f"{'history days':>12} {'stream us/day':>14} {'batch ms/day':>13} {'identical':>10}")
+    for years in args.years:
+        rng = np.random.default_rng(years)
+        prof, *frames = member_data(base_prof, rules, 0, years * 12, rng)
+        daily, labs, events = (f.drop(columns="member_id") for f in frames)
+        hist, new = daily.iloc[:-args.new_days], daily.iloc[-args.new_days:]
+        baselines = prof["baselines"]
+
+        stream = TriggerStream(compiled, baselines)
+        replay(stream, hist, labs[labs["date"] <= hist["date"].iloc[-1]], events)
+        later = labs[labs["date"] > hist["date"].iloc[-1]]
+        t0 = time.perf_counter()
+        streamed = replay(stream, new, later)
+        t_stream = (time.perf_counter() - t0) / len(new)
+
+        t0 = time.perf_counter()
+        for i in range(args.batch_days):
+            upto = daily.iloc[:len(hist) + i + 1]
+            evaluate_triggers(compiled, upto, labs=labs[labs["date"] <= upto["date"].iloc[-1]],
+                              events=events, baselines=baselines)
+        t_batch = (time.perf_counter() - t0) / args.batch_days
+
+        full = evaluate_triggers(compiled, daily, labs=labs, events=events, baselines=baselines)
+        tail = full[full["date"] >= new["date"].iloc[0]]
+        key = lambda f: f.astype(str).sort_values(COLUMNS).reset_index(drop=True)
+        same = key(tail).equals(key(pd.DataFrame(streamed, columns=COLUMNS)))
+        print(f"{len(hist):>12} {t_stream * 1e6:>14.0f} {t_batch * 1e3:>13.1f} {str(same):>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Retrieval-only throughput of the pre-fork server vs. worker count.
+
+Starts `python -m rag.main --prod --workers N` for each N, drives POST
+/retrieve from a thread pool and reports req/s and scaling efficiency.
+Run from the repo root:
+
+    python benchmarks/bench_workers.py --workers 1 2 4 8 --requests 2000
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = [
+    "How is my HRV trending?",
+    "What was my latest LDL?",
+    "Any travel coming up?",
+    "How did my VO2max change?",
+    "Why the deload week?",
+]
+
+def wait_ready(url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"server at {url} did not come up")
+
+def drive(base_url, n_requests, concurrency):
+    sessions = [requests.Session() for _ in range(concurrency)]
+
+    def one(i):
+        s = sessions[i % concurrency]
+        s.post(f"{base_url}/retrieve",
+               json={"query": QUERIES[i % len(QUERIES)], "role": "Ruby", "k": 3},
+               timeout=30).raise_for_status()
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(n_requests)))
+    return n_requests / (time.perf_counter() - t0)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency-per-worker", type=int, default=4)
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    baseline = None
+    print(f"{'workers':>7} {'req/s':>9} {'speedup':>8} {'efficiency':>10}")
+    for n in args.workers:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "rag.main", "--prod", "--workers", str(n),
+             "--host", "127.0.0.1", "--port", str(args.port)],
+            cwd=ROOT,
+        )
+        try:
+            wait_ready(base_url + "/")
+            drive(base_url, 50, n)  # warm every worker
+            rps = drive(base_url, args.requests, n * args.concurrency_per_worker)
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait()
+        baseline = baseline or rps
+        speedup = rps / baseline
+        print(f"{n:>7} {rps:>9.1f} {speedup:>8.2f} {speedup / n * args.workers[0]:>10.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -15,7 +15,9 @@
 # ──────────────────────────────────────────────────────────────────────────────
 
 import io
+import json
 import os
+import sys
 from datetime import datetime, timedelta
 from typing import Dict, Tuple, Optional
 import numpy as np
@@ -26,6 +28,11 @@ import streamlit as st
 import altair as alt
 import html
 
+# Shared dataset storage (typed Parquet next to the pipeline CSVs)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rag.utils.io import current_parquet, parse_dates
+from rag.utils.downsample import downsample
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Config & Theme
 # ──────────────────────────────────────────────────────────────────────────────
@@ -114,10 +121,6 @@ alt.themes.enable("vivid_theme")
 
 # Ensure Altair charts use dark background by default
 alt.renderers.set_embed_options(actions=False)
-alt.data_transformers.disable_max_rows()
-
-# Make Altair charts render with higher contrast tooltips where possible
-alt.data_transformers.disable_max_rows()
 
 
 # === Column mapping config (adapt to your exact headers) ======================
@@ -341,22 +344,6 @@ def get_sender_role_and_display(sender_name: str) -> tuple[str, str, str]:
 # Utilities
 # ──────────────────────────────────────────────────────────────────────────────
 
-def _parse_date(s):
-    if pd.isna(s):
-        return pd.NaT
-    # Allow multiple formats gracefully
-    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%Y/%m/%d", "%d-%m-%Y", "%Y-%m-%d %H:%M:%S"):
-        try:
-            return datetime.strptime(str(s), fmt)
-        except Exception:
-            continue
-    # Fall back to pandas
-    try:
-        return pd.to_datetime(s, errors="coerce")
-    except Exception:
-        return pd.NaT
-
-
 def _ensure_dir():
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR, exist_ok=True)
@@ -379,141 +366,188 @@ def _csv(path: str) -> pd.DataFrame:
 # Loaders with normalization + helper indices
 # ──────────────────────────────────────────────────────────────────────────────
 
+# (file name, csv_key / result key, expected columns), loaded in this order
+DATASETS = [
+    ("member_profile.csv", "member_profile", ["member_id", "name"]),
+    ("events.csv", "events", ["member_id", "date", "event_type", "label"]),
+    ("daily.csv", "daily", ["member_id", "date"]),
+    ("weekly.csv", "weekly", ["member_id"]),  # week_start may be derived
+    ("labs_quarterly.csv", "labs_quarterly", ["member_id", "date"]),  # LDL/ApoB optional but recommended
+    ("fitness.csv", "fitness", ["member_id", "date"]),
+    ("body_comp.csv", "body_comp", ["member_id", "date"]),
+    ("interventions.csv", "interventions", ["member_id", "date", "rule_id"]),
+    ("chats.csv", "chats", ["member_id", "timestamp", "text"]),
+    ("kpis_monthly.csv", "kpis_monthly", ["member_id", "month"]),
+]
+
+
+def _source(name: str) -> Optional[Tuple[str, int, int]]:
+    """(path, mtime_ns, size) of the file a dataset is read from (its Parquet sibling when current)"""
+    fpath = os.path.join(DATA_DIR, name)
+    path = current_parquet(fpath) or (fpath if os.path.exists(fpath) else None)
+    if path is None:
+        return None
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
 @st.cache_data(show_spinner=False)
-def load_all() -> Dict[str, pd.DataFrame]:
-    _ensure_dir()
-    loaded = {}
-    column_map = get_column_map()
-
-    def apply_mapping(df: pd.DataFrame, csv_key: str) -> pd.DataFrame:
-        mapping = (column_map or {}).get(csv_key, {})
-        inv = {v: k for k, v in mapping.items() if v in df.columns}
-        if inv:
-            df = df.rename(columns=inv)
-        return df
-
-    def load(name: str, csv_key: str, required_cols=None):
-        """Load a CSV, apply column mapping, parse dates, and auto-fill member_id for single-member datasets.
-        Returns a dataframe.
-        """
-        fpath = os.path.join(DATA_DIR, name)
-        if not os.path.exists(fpath):
-            return pd.DataFrame()
-        df = _csv(fpath)
-        df = apply_mapping(df, csv_key)
-        # Date/time parsing
-        for col in [c for c in df.columns if any(k in c.lower() for k in ["date", "time", "timestamp"]) ]:
-            try:
-                df[col] = pd.to_datetime(df[col], errors="coerce")
-            except Exception:
-                pass
-        # Warn if required columns missing (but don't fail)
-        if required_cols:
-            missing = [c for c in required_cols if c not in df.columns]
-            if missing:
-                st.warning(f"{name}: missing expected columns {missing}. Present: {list(df.columns)}")
-        # Auto-fill member_id for single-member workflows
-        if "member_id" not in df.columns:
-            # prefer member_profile if present
-            if "member_profile" in loaded and not loaded["member_profile"].empty and "member_id" in loaded["member_profile"].columns:
-                default_mid = loaded["member_profile"].member_id.iloc[0]
-                df["member_id"] = default_mid
-                st.info(f"Auto-filled member_id for {name} from member_profile: {default_mid}")
-            else:
-                df["member_id"] = "member_1"
-                st.info(f"Auto-filled member_id for {name} as 'member_1' (single-member)")
-        return df
-
-    loaded["member_profile"] = load("member_profile.csv", "member_profile", ["member_id", "name"])
-    loaded["events"] = load("events.csv", "events", ["member_id", "date", "event_type", "label"])
-    loaded["daily"] = load("daily.csv", "daily", ["member_id", "date"])
-    loaded["weekly"] = load("weekly.csv", "weekly", ["member_id"])  # week_start may be derived
-    labs_name = "labs_quarterly.csv" if os.path.exists(os.path.join(DATA_DIR, "labs_quarterly.csv")) else ("lab_quarterly.csv" if os.path.exists(os.path.join(DATA_DIR, "lab_quarterly.csv")) else "labs_quarterly.csv")
-    loaded["labs_quarterly"] = load(labs_name, "labs_quarterly", ["member_id", "date"])  # LDL/ApoB optional but recommended
-    loaded["fitness"] = load("fitness.csv", "fitness", ["member_id", "date"])
-    loaded["body_comp"] = load("body_comp.csv", "body_comp", ["member_id", "date"])
-    loaded["interventions"] = load("interventions.csv", "interventions", ["member_id", "date", "rule_id"]) 
-    loaded["chats"] = load("chats.csv", "chats", ["member_id", "timestamp", "text"]) 
-    loaded["kpis_monthly"] = load("kpis_monthly.csv", "kpis_monthly", ["member_id", "month"]) 
-
-    loaded = normalize_and_link(loaded)
-    return loaded
-
-
-def normalize_and_link(d: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
-    # Member index
-    for key, df in d.items():
-        if not df.empty and "member_id" not in df.columns:
-            # Try to recover member_id if a single member exists in profile
-            if not d["member_profile"].empty and "member_id" in d["member_profile"].columns:
-                mid = d["member_profile"].member_id.iloc[0]
-                df["member_id"] = mid
-                d[key] = df
+def load_table(name: str, csv_key: str, source, mapping_json: str, required_cols=(), profile_mid=None) -> pd.DataFrame:
+    """Load one dataset, apply column mapping, parse dates, auto-fill member_id and add its own
+    indices (chats: the sender role columns).
+
+    Cached per (source file, mtime, size, column map, profile member_id), so a
+    changed file is re-read on the next rerun and unchanged ones are not.
+    """
+    if source is None:
+        return pd.DataFrame()
+    path = source[0]
+    df = pd.read_parquet(path) if path.endswith(".parquet") else _csv(path)
+    inv = {v: k for k, v in json.loads(mapping_json).items() if v in df.columns}
+    if inv:
+        df = df.rename(columns=inv)
+    # Date/time parsing (no-op for columns already typed in Parquet)
+    for col in [c for c in df.columns if any(k in c.lower() for k in ["date", "time", "timestamp"]) ]:
+        try:
+            df[col] = parse_dates(df[col])
+        except Exception:
+            pass
+    # Warn if required columns missing (but don't fail)
+    if required_cols:
+        missing = [c for c in required_cols if c not in df.columns]
+        if missing:
+            st.warning(f"{name}: missing expected columns {missing}. Present: {list(df.columns)}")
+    # Auto-fill member_id for single-member workflows
+    if "member_id" not in df.columns:
+        # prefer member_profile if present
+        if profile_mid is not None:
+            df["member_id"] = profile_mid
+            st.info(f"Auto-filled member_id for {name} from member_profile: {profile_mid}")
+        else:
+            df["member_id"] = "member_1"
+            st.info(f"Auto-filled member_id for {name} as 'member_1' (single-member)")
 
     # Month/week indices
-    if not d["daily"].empty:
-        daily = d["daily"].copy()
-        daily["date"] = pd.to_datetime(daily["date"], errors="coerce")
-        daily["month"] = daily["date"].dt.to_period("M").dt.to_timestamp()
+    if csv_key == "daily":
+        df["date"] = pd.to_datetime(df["date"], errors="coerce")
+        df["month"] = df["date"].dt.to_period("M").dt.to_timestamp()
         # ISO week start (Monday)
-        daily["week_start"] = daily["date"] - pd.to_timedelta(daily["date"].dt.weekday, unit="D")
-        d["daily"] = daily
+        df["week_start"] = df["date"] - pd.to_timedelta(df["date"].dt.weekday, unit="D")
+    elif csv_key == "weekly":
+        if "week_start" not in df.columns and "date" in df.columns:
+            df["week_start"] = df["date"] - pd.to_timedelta(pd.to_datetime(df["date"]).dt.weekday, unit="D")
+    elif csv_key == "chats":
+        df = add_sender_roles(df)
+    return df
 
-    if not d["weekly"].empty:
-        weekly = d["weekly"].copy()
-        if "week_start" not in weekly.columns and "date" in weekly.columns:
-            weekly["week_start"] = weekly["date"] - pd.to_timedelta(pd.to_datetime(weekly["date"]).dt.weekday, unit="D")
-        d["weekly"] = weekly
 
+def load_all() -> Dict[str, pd.DataFrame]:
+    """Every dataset plus the derived joins; only changed files (and joins over them) are recomputed"""
+    _ensure_dir()
+    loaded, keys = {}, {}
+    column_map = get_column_map() or {}
+    profile_mid = None
+    for name, csv_key, required_cols in DATASETS:
+        if csv_key == "labs_quarterly" and not _exists(name) and _exists("lab_quarterly.csv"):
+            name = "lab_quarterly.csv"
+        key = (_source(name), json.dumps(column_map.get(csv_key, {}), sort_keys=True), profile_mid)
+        loaded[csv_key] = load_table(name, csv_key, *key[:2], tuple(required_cols), profile_mid)
+        keys[csv_key] = key
+        if csv_key == "member_profile":
+            profile = loaded["member_profile"]
+            if not profile.empty and "member_id" in profile.columns:
+                profile_mid = profile.member_id.iloc[0]
+
+    return normalize_and_link(loaded, keys)
+
+
+def _join_fitness_body(fitness: pd.DataFrame, body_comp: pd.DataFrame) -> pd.DataFrame:
     # Fitness & body comp join by date/week (outer join for completeness)
-    if not d["fitness"].empty and not d["body_comp"].empty:
-        f = d["fitness"][['member_id','date'] + [c for c in d['fitness'].columns if c not in ('member_id','date')]].copy()
-        b = d["body_comp"][['member_id','date'] + [c for c in d['body_comp'].columns if c not in ('member_id','date')]].copy()
-        joined = pd.merge_asof(
-            f.sort_values("date"),
-            b.sort_values("date"),
-            by="member_id",
-            on="date",
-            direction="nearest",
-            tolerance=pd.Timedelta(days=7),
-            suffixes=("_fit", "_body"),
-        )
-        d["fitness_body"] = joined
-    else:
-        d["fitness_body"] = pd.DataFrame()
+    if fitness.empty or body_comp.empty:
+        return pd.DataFrame()
+    f = fitness[['member_id','date'] + [c for c in fitness.columns if c not in ('member_id','date')]].copy()
+    b = body_comp[['member_id','date'] + [c for c in body_comp.columns if c not in ('member_id','date')]].copy()
+    return pd.merge_asof(
+        f.sort_values("date"),
+        b.sort_values("date"),
+        by="member_id",
+        on="date",
+        direction="nearest",
+        tolerance=pd.Timedelta(days=7),
+        suffixes=("_fit", "_body"),
+    )
+
 
-    # Common joins
+def _join_daily_events(daily: pd.DataFrame, events: pd.DataFrame) -> pd.DataFrame:
     # daily ↔ events by date
-    if not d["daily"].empty and not d["events"].empty:
-        de = pd.merge(d["daily"], d["events"], on=["member_id", "date"], how="left", suffixes=("", "_event"))
-        d["daily_events"] = de
-    else:
-        d["daily_events"] = pd.DataFrame()
+    if daily.empty or events.empty:
+        return pd.DataFrame()
+    return pd.merge(daily, events, on=["member_id", "date"], how="left", suffixes=("", "_event"))
+
 
+def _join_interventions_labs(labs: pd.DataFrame, interventions: pd.DataFrame) -> pd.DataFrame:
     # labs_quarterly ←→ interventions (approx by date via LDL triggers)
-    if not d["labs_quarterly"].empty and not d["interventions"].empty:
-        labs = d["labs_quarterly"].sort_values("date")
-        iv = d["interventions"].sort_values("date")
-        link = pd.merge_asof(iv, labs, by="member_id", on="date", direction="nearest", tolerance=pd.Timedelta(days=14), suffixes=("_iv", "_lab"))
-        d["interventions_labs"] = link
-    else:
-        d["interventions_labs"] = pd.DataFrame()
+    if labs.empty or interventions.empty:
+        return pd.DataFrame()
+    return pd.merge_asof(interventions.sort_values("date"), labs.sort_values("date"), by="member_id", on="date",
+                         direction="nearest", tolerance=pd.Timedelta(days=14), suffixes=("_iv", "_lab"))
+
 
+def _join_chats_interventions(chats: pd.DataFrame, interventions: pd.DataFrame) -> pd.DataFrame:
     # interventions ↔ chats via rule_id
-    if not d["interventions"].empty and not d["chats"].empty and "rule_id" in d["chats"].columns:
-        d["chats_interventions"] = pd.merge(d["chats"], d["interventions"], on=["member_id", "rule_id"], how="left", suffixes=("_chat", "_iv"))
-    else:
-        d["chats_interventions"] = pd.DataFrame()
+    if interventions.empty or chats.empty or "rule_id" not in chats.columns:
+        return pd.DataFrame()
+    return pd.merge(chats, interventions, on=["member_id", "rule_id"], how="left", suffixes=("_chat", "_iv"))
 
+
+def _weekly_from_daily(daily: pd.DataFrame) -> pd.DataFrame:
     # daily aggregated → weekly (validation)
-    if not d["daily"].empty:
-        agg = d["daily"].copy()
-        num_cols = [c for c in agg.columns if agg[c].dtype != 'O' and c not in ("member_id")]
-        weekly_from_daily = agg.groupby(["member_id", "week_start"], as_index=False)[num_cols].mean(numeric_only=True)
-        d["weekly_from_daily"] = weekly_from_daily
-    else:
-        d["weekly_from_daily"] = pd.DataFrame()
+    if daily.empty:
+        return pd.DataFrame()
+    num_cols = [c for c in daily.columns if daily[c].dtype != 'O' and c not in ("member_id")]
+    return daily.groupby(["member_id", "week_start"], as_index=False)[num_cols].mean(numeric_only=True)
+
+
+# derived table -> (builder, the loaded tables it reads)
+DERIVED = {
+    "fitness_body": (_join_fitness_body, ("fitness", "body_comp")),
+    "daily_events": (_join_daily_events, ("daily", "events")),
+    "interventions_labs": (_join_interventions_labs, ("labs_quarterly", "interventions")),
+    "chats_interventions": (_join_chats_interventions, ("chats", "interventions")),
+    "weekly_from_daily": (_weekly_from_daily, ("daily",)),
+}
 
+
+@st.cache_data(show_spinner=False)
+def _derived(name: str, input_keys, _inputs) -> pd.DataFrame:
+    """One derived table, cached on the load keys of its inputs (the frames themselves aren't hashed)"""
+    return DERIVED[name][0](*_inputs)
+
+
+SENDER_COLUMNS = ("sender_role", "sender_display", "sender_emoji")
+
+def add_sender_roles(chats: pd.DataFrame) -> pd.DataFrame:
+    """Categorical sender_role/sender_display/sender_emoji columns, resolved once per distinct sender"""
+    if chats.empty or "sender" not in chats.columns:
+        return chats
+    codes, senders = pd.factorize(chats["sender"])  # missing senders get code -1 -> NaN
+    info = [get_sender_role_and_display(s) for s in senders]
+    out = chats.copy()
+    for col, values in zip(SENDER_COLUMNS, zip(*info) if info else ((), (), ())):
+        categories, per_sender = np.unique(np.asarray(values, dtype=object), return_inverse=True)
+        out[col] = pd.Categorical.from_codes(np.append(per_sender, -1)[codes], categories=categories)
+    return out
+
+
+def normalize_and_link(d: Dict[str, pd.DataFrame], keys: Optional[Dict] = None) -> Dict[str, pd.DataFrame]:
+    """Add the derived joins to the loaded tables; with load_all's `keys`, each join is
+    cached and rebuilt only when one of its input files changed."""
+    for name, (build, inputs) in DERIVED.items():
+        frames = [d[k] for k in inputs]
+        if keys is None:
+            d[name] = build(*frames)
+        else:
+            d[name] = _derived(name, tuple(keys[k] for k in inputs), frames)
     return d
 
 
@@ -521,6 +555,41 @@ def normalize_and_link(d: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
 # UI Helpers
 # ──────────────────────────────────────────────────────────────────────────────
 
+# Time series are cut to about one point per horizontal pixel per series before
+# they are serialized into the chart spec (full-width charts; halve for columns)
+CHART_WIDTH = int(os.getenv("CHART_WIDTH", "1200"))
+# Altair's default row guard, left on: chart_data never returns more rows than this
+CHART_MAX_ROWS = 5000
+
+
+def chart_data(df: pd.DataFrame, x: str, y: str, by: Optional[str] = None, width: int = CHART_WIDTH,
+               method: str = "lttb") -> pd.DataFrame:
+    """Rows of df worth drawing at `width` px (LTTB or min/max per `by` series); short ranges pass whole.
+
+    Many series share CHART_MAX_ROWS, so each gets fewer points. Points are cut
+    once, on the server: zooming an .interactive() chart only magnifies what was
+    sent, so full resolution needs a narrower range (Overview timeframe, Trends zoom).
+    """
+    series = max(df[by].nunique(), 1) if by is not None and not df.empty else 1
+    n = min(width, max(CHART_MAX_ROWS // series - 2, 2))  # min/max may keep n + 2 per series
+    return downsample(df, x, y, n, by=by, method=method)
+
+
+def event_rules(events: pd.DataFrame) -> pd.DataFrame:
+    """Event dates for a rule overlay, at most the first and last per pixel (min/max of a constant)"""
+    return chart_data(events[["date"]].assign(mark=0.0), "date", "mark", method="minmax")
+
+
+def show_chart(chart, source_rows: Optional[int] = None):
+    """st.altair_chart at container width, captioned with the points and bytes sent to the browser"""
+    spec = chart.to_dict()
+    points = sum(len(rows) for rows in spec.get("datasets", {}).values())
+    size = len(json.dumps(spec, default=str).encode("utf-8"))
+    st.altair_chart(chart, use_container_width=True)
+    of = f" of {source_rows:,}" if source_rows is not None and source_rows > points else ""
+    st.caption(f"{points:,}{of} points · {size / 1024:.1f} KB")
+
+
 @st.cache_data(show_spinner=False)
 def member_header(profile: pd.DataFrame):
     if profile.empty:
@@ -673,6 +742,8 @@ def page_overview(d: Dict[str, pd.DataFrame]):
             days_ago = today - pd.Timedelta(days=days)
             df = df.query("date >= @days_ago")
         long = df.melt(id_vars=["date"], value_vars=metrics, var_name="metric", value_name="value").dropna()
+        source_rows = len(long)
+        long = chart_data(long, "date", "value", by="metric")
 
         # Interactive selection for highlighting
         nearest = alt.selection(type="single", nearest=True, on="mouseover",
@@ -697,8 +768,9 @@ def page_overview(d: Dict[str, pd.DataFrame]):
 
         labels = base.mark_text(align='left', dx=7, dy=-7).encode(text=alt.condition(nearest, 'value:Q', alt.value(' ')))
 
+        # Pan/zoom magnifies the points already sent; the Timeframe re-samples at full resolution
         chart = (area + base + points + labels + selectors).interactive()
-        st.altair_chart(chart, use_container_width=True)
+        show_chart(chart, source_rows)
 
         # Small summary cards under chart: latest, delta 30d
         latest_date = df['date'].max()
@@ -899,7 +971,8 @@ def build_timeline(d: Dict[str, pd.DataFrame], clickable: bool=False, filters: O
 
     selection = alt.selection_single(fields=['date'], nearest=True, on='click', empty='none')
 
-    chart = alt.Chart(tl).mark_point(filled=True).encode(
+    # Events are discrete marks: min/max buckets keep both lanes' extremes per type
+    chart = alt.Chart(chart_data(tl, "date", "lane", by="type", method="minmax")).mark_point(filled=True).encode(
         x=alt.X('date:T', title='Date'),
         y=alt.Y('lane:O', title=None, axis=None),
         color=alt.Color('type:N', scale=alt.Scale(domain=['travel','illness','intervention','lab'], range=[EVENT_COLORS.get('travel'), EVENT_COLORS.get('illness'), INTERVENTION_COLOR, '#6b7280'])),
@@ -908,7 +981,7 @@ def build_timeline(d: Dict[str, pd.DataFrame], clickable: bool=False, filters: O
         tooltip=[alt.Tooltip('date:T', title='Date'), alt.Tooltip('type:N', title='Type'), alt.Tooltip('label:N', title='Label'), alt.Tooltip('intensity:Q', title='Intensity')],
     ).add_selection(selection).properties(height=140)
 
-    st.altair_chart(chart, use_container_width=True)
+    show_chart(chart, len(tl))
 
     if clickable:
         sel = selection
@@ -1171,37 +1244,38 @@ def page_diagnostics(d: Dict[str, pd.DataFrame]):
     labs = d["labs_quarterly"].copy()
     if not labs.empty and {"LDL","ApoB","date"}.issubset(labs.columns):
         long = labs.melt(id_vars=["date"], value_vars=["LDL","ApoB"], var_name="metric", value_name="value").dropna()
-        chart = alt.Chart(long).mark_line(point=True).encode(
+        chart = alt.Chart(chart_data(long, "date", "value", by="metric")).mark_line(point=True).encode(
             x="date:T", y="value:Q", color="metric:N", tooltip=["date:T","metric:N","value:Q"]
         ).properties(height=300)
-        st.altair_chart(chart, use_container_width=True)
+        show_chart(chart, len(long))
     else:
         st.info("Need LDL and ApoB columns.")
 
     st.subheader("Glucose (fasting) & OGTT 2h")
     if not labs.empty and {"FPG","OGTT_2h"}.issubset(labs.columns):
         long = labs.melt(id_vars=["date"], value_vars=["FPG","OGTT_2h"], var_name="metric", value_name="value").dropna()
-        st.altair_chart(alt.Chart(long).mark_line(point=True).encode(
+        show_chart(alt.Chart(chart_data(long, "date", "value", by="metric")).mark_line(point=True).encode(
             x="date:T", y="value:Q", color="metric:N", tooltip=["date:T","metric:N","value:Q"]
-        ).properties(height=300), use_container_width=True)
+        ).properties(height=300), len(long))
     else:
         st.info("Add FPG and OGTT_2h columns to labs_quarterly.csv if available.")
 
     st.subheader("CRP with illness markers")
     if not labs.empty and "CRP" in labs.columns:
-        base = alt.Chart(labs).mark_line(point=True).encode(x="date:T", y="CRP:Q")
+        crp = labs[["date", "CRP"]]
+        base = alt.Chart(chart_data(crp, "date", "CRP")).mark_line(point=True).encode(x="date:T", y="CRP:Q")
         # Illness overlays from events
         ev = d["events"]
         if not ev.empty:
             ill = ev.query("event_type.str.lower() == 'illness'", engine='python')
             if not ill.empty:
-                overlay = alt.Chart(ill).mark_rule().encode(x="date:T", color=alt.value(EVENT_COLORS['illness']))
+                overlay = alt.Chart(event_rules(ill)).mark_rule().encode(x="date:T", color=alt.value(EVENT_COLORS['illness']))
                 chart = alt.layer(base.properties(height=250), overlay)
-                st.altair_chart(chart, use_container_width=True)  # type: ignore
+                show_chart(chart, len(crp))  # type: ignore
             else:
-                st.altair_chart(base.properties(height=250), use_container_width=True)
+                show_chart(base.properties(height=250), len(crp))
         else:
-            st.altair_chart(base.properties(height=250), use_container_width=True)
+            show_chart(base.properties(height=250), len(crp))
     else:
         st.info("Add CRP column to labs_quarterly.csv for this chart.")
 
@@ -1283,12 +1357,21 @@ def page_diagnostics(d: Dict[str, pd.DataFrame]):
 # ──────────────────────────────────────────────────────────────────────────────
 
 def page_trends(d: Dict[str, pd.DataFrame]):
-    st.subheader("RHR & HRV (dual axis approximation)")
     daily = d["daily"].copy()
+    # Zooming in narrows the range server-side; charts downsample only ranges wider than they are
+    if not daily.empty and "date" in daily.columns and daily["date"].notna().any():
+        lo, hi = daily["date"].min().date(), daily["date"].max().date()
+        if lo < hi:
+            zoom = st.slider("Zoom", min_value=lo, max_value=hi, value=(lo, hi), key="trends_zoom")
+            daily = daily[daily["date"].dt.date.between(*zoom)]
+
+    st.subheader("RHR & HRV (dual axis approximation)")
     if daily.empty or not {"RHR","HRV","date"}.issubset(daily.columns):
         st.info("daily.csv needs RHR and HRV columns.")
     else:
-        base = alt.Chart(daily).transform_fold(["RHR","HRV"], as_=["metric","value"]).mark_line().encode(
+        long = daily.melt(id_vars=["date"], value_vars=["RHR","HRV"], var_name="metric", value_name="value").dropna()
+        rows = len(long)
+        base = alt.Chart(chart_data(long, "date", "value", by="metric")).mark_line().encode(
             x="date:T", y="value:Q", color="metric:N", tooltip=["date:T","metric:N","value:Q"]
         ).properties(height=280)
         # Shade travel periods
@@ -1296,20 +1379,21 @@ def page_trends(d: Dict[str, pd.DataFrame]):
         if not ev.empty:
             trav = ev.query("event_type.str.lower() == 'travel'", engine='python')
             if not trav.empty:
-                rules = alt.Chart(trav).mark_rule().encode(x="date:T", color=alt.value(EVENT_COLORS['travel']))
+                rules = alt.Chart(event_rules(trav)).mark_rule().encode(x="date:T", color=alt.value(EVENT_COLORS['travel']))
                 chart = alt.layer(base, rules)
-                st.altair_chart(chart, use_container_width=True)  # type: ignore
+                show_chart(chart, rows)  # type: ignore
             else:
-                st.altair_chart(base, use_container_width=True)
+                show_chart(base, rows)
         else:
-            st.altair_chart(base, use_container_width=True)
+            show_chart(base, rows)
 
     st.subheader("Sleep: hours & quality")
     if daily.empty or not {"sleep_hours","sleep_quality"}.issubset(daily.columns):
         st.info("daily.csv needs sleep_hours & sleep_quality.")
     else:
         long = daily.melt(id_vars=["date"], value_vars=["sleep_hours","sleep_quality"], var_name="metric", value_name="value").dropna()
-        st.altair_chart(alt.Chart(long).mark_line().encode(x="date:T", y="value:Q", color="metric:N").properties(height=250), use_container_width=True)
+        show_chart(alt.Chart(chart_data(long, "date", "value", by="metric")).mark_line().encode(
+            x="date:T", y="value:Q", color="metric:N").properties(height=250), len(long))
 
     st.subheader("Weight trend (7‑day MA)")
     if daily.empty or "weight" not in daily.columns:
@@ -1317,17 +1401,20 @@ def page_trends(d: Dict[str, pd.DataFrame]):
     else:
         df = daily.sort_values("date").copy()
         df["weight_ma7"] = df["weight"].rolling(7, min_periods=1).mean()
-        base = alt.Chart(df).mark_line().encode(x="date:T", y="weight:Q")
-        ma = alt.Chart(df).mark_line(strokeDash=[4,4]).encode(x="date:T", y="weight_ma7:Q")
+        base = alt.Chart(chart_data(df[["date", "weight"]], "date", "weight")).mark_line().encode(x="date:T", y="weight:Q")
+        ma = alt.Chart(chart_data(df[["date", "weight_ma7"]], "date", "weight_ma7")).mark_line(strokeDash=[4,4]).encode(
+            x="date:T", y="weight_ma7:Q")
         chart = alt.layer(base.properties(height=250), ma)
-        st.altair_chart(chart, use_container_width=True)  # type: ignore
+        show_chart(chart, 2 * len(df))  # type: ignore
 
     st.subheader("Steps / Active minutes")
     if daily.empty or not {"steps","active_minutes"}.issubset(daily.columns):
         st.info("daily.csv needs steps & active_minutes.")
     else:
         long = daily.melt(id_vars=["date"], value_vars=["steps","active_minutes"], var_name="metric", value_name="value").dropna()
-        st.altair_chart(alt.Chart(long).mark_bar().encode(x="date:T", y="value:Q", color="metric:N").properties(height=220), use_container_width=True)
+        # min/max buckets keep the peak days visible as bars
+        bars = chart_data(long, "date", "value", by="metric", method="minmax")
+        show_chart(alt.Chart(bars).mark_bar().encode(x="date:T", y="value:Q", color="metric:N").properties(height=220), len(long))
 
     st.divider()
     st.subheader("Weekly aggregation & toggles")
@@ -1341,7 +1428,8 @@ def page_trends(d: Dict[str, pd.DataFrame]):
             present = [c for c in cols if c in wk.columns]
             if present:
                 long = wk.melt(id_vars=["week_start"], value_vars=present, var_name="metric", value_name="value").dropna()
-                st.altair_chart(alt.Chart(long).mark_line(point=True).encode(x="week_start:T", y="value:Q", color="metric:N").properties(height=240), use_container_width=True)
+                show_chart(alt.Chart(chart_data(long, "week_start", "value", by="metric")).mark_line(point=True).encode(
+                    x="week_start:T", y="value:Q", color="metric:N").properties(height=240), len(long))
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -1433,12 +1521,13 @@ def page_fitness(d: Dict[str, pd.DataFrame]):
         st.subheader("📈 Fitness Progress")
         for col, title in [("VO2max","VO₂max Estimate"), ("grip_strength","Grip Strength"), ("FMS","FMS Score" )]:
             if col in f.columns:
-                chart = alt.Chart(f.dropna(subset=[col])).mark_line(point=True).encode(
+                series = f[["date", col]].dropna()
+                chart = alt.Chart(chart_data(series, "date", col)).mark_line(point=True).encode(
                     x="date:T", 
                     y=alt.Y(f"{col}:Q", title=title), 
                     tooltip=["date:T", col]
                 )
-                st.altair_chart(chart.properties(height=260), use_container_width=True)
+                show_chart(chart.properties(height=260), len(series))
 
     st.subheader("🏃‍♂️ Body Composition")
     b = d["body_comp"].copy()
@@ -1518,7 +1607,8 @@ def page_fitness(d: Dict[str, pd.DataFrame]):
         present = [c for c in ["body_fat_pct","lean_mass"] if c in b.columns]
         if present:
             long = b.melt(id_vars=["date"], value_vars=present, var_name="metric", value_name="value").dropna()
-            st.altair_chart(alt.Chart(long).mark_line(point=True).encode(x="date:T", y="value:Q", color="metric:N"), use_container_width=True)
+            show_chart(alt.Chart(chart_data(long, "date", "value", by="metric")).mark_line(point=True).encode(
+                x="date:T", y="value:Q", color="metric:N"), len(long))
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -1645,13 +1735,13 @@ def page_interventions(d: Dict[str, pd.DataFrame]):
                 # window: 60d before intervention
                 t0 = pd.to_datetime(row["date"]) - pd.Timedelta(days=60)
                 dfw = df.query("date >= @t0 and date <= @row.date")
-                line = alt.Chart(dfw).mark_line().encode(x="date:T", y=alt.Y(f"{trig}:Q", title=trig))
+                line = alt.Chart(chart_data(dfw, "date", trig)).mark_line().encode(x="date:T", y=alt.Y(f"{trig}:Q", title=trig))
                 if pd.notna(trig_val):
                     thr = alt.Chart(pd.DataFrame({"y":[trig_val]})).mark_rule(strokeDash=[4,4]).encode(y="y:Q")
                     chart = alt.layer(line.properties(height=260), thr)
-                    st.altair_chart(chart, use_container_width=True) # type: ignore
+                    show_chart(chart, len(dfw)) # type: ignore
                 else:
-                    st.altair_chart(line.properties(height=260), use_container_width=True)
+                    show_chart(line.properties(height=260), len(dfw))
             else:
                 st.info("Trigger metric not found in daily.csv")
 
@@ -1670,8 +1760,9 @@ def page_interventions(d: Dict[str, pd.DataFrame]):
                 win = df.query("date >= @t0 and date <= @t1")
                 mark = alt.Chart(pd.DataFrame({"date":[pd.to_datetime(row["date"])]})).mark_rule(color=INTERVENTION_COLOR)
                 st.subheader("HRV 7‑day average around intervention")
-                chart = alt.layer(alt.Chart(win).mark_line().encode(x="date:T", y="HRV_ma7:Q"), mark.encode(x="date:T"))
-                st.altair_chart(chart, use_container_width=True)  # type: ignore
+                chart = alt.layer(alt.Chart(chart_data(win, "date", "HRV_ma7")).mark_line().encode(x="date:T", y="HRV_ma7:Q"),
+                                  mark.encode(x="date:T"))
+                show_chart(chart, len(win))  # type: ignore
 
             # Export bundle (CSV subset + rationale markdown)
             st.divider()
@@ -1696,6 +1787,43 @@ def page_interventions(d: Dict[str, pd.DataFrame]):
 # Chats Page
 # ──────────────────────────────────────────────────────────────────────────────
 
+CHAT_PAGE_SIZES = [50, 100, 200, 500]
+
+def _escape_html(s: pd.Series) -> pd.Series:
+    return (s.str.replace("&", "&amp;", regex=False).str.replace("<", "&lt;", regex=False)
+            .str.replace(">", "&gt;", regex=False))
+
+def chat_page_html(page: pd.DataFrame, timestamp_col: str, text_col: str) -> str:
+    """One HTML block for a page of chat messages, built column-wise (no per-row Streamlit calls)"""
+    if page.empty:
+        return ""
+    ts = page[timestamp_col]
+    role = page["sender_role"].astype(object)
+    name = (page["sender_emoji"].astype(object).fillna("👩‍💼") + " "
+            + _escape_html(page["sender_display"].astype(object).fillna("Unknown")))
+    text = _escape_html(page[text_col].fillna("").astype(str).str.strip()).str.replace("\n", "<br>", regex=False)
+    is_member = (role == "member").to_numpy()
+    bubble = np.where(
+        is_member,
+        "background:linear-gradient(135deg,#00FF6A,#00D1FF);color:#041022;border-bottom-right-radius:4px;"
+        "margin-left:auto;box-shadow:0 2px 8px rgba(0,255,106,0.2);",
+        "background:" + role.map(ROLE_COLORS).fillna("#2a3441") + ";color:#ffffff;border-bottom-left-radius:4px;"
+        "border:1px solid rgba(255,255,255,0.1);box-shadow:0 2px 8px rgba(42,52,65,0.3);",
+    )
+
+    # Date divider before the first message of each day
+    day = ts.dt.normalize()
+    today = pd.Timestamp.now(tz=ts.dt.tz).normalize()
+    label = ts.dt.strftime("%B %d, %Y").fillna("")
+    label = label.mask(day == today, "Today").mask(day == today - pd.Timedelta(days=1), "Yesterday")
+    divider = np.where(day.ne(day.shift()).to_numpy(), '<div class="chat-date-divider">' + label + "</div>", "")
+
+    rows = (divider + '<div style="max-width:66%;padding:12px 16px;border-radius:18px;margin:8px 0;'
+            "word-wrap:break-word;" + bubble + '"><div class="sender-info">' + name
+            + '</div><div class="message-text">' + text + '</div><div class="message-time">'
+            + ts.dt.strftime("%H:%M").fillna("") + "</div></div>")
+    return "<div>" + "".join(rows) + "</div>"
+
 def page_chats(d: Dict[str, pd.DataFrame]):
     st.subheader("💬 Chats")
     
@@ -1905,7 +2033,7 @@ def page_chats(d: Dict[str, pd.DataFrame]):
             
             # Append new messages
             ch = pd.concat([ch, new_messages_df], ignore_index=True)
-            ch = ch.sort_values(timestamp_col)
+            ch = add_sender_roles(ch.sort_values(timestamp_col))
 
     # Enhanced filters row with all available filters
     st.markdown("#### 🔍 Chat Filters")
@@ -1930,7 +2058,7 @@ def page_chats(d: Dict[str, pd.DataFrame]):
             min_date = ch[timestamp_col].min().date()
             max_date = ch[timestamp_col].max().date()
             date_range = st.date_input(
-                "📅 Date range(chat box can only hold 3 months data kindly select a 3 months range at max)",
+                "📅 Date range",
                 value=(min_date, max_date),
                 min_value=min_date,
                 max_value=max_date,
@@ -1953,8 +2081,7 @@ def page_chats(d: Dict[str, pd.DataFrame]):
                     ch = ch[ch['topic'] == chosen_topic]
     
     with col5:
-        total_messages = len(ch)
-        st.metric("💬", total_messages)
+        count_slot = st.empty()  # filled once the filter row below has run
     
     # Additional filter row for more specific filters
     if 'linked_intervention_id' in ch.columns or 'thread_id' in ch.columns:
@@ -1979,24 +2106,15 @@ def page_chats(d: Dict[str, pd.DataFrame]):
                         ch = ch[ch['thread_id'] == chosen_thread]
         
         with col3:
-            # Role filter
-            roles = []
-            for sender in ch['sender'].dropna().unique():
-                role, _, _ = get_sender_role_and_display(sender)
-                if role not in roles:
-                    roles.append(role)
-            
+            # Role filter (categories are sorted)
+            roles = ch['sender_role'].cat.remove_unused_categories().cat.categories.tolist()
             if roles:
-                chosen_role = st.selectbox('👥 Role Filter', options=['All'] + sorted(roles), index=0, key="role_filter")
+                chosen_role = st.selectbox('👥 Role Filter', options=['All'] + roles, index=0, key="role_filter")
                 if chosen_role != 'All':
-                    # Filter messages by role
-                    filtered_senders = []
-                    for sender in ch['sender'].dropna().unique():
-                        role, _, _ = get_sender_role_and_display(sender)
-                        if role == chosen_role:
-                            filtered_senders.append(sender)
-                    if filtered_senders:
-                        ch = ch[ch['sender'].isin(filtered_senders)]
+                    ch = ch[ch['sender_role'] == chosen_role]
+
+    total_messages = len(ch)
+    count_slot.metric("💬", total_messages)
 
     # WhatsApp-style chat container using native Streamlit components
     if not ch.empty:
@@ -2025,128 +2143,40 @@ def page_chats(d: Dict[str, pd.DataFrame]):
             """, unsafe_allow_html=True)
         
         with col2:
-            # Message limit selector
-            message_limit_options = [100, 200, 500, 1000, "All"]
-            selected_limit = st.selectbox(
-                "Show messages:",
-                options=message_limit_options,
-                index=2,  # Default to 500
-                key="message_limit"
-            )
-        
-        # Use st.container with height to create scrollable area
-        container = st.container(height=600)
-        
-        with container:
-            # Process messages with date dividers
-            current_date = None
-            
-            # Apply message limit
-            if selected_limit == "All":
-                recent_messages = ch.sort_values(timestamp_col)
-            else:
-                recent_messages = ch.tail(int(selected_limit))
-            
-            for _, row in recent_messages.iterrows():
-                msg_date = pd.to_datetime(row[timestamp_col]).date()
-                
-                # Add date divider if date changed
-                if current_date != msg_date:
-                    current_date = msg_date
-                    if msg_date == pd.Timestamp.today().date():
-                        formatted_date = "Today"
-                    elif msg_date == (pd.Timestamp.today() - pd.Timedelta(days=1)).date():
-                        formatted_date = "Yesterday"
-                    else:
-                        formatted_date = msg_date.strftime('%B %d, %Y')
-                    
-                    # Date divider using centered text
-                    st.markdown(f"""
-                    <div style="text-align: center; margin: 20px 0; color: #9ca3af; font-size: 12px; 
-                                background: rgba(255,255,255,0.1); padding: 5px 15px; border-radius: 15px; 
-                                display: inline-block; margin-left: 50%%; transform: translateX(-50%%);">
-                        {formatted_date}
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                # Determine if message is from member or provider
-                sender_name = str(row.get('sender', 'Unknown'))
-                role, display_name, sender_emoji = get_sender_role_and_display(sender_name)
-                is_member = role == "member"
-                
-                # Get message content
-                message_text = str(row.get(text_col, ''))
-                message_text = message_text.strip()
-                timestamp = pd.to_datetime(row[timestamp_col])
-                time_str = timestamp.strftime('%H:%M')
-                
-                # Create columns for message alignment
-                if is_member:
-                    # Member message (right aligned with green gradient)
-                    col1, col2 = st.columns([1, 2])
-                    with col2:
-                        st.markdown(f"""
-                        <div style="
-                            background: linear-gradient(135deg, #00FF6A, #00D1FF);
-                            color: #041022;
-                            padding: 12px 16px;
-                            border-radius: 18px;
-                            border-bottom-right-radius: 4px;
-                            margin: 8px 0;
-                            margin-left: auto;
-                            box-shadow: 0 2px 8px rgba(0, 255, 106, 0.2);
-                            word-wrap: break-word;
-                            max-width: 100%;
-                            display: block;
-                            text-align: left;
-                        ">
-                            <div style="font-size: 11px; font-weight: 600; margin-bottom: 4px;">
-                                {sender_emoji} {display_name}
-                            </div>
-                            <div style="font-size: 14px; line-height: 1.5; margin-bottom: 4px;">
-                                {message_text}
-                            </div>
-                            <div style="font-size: 10px; opacity: 0.7; text-align: right;">
-                                {time_str}
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                else:
-                    # Provider message (left aligned with role-based color)
-                    col1, col2 = st.columns([2, 1])
-                    with col1:
-                        # Get role-specific color
-                        role_color = ROLE_COLORS.get(role, "#2a3441")
-                        
-                        st.markdown(f"""
-                        <div style="
-                            background: {role_color};
-                            color: #ffffff;
-                            padding: 12px 16px;
-                            border-radius: 18px;
-                            border-bottom-left-radius: 4px;
-                            margin: 8px 0;
-                            border: 1px solid rgba(255,255,255,0.1);
-                            box-shadow: 0 2px 8px rgba(42, 52, 65, 0.3);
-                            word-wrap: break-word;
-                            max-width: 100%;
-                            display: block;
-                        ">
-                            <div style="font-size: 11px; font-weight: 600; margin-bottom: 4px;">
-                                {sender_emoji} {display_name}
-                            </div>
-                            <div style="font-size: 14px; line-height: 1.5; margin-bottom: 4px;">
-                                {message_text}
-                            </div>
-                            <div style="font-size: 10px; opacity: 0.7; text-align: right;">
-                                {time_str}
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-        
-        # Show info if messages were truncated
-        if selected_limit != "All" and len(ch) > int(selected_limit):
-            st.info(f"💡 Showing recent {selected_limit} messages. Total: {len(ch)} messages. Select 'All' to see all messages or use filters for specific conversations.")
+            page_size = st.selectbox("Messages per page:", options=CHAT_PAGE_SIZES, index=1, key="chat_page_size")
+
+        # Cursor = index of the first message on the page; None follows the latest page
+        ts = ch[timestamp_col]
+        last = max(total_messages - page_size, 0)
+        cursor = st.session_state.get("chat_cursor")
+        cursor = last if cursor is None else min(cursor, last)
+
+        nav = st.columns([1, 1, 2, 1, 1])
+        if nav[0].button("⏮ Oldest", key="chat_oldest", use_container_width=True):
+            cursor = 0
+        if nav[1].button("◀ Older", key="chat_older", use_container_width=True):
+            cursor = max(cursor - page_size, 0)
+        with nav[2]:
+            jump = st.date_input("Jump to date", value=None, min_value=ts.min().date(), max_value=ts.max().date(),
+                                 key="chat_jump", label_visibility="collapsed")
+        if jump is not None and jump != st.session_state.get("chat_jump_done"):
+            st.session_state["chat_jump_done"] = jump
+            at = pd.Timestamp(jump)
+            if ts.dt.tz is not None:
+                at = at.tz_localize(ts.dt.tz)
+            cursor = min(int(ts.dropna().searchsorted(at)), last)  # NaT sort last
+        if nav[3].button("Newer ▶", key="chat_newer", use_container_width=True):
+            cursor = min(cursor + page_size, last)
+        if nav[4].button("Latest ⏭", key="chat_latest", use_container_width=True):
+            cursor = last
+        st.session_state["chat_cursor"] = None if cursor >= last else cursor
+
+        page = ch.iloc[cursor:cursor + page_size]
+        with st.container(height=600):
+            st.markdown(chat_page_html(page, timestamp_col, text_col), unsafe_allow_html=True)
+        shown = page[timestamp_col].dropna()
+        span = f" · {shown.iloc[0]:%b %d, %Y} – {shown.iloc[-1]:%b %d, %Y}" if not shown.empty else ""
+        st.caption(f"Messages {cursor + 1:,}–{cursor + len(page):,} of {total_messages:,}{span}")
         
     else:
         st.markdown("""
@@ -2195,7 +2225,7 @@ def page_chats(d: Dict[str, pd.DataFrame]):
                         tooltip=['date:T', 'message_count:Q']
                     ).properties(height=200, title="Daily Message Activity")
                     
-                    st.altair_chart(chart, use_container_width=True)
+                    show_chart(chart)
 
         
         with col2:
@@ -2333,10 +2363,12 @@ def page_kpis(d: Dict[str, pd.DataFrame]):
                 st.dataframe(styled_df, use_container_width=True, hide_index=True)
         if {"adherence","sessions"}.issubset(km.columns):
             long = km.melt(id_vars=["month"], value_vars=["adherence","sessions"], var_name="metric", value_name="value").dropna()
-            st.altair_chart(alt.Chart(long).mark_line(point=True).encode(x="month:T", y="value:Q", color="metric:N").properties(height=260), use_container_width=True)
+            show_chart(alt.Chart(chart_data(long, "month", "value", by="metric")).mark_line(point=True).encode(
+                x="month:T", y="value:Q", color="metric:N").properties(height=260), len(long))
         if {"LDL_delta","VO2max_delta"}.issubset(km.columns):
             long = km.melt(id_vars=["month"], value_vars=["LDL_delta","VO2max_delta"], var_name="metric", value_name="value").dropna()
-            st.altair_chart(alt.Chart(long).mark_bar().encode(x="month:T", y="value:Q", color="metric:N").properties(height=220), use_container_width=True)
+            bars = chart_data(long, "month", "value", by="metric", method="minmax")
+            show_chart(alt.Chart(bars).mark_bar().encode(x="month:T", y="value:Q", color="metric:N").properties(height=220), len(long))
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -1,9 +1,13 @@
-import requests
 from rich.console import Console
 from rich.panel import Panel
 from rich.markdown import Markdown
+import os
+import sys
 import time
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rag.utils import http_client
+
 console = Console()
 
 def main():
@@ -24,7 +28,7 @@ def main():
             # Show spinner while processing
             with console.status("[bold]Consulting the team...") as status:
                 start_time = time.time()
-                response = requests.post(
+                response = http_client.post(
                     "http://localhost:8000/ask",
                     json={"question": question}
                 ).json()
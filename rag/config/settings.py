@@ -0,0 +1,35 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Micro-batching of query embeddings (rag/utils/text.py)
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+
+# Production serving (rag/main.py --prod)
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8000"))
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", str(os.cpu_count() or 1)))
+# Torch intra-op threads per worker; 1 avoids oversubscribing cores across workers
+TORCH_THREADS_PER_WORKER = int(os.getenv("TORCH_THREADS_PER_WORKER", "1"))
+# Seconds between per-worker memory reports from the master (0 = only on SIGUSR1)
+MEMORY_REPORT_INTERVAL = float(os.getenv("MEMORY_REPORT_INTERVAL", "0"))
+# Crashed workers are restarted after a doubling delay (seconds, capped at the max);
+# the master gives up after WORKER_MAX_CRASHES crashes within WORKER_CRASH_WINDOW seconds
+WORKER_RESTART_DELAY = float(os.getenv("WORKER_RESTART_DELAY", "1"))
+WORKER_RESTART_DELAY_MAX = float(os.getenv("WORKER_RESTART_DELAY_MAX", "30"))
+WORKER_MAX_CRASHES = int(os.getenv("WORKER_MAX_CRASHES", "5"))
+WORKER_CRASH_WINDOW = float(os.getenv("WORKER_CRASH_WINDOW", "60"))
+
+# Context packing for generate_answer (rag/scripts/rag_chain.py)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "250"))
+# Candidates /ask retrieves before packing
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "8"))
+# Docs at least this similar (difflib ratio) to an already packed doc are dropped
+CONTEXT_DEDUP_RATIO = float(os.getenv("CONTEXT_DEDUP_RATIO", "0.9"))
+
+# Maximal-marginal-relevance reranking in retrieve(); opt-in (RETRIEVE_MMR=true or per request)
+RETRIEVE_MMR = os.getenv("RETRIEVE_MMR", "false").lower() in ("1", "true", "yes")
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.5"))
+MMR_FETCH_MULTIPLIER = int(os.getenv("MMR_FETCH_MULTIPLIER", "5"))
@@ -1,11 +1,164 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
 from rag.scripts.api import app  # Import your FastAPI app
+from rag.config.settings import (SERVE_HOST, SERVE_PORT, SERVE_WORKERS,
+                                 TORCH_THREADS_PER_WORKER, MEMORY_REPORT_INTERVAL,
+                                 WORKER_RESTART_DELAY, WORKER_RESTART_DELAY_MAX,
+                                 WORKER_MAX_CRASHES, WORKER_CRASH_WINDOW)
+from rag.utils.memory import memory_usage, format_memory_report
 
-if __name__ == "__main__":
+
+def serve_dev(host, port):
     import uvicorn
     uvicorn.run(
         "rag.scripts.api:app",
-        host="0.0.0.0",
-        port=8000,
+        host=host,
+        port=port,
         reload=True,
         workers=1
-    )
\ No newline at end of file
+    )
+
+
+def _run_worker(sock):
+    """Worker body after fork: reopen per-process handles, then serve on the shared socket"""
+    import uvicorn
+    from rag.scripts import retriever
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+    retriever.connect()
+    server = uvicorn.Server(uvicorn.Config(app, log_level="info"))
+    server.run(sockets=[sock])
+
+
+def _spawn(sock):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(sock)
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+    return pid
+
+
+def serve_prod(host, port, workers):
+    """Pre-fork server.
+
+    The MiniLM weights and the assemble_facts frames are loaded once in the
+    master and then frozen out of the GC, so forked workers share those pages
+    copy-on-write instead of each loading their own copy. uvicorn's own
+    `workers=` uses spawn, which would reload everything per process.
+    """
+    import torch
+    from rag.scripts import api
+
+    torch.set_num_threads(TORCH_THREADS_PER_WORKER)
+    api.preload()
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    children = {_spawn(sock) for _ in range(workers)}
+    print(f"Serving on {host}:{port} with {workers} workers: {sorted(children)}")
+
+    state = {"stopping": False, "report": False, "failed": False}
+    crashes = []   # monotonic times of recent worker crashes
+    restarts = []  # monotonic times at which to spawn a replacement worker
+
+    def stop(signum, frame):
+        state["stopping"] = True
+
+    def request_report(signum, frame):
+        state["report"] = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGUSR1, request_report)
+
+    next_report = time.monotonic() + (MEMORY_REPORT_INTERVAL or 5.0)
+    first_report = True
+    while children or restarts:
+        if state["stopping"]:
+            for pid in children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            for pid in list(children):
+                try:
+                    os.waitpid(pid, 0)
+                except ChildProcessError:
+                    pass
+                children.discard(pid)
+            break
+
+        now = time.monotonic()
+        pid, status = os.waitpid(-1, os.WNOHANG) if children else (0, 0)
+        if pid:
+            children.discard(pid)
+            code = os.waitstatus_to_exitcode(status)
+            if code == 0:
+                print(f"Worker {pid} exited; restarting")
+                restarts.append(now)
+            else:
+                crashes = [t for t in crashes if now - t < WORKER_CRASH_WINDOW] + [now]
+                if len(crashes) >= WORKER_MAX_CRASHES:
+                    print(f"Worker {pid} exited with code {code}: {len(crashes)} crashes in "
+                          f"{WORKER_CRASH_WINDOW:.0f}s, giving up", file=sys.stderr)
+                    state["stopping"] = state["failed"] = True
+                    restarts.clear()
+                    continue
+                delay = min(WORKER_RESTART_DELAY * 2 ** (len(crashes) - 1), WORKER_RESTART_DELAY_MAX)
+                print(f"Worker {pid} exited with code {code}; restarting in {delay:.1f}s", file=sys.stderr)
+                restarts.append(now + delay)
+        for due in [t for t in restarts if t <= now]:
+            restarts.remove(due)
+            children.add(_spawn(sock))
+
+        if state["report"] or (now >= next_report and (first_report or MEMORY_REPORT_INTERVAL)):
+            rows = [memory_usage()] + [memory_usage(p) for p in sorted(children)]
+            print("Memory per process (first row is the master):")
+            print(format_memory_report(rows))
+            state["report"] = False
+            first_report = False
+            next_report = now + (MEMORY_REPORT_INTERVAL or 5.0)
+        time.sleep(0.5)
+    sock.close()
+    if state["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Elyx RAG API")
+    parser.add_argument("--prod", action="store_true",
+                        help="pre-fork production mode (no reload, shared preloaded state)")
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--host", default=SERVE_HOST)
+    parser.add_argument("--port", type=int, default=SERVE_PORT)
+    args = parser.parse_args()
+
+    if args.prod:
+        serve_prod(args.host, args.port, max(1, args.workers))
+    else:
+        serve_dev(args.host, args.port)
@@ -2,21 +2,30 @@ from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from .router import route
 from .retriever import retrieve
-from .rag_chain import generate_answer,assemble_facts
+from .rag_chain import generate_answer,assemble_facts,preload_data
+from .coalesce import SingleFlight, ask_key
+from rag.config.settings import CONTEXT_CANDIDATES, RETRIEVE_MMR, MMR_LAMBDA
 from typing import List, Dict, Any, Optional
 app = FastAPI()
 
+# Identical in-flight /ask generations share one LLM call
+GENERATION_FLIGHT = SingleFlight()
+
 
 class RetrieveRequest(BaseModel):
     query: str
     role: str
     k: Optional[int] = 8
     since: Optional[str] = None  # 👈 must be string, not datetime
+    mmr: Optional[bool] = RETRIEVE_MMR
+    mmr_lambda: Optional[float] = MMR_LAMBDA
 
 class QueryRequest(BaseModel):
     question: str
     role: Optional[str] = "Ruby"
     since: Optional[str] = None
+    mmr: Optional[bool] = RETRIEVE_MMR
+    mmr_lambda: Optional[float] = MMR_LAMBDA
 
 @app.get("/")
 def root():
@@ -32,6 +41,33 @@ async def list_roles():
         "default_role": "Ruby"
     }
 
+def preload():
+    """Load model weights and data frames up front (before workers fork)"""
+    from rag.utils.text import MODEL
+    MODEL.encode(["warmup"], convert_to_numpy=True)
+    preload_data()
+
+@app.get("/stats")
+def stats():
+    """Serving counters for the embedding batcher and /ask coalescing"""
+    from rag.utils.text import BATCHER
+    from rag.utils.memory import memory_usage
+    return {
+        "embed_batcher": BATCHER.stats(),
+        "generation": GENERATION_FLIGHT.stats(),
+        "memory": memory_usage(),
+    }
+
+@app.post("/retrieve")
+def retrieve_endpoint(request: RetrieveRequest):
+    """Retrieval only (no facts, no LLM call)"""
+    try:
+        results = retrieve(query=request.query, role=request.role, k=request.k, since=request.since,
+                           mmr=request.mmr, mmr_lambda=request.mmr_lambda)
+        return {"role": request.role, "results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # @app.post("/ask")
 # async def ask_endpoint(request: QueryRequest):
 #     try:
@@ -69,27 +105,36 @@ async def list_roles():
 
 import traceback
 
+# Plain `def` so FastAPI runs each request in its threadpool; concurrent
+# requests then reach the embedding micro-batcher together.
 @app.post("/ask")
-async def ask_endpoint(request: QueryRequest):
+def ask_endpoint(request: QueryRequest):
     try:
         selected_role = route(request.question, request.role)
         print("Selected role:", selected_role)
 
-        retrieved = retrieve(query=request.question, role=selected_role, since=request.since)
+        # Over-fetch; generate_answer packs the best of these into the token budget
+        retrieved = retrieve(query=request.question, role=selected_role, k=CONTEXT_CANDIDATES, since=request.since,
+                             mmr=request.mmr, mmr_lambda=request.mmr_lambda)
         print("Retrieved:", retrieved)
 
         facts = assemble_facts(selected_role, request.since)
         print("Facts:", facts)
 
-        answer = generate_answer(
+        key = ask_key(request.question, selected_role, request.since, retrieved)
+        answer, sources = GENERATION_FLIGHT.do(
+            key,
+            generate_answer,
             role=selected_role,
             question=request.question,
             facts=facts,
-            retrieved_docs=retrieved
+            retrieved_docs=retrieved,
+            keep_order=request.mmr  # MMR's diversity order, not back to raw similarity
         )
         print("Answer:", answer)
 
-        return {"role": selected_role, "answer": answer, "sources": [doc["id"] for doc in retrieved]}
+        # Sources are the docs that made it into the prompt, not every candidate
+        return {"role": selected_role, "answer": answer, "sources": sources}
     except Exception as e:
         print("🔥 ERROR in /ask endpoint:", str(e))
         traceback.print_exc()   # full stack trace in terminal
@@ -0,0 +1,61 @@
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key.
+
+    The first caller for a key runs `fn`; anyone arriving with that key before
+    it finishes waits on the same future instead of issuing a second call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight[key] = fut
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return fut.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            inflight = len(self._inflight)
+        return {"calls": self.calls, "coalesced": self.coalesced, "inflight": inflight}
+
+
+def ask_key(question: str, role: str, since: Optional[str], retrieved_docs: List[Dict]) -> str:
+    """Key for an /ask generation: normalized question, role, since and retrieved docs"""
+    normalized = " ".join(question.lower().split())
+    docs = hashlib.sha1()
+    for doc in retrieved_docs:
+        docs.update(doc["id"].encode())
+        docs.update(b"\0")
+        docs.update(doc["text"].encode())
+        docs.update(b"\0")
+    return "|".join([normalized, role, str(since or ""), docs.hexdigest()])
@@ -8,7 +8,9 @@ import sys
 from pathlib import Path
 from chromadb.config import Settings
 from rag.utils.text import embed  # This now uses Gemini embeddings
-from rag.utils.io import load_csv
+from rag.utils.io import load_csv, read_table
+from rag.simulation.chat_sink import SIM_CHATS, SIM_CONVERSATIONS, read_new
+import json
 import time  # For rate limiting
 
 project_root = Path(__file__).parent.parent
@@ -26,27 +28,39 @@ client = chromadb.PersistentClient(
     )
 )
 
-# Delete existing collection to recreate with correct settings
-try:
-    client.delete_collection("elyx_docs")
-    print("Deleted existing collection to reset with new embedding settings.")
-except:
-    print("Creating new collection")
+COLLECTION_METADATA = {
+    "hnsw:space": "cosine",
+    "embedding_dimensions": 384,
+}
+
+# Simulator chat logs (ChatSink) and the read_new cursors of the rows already upserted
+CHAT_LOGS = [SIM_CHATS, SIM_CONVERSATIONS]
+CHAT_CURSORS = chroma_path / "chat_cursors.json"
 
 # Create collection without embedding function since we're providing our own embeddings
-collection = client.create_collection(
-    name="elyx_docs",
-    metadata={
-        "hnsw:space": "cosine",
-        "embedding_dimensions": 384,
-    } 
-)
+collection = client.get_or_create_collection(name="elyx_docs", metadata=COLLECTION_METADATA)
+
+def reset_collection():
+    """Delete existing collection to recreate with correct settings"""
+    global collection
+    try:
+        client.delete_collection("elyx_docs")
+        print("Deleted existing collection to reset with new embedding settings.")
+    except:
+        print("Creating new collection")
+    collection = client.create_collection(name="elyx_docs", metadata=COLLECTION_METADATA)
+    if CHAT_CURSORS.exists():
+        CHAT_CURSORS.unlink()
 
 def process_row(row, data_type):
     """Convert CSV row to document format with type-specific handling"""
     # Create doc_id based on date or month field
     if data_type == "kpi":
         doc_id = f"{data_type}:{row['month']}"
+    elif data_type == "chat":
+        doc_id = f"{data_type}:{row['log']}:{row.name}"  # row.name: position in the chat log
+    elif data_type == "intervention":
+        doc_id = f"{data_type}:{row['date']}:{row['rule_id']}"  # several rules can fire on one day
     else:
         doc_id = f"{data_type}:{row['date']}"
     
@@ -133,6 +147,16 @@ def process_row(row, data_type):
             f"notes:{row['notes'][:50]}..."  # Truncate long notes
         ]
 
+    elif data_type == "chat":
+        date = row.get("timestamp") or row.get("date")
+        metadata.update({
+            "date": str(date)[:10],
+            "sender": row["sender"]
+        })
+        text_fields = [f"{row['sender']}: {row['message']}"]
+        if row.get("response"):
+            text_fields.append(f"reply: {row['response']}")
+
     # Convert all values to strings for text field
     text_fields = [str(field) for field in text_fields]
     
@@ -142,7 +166,82 @@ def process_row(row, data_type):
         "metadata": metadata
     }
 
+def upsert_docs(docs):
+    """Batch upsert with Gemini embeddings; True when every batch landed"""
+    batch_size = 50  # Reduced for Gemini API rate limits
+    total_docs = len(docs)
+    ok = True
+    print(f"Total documents to ingest: {total_docs}")
+    
+    for i in range(0, total_docs, batch_size):
+        batch = docs[i:i+batch_size]
+        try:
+            # Get texts for embedding
+            texts = [doc["text"] for doc in batch]
+            
+            # Generate embeddings with Gemini (API call)
+            embeddings = embed(texts)
+            
+            # Prepare data for Chroma
+            ids = [doc["id"] for doc in batch]
+            metadatas = [doc["metadata"] for doc in batch]
+            documents = [doc["text"] for doc in batch]
+            
+            collection.upsert(
+                ids=ids,
+                embeddings=embeddings,
+                metadatas=metadatas,
+                documents=documents
+            )
+            print(f"Upserted batch {i//batch_size + 1}/{(total_docs-1)//batch_size + 1}")
+            
+            # Add delay to avoid rate limiting (Gemini has 60 RPM free tier)
+            time.sleep(1.5)
+            
+        except Exception as e:
+            print(f"Failed to upsert batch {i//batch_size + 1}: {str(e)}")
+            ok = False
+            # Add extra delay on error
+            time.sleep(5)
+    return ok
+
+def load_chat_cursors():
+    if CHAT_CURSORS.exists():
+        return json.loads(CHAT_CURSORS.read_text())
+    return {}
+
+def save_chat_cursors(cursors):
+    CHAT_CURSORS.write_text(json.dumps(cursors))
+
+def new_chat_docs(path, cursor):
+    """Docs for the chat-log rows checkpointed since `cursor`, and the cursor past them"""
+    df, cursor = read_new(path, cursor)
+    if cursor is None:
+        return [], None
+    df = df.assign(log=os.path.splitext(os.path.basename(path))[0]).replace({np.nan: None})
+    docs = [process_row(row, "chat") for _, row in df.iterrows()]
+    print(f"Processed {len(docs)} new chat rows from {path}")
+    return docs, cursor
+
+def ingest_chat_logs(cursors):
+    """Upsert each chat log's new rows; its cursor only advances once all of its batches landed"""
+    for path in CHAT_LOGS:
+        docs, cursor = new_chat_docs(path, cursors.get(path))
+        if cursor is None:
+            continue
+        if upsert_docs(docs):
+            cursors[path] = cursor
+        else:
+            print(f"Keeping the cursor for {path}; its new rows are retried on the next run")
+    save_chat_cursors(cursors)
+
+def ingest_new_chats():
+    """Upsert only the simulator chat rows flushed since the last ingestion"""
+    ingest_chat_logs(load_chat_cursors())
+    print(f"Chat ingestion complete. Total documents: {collection.count()}")
+
 def ingest_data():
+    reset_collection()
     docs = []
     
     # Load profile from YAML
@@ -180,7 +279,7 @@ def ingest_data():
     
     for data_type, path in csv_mapping:
         try:
-            df = pd.read_csv(path)
+            df = read_table(path)  # Parquet sibling when present, dates already typed
             # Convert date columns to string format
             if "date" in df.columns:
                 df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
@@ -194,44 +293,19 @@ def ingest_data():
             print(f"Error processing {path}: {str(e)}")
             continue
     
-    # Batch upsert with Gemini embeddings
-    batch_size = 50  # Reduced for Gemini API rate limits
-    total_docs = len(docs)
-    print(f"Total documents to ingest: {total_docs}")
-    
-    for i in range(0, total_docs, batch_size):
-        batch = docs[i:i+batch_size]
-        try:
-            # Get texts for embedding
-            texts = [doc["text"] for doc in batch]
-            
-            # Generate embeddings with Gemini (API call)
-            embeddings = embed(texts)
-            
-            # Prepare data for Chroma
-            ids = [doc["id"] for doc in batch]
-            metadatas = [doc["metadata"] for doc in batch]
-            documents = [doc["text"] for doc in batch]
-            
-            collection.upsert(
-                ids=ids,
-                embeddings=embeddings,
-                metadatas=metadatas,
-                documents=documents
-            )
-            print(f"Upserted batch {i//batch_size + 1}/{(total_docs-1)//batch_size + 1}")
-            
-            # Add delay to avoid rate limiting (Gemini has 60 RPM free tier)
-            time.sleep(1.5)
-            
-        except Exception as e:
-            print(f"Failed to upsert batch {i//batch_size + 1}: {str(e)}")
-            # Add extra delay on error
-            time.sleep(5)
-
+    upsert_docs(docs)
+    ingest_chat_logs({})
     print(f"Ingestion complete. Total documents: {collection.count()}")
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Ingest the generated datasets into Chroma")
+    parser.add_argument("--chats-only", action="store_true",
+                        help="keep the collection and add only newly flushed simulator chats")
+    args = parser.parse_args()
+    if args.chats_only:
+        ingest_new_chats()
+        raise SystemExit
     ingest_data()
     print("\n=== Storage Verification ===")
     print(f"Collection count: {collection.count()}")
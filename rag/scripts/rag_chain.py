@@ -2,9 +2,10 @@ import google.generativeai as genai
 import os
 from tenacity import retry, wait_exponential, stop_after_attempt
 import re
+import difflib
 import pandas as pd
 from rag.utils.text import embed
-from rag.utils.io import load_csv
+from rag.utils.io import load_csv, read_table, table_mtime
 import tiktoken
 from datetime import datetime
 import json
@@ -13,13 +14,44 @@ import torch
 import time
 from dotenv import load_dotenv
 load_dotenv()  # Before using os.getenv()
+from rag.config.settings import CONTEXT_TOKEN_BUDGET, CONTEXT_DEDUP_RATIO
 tokenizer = tiktoken.get_encoding("cl100k_base")
 flan_tokenizer = None
 flan_model = None
 def count_tokens(text: str) -> int:
     """Count tokens in a string"""
     return len(tokenizer.encode(text))
-def log_prompt(prompt: str, role: str, token_count: int):
+# Data files behind assemble_facts and the only columns it uses from each;
+# cached per process and preloaded before the production server forks so
+# workers share the frames copy-on-write.
+DATA_FILES = {
+    "data/labs_quarterly.csv": ["date", "ldl_mgdl", "apob_mgdl"],
+    "data/daily.csv": ["date", "rhr_bpm", "hrv_ms", "caloric_balance_kcal"],
+    "data/body_comp.csv": ["date", "dexa_bodyfat_percent", "dexa_lean_mass_kg"],
+    "data/fitness.csv": ["date", "fms_score"],
+    "data/interventions.csv": ["date", "action"],
+    "data/events.csv": ["date", "event_type", "notes"],
+    "data/kpis_monthly.csv": ["month", "adherence_avg", "rationale_coverage_percent"],
+}
+_frame_cache = {}
+
+def read_data(path: str) -> pd.DataFrame:
+    """Read the projected columns of a dataset (Parquet when present), cached until it changes"""
+    mtime = table_mtime(path)
+    cached = _frame_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    df = read_table(path, columns=DATA_FILES[path])
+    _frame_cache[path] = (mtime, df)
+    return df
+
+def preload_data():
+    """Load every assemble_facts input into the cache"""
+    for path in DATA_FILES:
+        if table_mtime(path):
+            read_data(path)
+
+def log_prompt(prompt: str, role: str, token_count: int, packing: dict = None):
     """Log prompts for analysis"""
     log_entry = {
         "timestamp": datetime.now().isoformat(),
@@ -27,6 +59,8 @@ def log_prompt(prompt: str, role: str, token_count: int):
         "token_count": token_count,
         "prompt_sample": prompt[:200] + "..." if len(prompt) > 200 else prompt
     }
+    if packing:
+        log_entry["packing"] = packing
     
     # Append to log file
     with open("prompt_logs.ndjson", "a") as f:
@@ -66,6 +100,108 @@ ROLE_PROMPTS = {
            "and to connect day-to-day work to the client's highest-level goals and program value. "
            "Voice: Strategic, reassuring, and focused on the big picture. Provide context and long-term vision.",
 }
+# Context token budget (facts + docs) per role; summarising roles get more room
+ROLE_CONTEXT_BUDGETS = {
+    "Ruby": int(CONTEXT_TOKEN_BUDGET * 1.5),
+    "Dr. Warren": CONTEXT_TOKEN_BUDGET,
+    "Advik": CONTEXT_TOKEN_BUDGET,
+    "Carla": CONTEXT_TOKEN_BUDGET,
+    "Rachel": CONTEXT_TOKEN_BUDGET,
+    "Neel": int(CONTEXT_TOKEN_BUDGET * 1.5),
+}
+
+def _is_near_duplicate(norm_text: str, kept: list, ratio: float) -> bool:
+    for other in kept:
+        sm = difflib.SequenceMatcher(None, norm_text, other)
+        # cheap upper bounds first, exact ratio only when they pass
+        if sm.real_quick_ratio() >= ratio and sm.quick_ratio() >= ratio and sm.ratio() >= ratio:
+            return True
+    return False
+
+def _truncate_tokens(line, tokens, min_tokens=16):
+    """`line` cut to fit `tokens` (newline included) with an ellipsis, or None if under min_tokens fit"""
+    keep = tokens - count_tokens("…\n")
+    if keep < min_tokens:
+        return None
+    ids = tokenizer.encode(line)[:keep]
+    while ids:
+        cut = tokenizer.decode(ids) + "…"
+        if count_tokens(cut + "\n") <= tokens:
+            return cut
+        ids = ids[:-1]
+    return None
+
+def pack_context(role, facts, retrieved_docs, budget=None, keep_order=False):
+    """
+    Greedily fill the role's token budget: facts first (in order), then
+    retrieved docs by score, skipping near-duplicates of docs already packed.
+    keep_order packs docs in the order given instead (an MMR ranking).
+    Returns (context, packed_docs, stats)
+    """
+    budget = budget or ROLE_CONTEXT_BUDGETS.get(role, CONTEXT_TOKEN_BUDGET)
+    fact_lines = facts if isinstance(facts, list) else (facts or "").splitlines()
+    fact_lines = [line for line in fact_lines if line.strip()]
+
+    used = 0
+    packed_facts = []
+    for line in fact_lines:
+        n = count_tokens(line + "\n")
+        if used + n <= budget:
+            packed_facts.append(line)
+            used += n
+    facts_tokens = used
+
+    # Stable sort keeps retrieval order for docs without a score
+    ranked = list(retrieved_docs) if keep_order else sorted(
+        retrieved_docs,
+        key=lambda doc: doc.get("score") if doc.get("score") is not None else float("-inf"),
+        reverse=True,
+    )
+    packed_docs, doc_lines, kept = [], [], []
+    duplicates = over_budget = truncated = 0
+    for doc in ranked:
+        norm = " ".join(doc["text"].lower().split())
+        if _is_near_duplicate(norm, kept, CONTEXT_DEDUP_RATIO):
+            duplicates += 1
+            continue
+        line = f"[{doc['id']}] {doc['text']}"
+        n = count_tokens(line + "\n")
+        if used + n > budget:
+            # A doc too long for the whole docs budget is cut to what is left rather than lost;
+            # one that only misses because of earlier docs leaves the room to smaller ones
+            if n <= budget - facts_tokens:
+                over_budget += 1
+                continue
+            line = _truncate_tokens(line, budget - used)
+            if line is None:
+                over_budget += 1
+                continue
+            n = count_tokens(line + "\n")
+            truncated += 1
+        packed_docs.append(doc)
+        doc_lines.append(line)
+        kept.append(norm)
+        used += n
+
+    context = "## FACTS\n" + ("\n".join(packed_facts) if packed_facts else "No facts available.")
+    if doc_lines:
+        context += "\n\n## CONTEXT\n" + "\n".join(doc_lines)
+
+    stats = {
+        "budget_tokens": budget,
+        "facts_tokens": facts_tokens,
+        "docs_tokens": used - facts_tokens,
+        "context_tokens": count_tokens(context),
+        "facts_packed": len(packed_facts),
+        "facts_total": len(fact_lines),
+        "docs_packed": len(packed_docs),
+        "docs_total": len(retrieved_docs),
+        "docs_near_duplicate": duplicates,
+        "docs_over_budget": over_budget,
+        "docs_truncated": truncated,
+    }
+    return context, packed_docs, stats
+
 def load_gemini_keys():
     """Load and validate Gemini API keys from environment"""
     raw_keys =  ""
@@ -170,34 +306,29 @@ def try_openrouter_generation(full_prompt: str, role: str):
 
 
 
-def generate_answer(role, question, facts, retrieved_docs):
+def generate_answer(role, question, facts, retrieved_docs, keep_order=False):
     """
     Generate answer using Gemini Pro API with strict citation requirements
     Maintains all original constraints and formatting
+    keep_order: pack retrieved_docs in their given (MMR) order, not by score
+    Returns (answer, ids of the docs packed into the prompt)
     """
-    # Construct context with citations
-    if isinstance(facts, list):
-        facts_text = "\n".join(facts) if facts else "No facts available."
-    else:
-        facts_text = facts or "No facts available."
-    
-    context = "## FACTS\n" + facts_text
-    context = "\n".join(f"[Doc {i+1}]: {doc['text']}" 
-            for i, doc in enumerate(retrieved_docs[:3]))  # Use only 3 docs max
+    # Construct context with citations, packed into the role's token budget
+    context, packed_docs, packing = pack_context(role, facts, retrieved_docs, keep_order=keep_order)
 
     # Build system prompt with strict constraints
     system_prompt = (
         f"{ROLE_PROMPTS[role]}\n\n"
         "STRICT RULES:\n"
-"1. Use only Facts/Context"
-"2. ≤5 sentences, WhatsApp style"
-"3. Cite [doc_id] after facts"
-"4. No fake nums/dates/interventions"
+"1. Use only Facts/Context\n"
+"2. ≤5 sentences, WhatsApp style\n"
+"3. Cite [doc_id] after facts\n"
+"4. No fake nums/dates/interventions\n"
 "5. Stay in role; else refer"
     )
     
     # Create the full prompt
-    full_prompt = f"{system_prompt}{context}\n\nQuestion: {question}\nAnswer:"
+    full_prompt = f"{system_prompt}\n\n{context}\n\nQuestion: {question}\nAnswer:"
     input_tokens = count_tokens(full_prompt)
     
     # Generation attempts with fallback
@@ -213,7 +344,7 @@ def generate_answer(role, question, facts, retrieved_docs):
         response = try_openrouter_generation(full_prompt, role)
         model_used = "OpenRouter"
     input_tokens = count_tokens(full_prompt)
-    log_prompt(full_prompt, role, input_tokens)
+    log_prompt(full_prompt, role, input_tokens, packing)
     
     print(f"\n=== Current Prompt ({input_tokens} tokens) ===")
     print(full_prompt[:500] + "..." if len(full_prompt) > 500 else full_prompt)
@@ -222,7 +353,7 @@ def generate_answer(role, question, facts, retrieved_docs):
     
     # Post-process to enforce citations
     answer = response
-    return enforce_citations(answer, retrieved_docs)
+    return enforce_citations(answer, packed_docs), [doc["id"] for doc in packed_docs]
 def enforce_citations(answer, retrieved_docs):
     """
     Ensure every factual claim has at least one citation
@@ -246,43 +377,43 @@ def assemble_facts(role, since=None):
     facts = []
     
     if role == "Dr. Warren":
-        labs = pd.read_csv("data/labs_quarterly.csv")
+        labs = read_data("data/labs_quarterly.csv")
         latest = labs.sort_values("date").iloc[-1]
-        facts.append(f"Latest LDL: {latest['ldl_mgdl']} mg/dL [labs:{latest['date']}]")
-        facts.append(f"Latest ApoB: {latest['apob_mgdl']} mg/dL [labs:{latest['date']}]")
+        facts.append(f"Latest LDL: {latest['ldl_mgdl']} mg/dL [labs:{latest['date']:%Y-%m-%d}]")
+        facts.append(f"Latest ApoB: {latest['apob_mgdl']} mg/dL [labs:{latest['date']:%Y-%m-%d}]")
     
     elif role == "Advik":
-        daily = pd.read_csv("data/daily.csv")
+        daily = read_data("data/daily.csv")
         latest = daily.sort_values("date").iloc[-1]
-        facts.append(f"Latest RHR: {latest['rhr_bpm']} bpm [daily:{latest['date']}]")
-        facts.append(f"Latest HRV: {latest['hrv_ms']} ms [daily:{latest['date']}]")
+        facts.append(f"Latest RHR: {latest['rhr_bpm']} bpm [daily:{latest['date']:%Y-%m-%d}]")
+        facts.append(f"Latest HRV: {latest['hrv_ms']} ms [daily:{latest['date']:%Y-%m-%d}]")
         
     elif role == "Carla":
-        daily = pd.read_csv("data/daily.csv")
-        body_comp = pd.read_csv("data/body_comp.csv")
+        daily = read_data("data/daily.csv")
+        body_comp = read_data("data/body_comp.csv")
         latest_daily = daily.sort_values("date").iloc[-1]
         latest_comp = body_comp.sort_values("date").iloc[-1]
-        facts.append(f"Latest caloric balance: {latest_daily['caloric_balance_kcal']} kcal [daily:{latest_daily['date']}]")
-        facts.append(f"Latest body fat: {latest_comp['dexa_bodyfat_percent']}% [body_comp:{latest_comp['date']}]")
+        facts.append(f"Latest caloric balance: {latest_daily['caloric_balance_kcal']} kcal [daily:{latest_daily['date']:%Y-%m-%d}]")
+        facts.append(f"Latest body fat: {latest_comp['dexa_bodyfat_percent']}% [body_comp:{latest_comp['date']:%Y-%m-%d}]")
         
     elif role == "Rachel":
-        fitness = pd.read_csv("data/fitness.csv")
-        body_comp = pd.read_csv("data/body_comp.csv")
+        fitness = read_data("data/fitness.csv")
+        body_comp = read_data("data/body_comp.csv")
         latest_fitness = fitness.sort_values("date").iloc[-1]
         latest_comp = body_comp.sort_values("date").iloc[-1]
-        facts.append(f"Latest FMS score: {latest_fitness['fms_score']} [fitness:{latest_fitness['date']}]")
-        facts.append(f"Latest lean mass: {latest_comp['dexa_lean_mass_kg']} kg [body_comp:{latest_comp['date']}]")
+        facts.append(f"Latest FMS score: {latest_fitness['fms_score']} [fitness:{latest_fitness['date']:%Y-%m-%d}]")
+        facts.append(f"Latest lean mass: {latest_comp['dexa_lean_mass_kg']} kg [body_comp:{latest_comp['date']:%Y-%m-%d}]")
         
     elif role == "Ruby":
-        interventions = pd.read_csv("data/interventions.csv")
-        events = pd.read_csv("data/events.csv")
+        interventions = read_data("data/interventions.csv")
+        events = read_data("data/events.csv")
         latest_intervention = interventions.sort_values("date").iloc[-1]
         latest_event = events.sort_values("date").iloc[-1]
-        facts.append(f"Latest intervention: {latest_intervention['action']} [intervention:{latest_intervention['date']}]")
-        facts.append(f"Latest event: {latest_event['event_type']} - {latest_event['notes'][:30]}... [event:{latest_event['date']}]")
+        facts.append(f"Latest intervention: {latest_intervention['action']} [intervention:{latest_intervention['date']:%Y-%m-%d}:{latest_intervention['rule_id']}]")
+        facts.append(f"Latest event: {latest_event['event_type']} - {latest_event['notes'][:30]}... [event:{latest_event['date']:%Y-%m-%d}]")
         
     elif role == "Neel":   
-        kpi = pd.read_csv("data/kpis_monthly.csv")
+        kpi = read_data("data/kpis_monthly.csv")
         latest = kpi.sort_values("month").iloc[-1]
         facts.append(f"Monthly adherence: {latest['adherence_avg']} [kpi:{latest['month']}]")
         facts.append(f"Value coverage: {latest['rationale_coverage_percent']}% [kpi:{latest['month']}]")
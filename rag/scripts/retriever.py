@@ -1,5 +1,6 @@
-from rag.utils.text import embed
+from rag.utils.text import embed, embed_query, MODEL
 import chromadb
+import numpy as np
 from pathlib import Path
 from chromadb.config import Settings
 from datetime import datetime
@@ -7,25 +8,50 @@ from typing import List, Dict, Any, Optional
 # Chroma path (must match ingestion path)
 from sentence_transformers import SentenceTransformer
 from datetime import datetime, timezone
-# Initialize model at startup (not per-request)
-EMBEDDING_MODEL = SentenceTransformer('all-MiniLM-L6-v2')  # 384-dim embeddings
+# Reuse the shared model from rag.utils.text instead of loading a second copy
+EMBEDDING_MODEL = MODEL  # 384-dim embeddings
 CHROMA_PATH = Path(__file__).parent.parent / "chroma"
 from rag.scripts.router import route
-# Initialize client
-client = chromadb.PersistentClient(
-    path=str(CHROMA_PATH),
-    settings=Settings(anonymized_telemetry=False),
-    
-)
+from rag.config.settings import MMR_FETCH_MULTIPLIER, MMR_LAMBDA
+client = None
+collection = None
+space = "l2"
+
+# Chroma distance -> score (higher is more similar) per the collection's hnsw:space.
+# cosine and ip distances are 1 - similarity; l2 (squared, unnormalized vectors)
+# has no similarity scale, so its score only preserves the ranking.
+SCORES = {
+    "cosine": lambda d: 1.0 - d,
+    "ip": lambda d: 1.0 - d,
+    "l2": lambda d: -d,
+}
+
+def connect():
+    """(Re)open the Chroma client and collection.
 
+    Called at import and again in each forked worker: SQLite handles must not
+    be shared across fork. Chroma caches one System per path at class level
+    (inherited by the child), so that cache is dropped first or the worker
+    would get the master's System and its connections back.
+    """
+    global client, collection, space
+    if client is not None:
+        type(client).clear_system_cache()
+    client = chromadb.PersistentClient(
+        path=str(CHROMA_PATH),
+        settings=Settings(anonymized_telemetry=False),
+    )
+    try:
+        collection = client.get_collection("elyx_docs")
+        space = (collection.metadata or {}).get("hnsw:space", "l2")  # Chroma's default space
+    except Exception as e:
+        print(f"Collection error: {str(e)}")
+        print("Available collections:", [col.name for col in client.list_collections()])
+        raise
+    return collection
 
-# Access collection
-try:
-    collection = client.get_collection("elyx_docs")
-except Exception as e:
-    print(f"Collection error: {str(e)}")
-    print("Available collections:", [col.name for col in client.list_collections()])
-    raise
+# Initialize client
+connect()
 
 # # 2. Initialize client with error handling
 # def get_chroma_collection():
@@ -87,7 +113,37 @@ def _normalize_date(since: Optional[str]) -> Optional[str]:
         # Assume caller gave ISO date already; you may still want to validate
         return since
 
-def retrieve(query, role=None, k=3, since=None):
+def mmr_select(query_vec, doc_vecs, k: int, lambda_mult: float = MMR_LAMBDA) -> List[int]:
+    """
+    Maximal marginal relevance: pick k indices of doc_vecs, trading relevance
+    to the query (lambda_mult=1) against similarity to already picked docs
+    (lambda_mult=0). Vectors are cosine-normalized here.
+    """
+    docs = np.asarray(doc_vecs, dtype=np.float32)
+    if len(docs) == 0 or k <= 0:
+        return []
+    q = np.asarray(query_vec, dtype=np.float32)
+    docs = docs / np.maximum(np.linalg.norm(docs, axis=1, keepdims=True), 1e-12)
+    q = q / max(float(np.linalg.norm(q)), 1e-12)
+
+    relevance = docs @ q
+    redundancy = np.full(len(docs), -np.inf, dtype=np.float32)
+    picked = np.zeros(len(docs), dtype=bool)
+    order = []
+    for _ in range(min(k, len(docs))):
+        if order:
+            scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        else:
+            scores = relevance.copy()
+        scores[picked] = -np.inf
+        best = int(np.argmax(scores))
+        order.append(best)
+        picked[best] = True
+        # running max similarity of every candidate to the picked set
+        redundancy = np.maximum(redundancy, docs @ docs[best])
+    return order
+
+def retrieve(query, role=None, k=3, since=None, mmr=False, mmr_lambda=MMR_LAMBDA, fetch_k=None):
     if(role ==None):
         role = route(query)
     normalized_role = normalize_role(role)
@@ -101,17 +157,33 @@ def retrieve(query, role=None, k=3, since=None):
     # if since:
     #     where["date"] = {"$gte": since}
     
-    results = collection.query(
-        query_embeddings=[embed([query])[0]],
-        n_results=k,
-        where=where
-    )
+    query_vec = embed_query(query)
+    if mmr:
+        # Over-fetch with embeddings, then rerank for diversity in NumPy
+        results = collection.query(
+            query_embeddings=[query_vec],
+            n_results=fetch_k or k * MMR_FETCH_MULTIPLIER,
+            where=where,
+            include=["documents", "metadatas", "distances", "embeddings"]
+        )
+        order = mmr_select(query_vec, results["embeddings"][0], k, mmr_lambda)
+    else:
+        results = collection.query(
+            query_embeddings=[query_vec],
+            n_results=k,
+            where=where
+        )
+        order = range(len(results["ids"][0]))
     
+    # Full text is returned; generate_answer packs docs into a token budget
+    distances = results.get("distances") or [[None] * len(results["ids"][0])]
+    score = SCORES.get(space, SCORES["l2"])
     return [
         {
-            "text": results["documents"][0][i][:300],
+            "text": results["documents"][0][i],
             "metadata": results["metadatas"][0][i],
-            "id": results["ids"][0][i]
+            "id": results["ids"][0][i],
+            "score": None if distances[0][i] is None else score(distances[0][i])
         }
-        for i in range(len(results["ids"][0]))
+        for i in order
     ]
@@ -0,0 +1,204 @@
+"""Concurrent multi-member chat simulation on asyncio.
+
+Each member gets its own virtual Timeline and ChatSimulator state and runs
+sim.py's conversation steps (only the calls they yield are awaited here); all members share one pooled httpx.AsyncClient
+(rag.utils.http_client, with the same timeouts and jittered retries as sim.py).
+A global semaphore caps in-flight requests and a per-API rate limiter spaces
+calls across the whole cohort (replacing APIManager's per-instance
+time.sleep throttle), so waiting on one member's request never blocks another.
+
+    python -m rag.simulation.async_sim --members 50 --days 240 --concurrency 1 8 32
+
+prints simulated member-days per second for each concurrency level and writes
+the chats of the last run (with member_id) to --out through a ChatSink.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from ..utils.http_client import apost, async_client
+from .chat_sink import ChatSink
+from .sim import (ELYX_API, ELYX_BUSY, ELYX_NO_ANSWER, MODELS, OPENROUTER_API, APIManager,
+                  ChatSimulator, EventManager, Member, Timeline)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+EVENTS_JSON = os.path.join(ROOT, "rag", "data", "elyx_intervention_loop_8months.json")
+OUTPUT_CSV = os.path.join(ROOT, "data", "sim_cohort_chats.csv")
+
+# calls per second per API across all members (None = only the concurrency cap)
+RATES = {"openrouter": 2.0, "elyx": None}
+CHAT_FIELDS = ["member_id", "timestamp", "sender", "message"]
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart; waiters sleep without blocking the loop."""
+
+    def __init__(self, rate: Optional[float]):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class AsyncAPI(APIManager):
+    """APIManager's key/model rotation and fallbacks over a shared async client."""
+
+    def __init__(self, client: httpx.AsyncClient, concurrency=32, rates=None,
+                 elyx_url=ELYX_API, openrouter_url=OPENROUTER_API):
+        super().__init__()
+        self.client = client
+        self.slots = asyncio.Semaphore(concurrency)
+        self.limits = {name: RateLimiter(rate) for name, rate in {**RATES, **(rates or {})}.items()}
+        self.elyx_url = elyx_url
+        self.openrouter_url = openrouter_url
+        self.calls = {name: 0 for name in self.limits}
+
+    async def post(self, api: str, url: str, **kwargs) -> httpx.Response:
+        await self.limits[api].wait()
+        async with self.slots:
+            self.calls[api] += 1
+            return await apost(self.client, url, **kwargs)
+
+    async def call_api(self, api_type: str, payload: Dict) -> Optional[str]:
+        try:
+            response = await self.post(
+                api_type, self.openrouter_url,
+                headers={
+                    "Authorization": f"Bearer {self.rotate_key('openrouter')}",
+                    "HTTP-Referer": "https://yourdomain.com",
+                    "X-Title": "Elyx Health"
+                },
+                json={"model": self.rotate_model("openrouter"), "messages": payload["messages"],
+                      "max_tokens": 150},
+                timeout=10)
+            if response.status_code == 200:
+                return response.json()["choices"][0]["message"]["content"]
+            return None
+        except (httpx.HTTPError, KeyError, ValueError):
+            return None
+
+    async def get_response(self, api_type: str, prompt: str, role: str = None) -> str:
+        """Primary model, then the alternate model, then a local fallback message"""
+        payload = {"messages": [{"role": "user", "content": prompt}]}
+        for _ in range(len(MODELS[api_type])):
+            response = await self.call_api(api_type, payload)
+            if response:
+                return response
+        return random.choice(self.fallbacks["member"])
+
+    async def ask_elyx(self, message: str, role: str) -> str:
+        try:
+            response = await self.post("elyx", self.elyx_url,
+                                       json={"question": message, "role": role, "since": "2025-01-01"})
+            if response.status_code == 200:
+                return response.json().get("answer", "Let me check on that.")
+            return ELYX_NO_ANSWER
+        except (httpx.HTTPError, ValueError):
+            return ELYX_BUSY
+
+
+class AsyncChatSimulator(ChatSimulator):
+    """ChatSimulator whose API calls are awaited; one instance per member."""
+
+    def __init__(self, timeline: Timeline, member: Member, api: AsyncAPI, member_id: str, sink=None):
+        super().__init__(timeline, member, event_manager=EventManager(timeline, json_file=EVENTS_JSON),
+                         sink=sink)
+        self.api = api
+        self.member_id = member_id
+
+    def _add_chat_entry(self, sender: str, message: str):
+        self._log({
+            "member_id": self.member_id,
+            "timestamp": self.timeline.get_current_time(),
+            "sender": sender,
+            "message": message
+        })
+
+    async def simulate_day(self):
+        await self._run(self._day_steps())
+
+    async def _run(self, steps):
+        reply = None
+        while True:
+            try:
+                request = steps.send(reply)
+            except StopIteration:
+                return
+            reply = await self._call(request)
+
+    async def _call(self, request):
+        kind, *args = request
+        if kind == "llm":
+            return await self.api.get_response("openrouter", *args)
+        if kind == "ask":
+            return await self.api.ask_elyx(*args)
+        if self.timeline.pace > 0:
+            await asyncio.sleep(args[0] * self.timeline.pace)
+
+    async def run(self, days: int):
+        for _ in range(days):
+            await self.simulate_day()
+            self.timeline.advance()
+        return self.chat_history
+
+
+async def simulate_cohort(members=10, days=240, concurrency=32, rates=None, pace=0.0,
+                          start_date="2025-01-01", sink=None, **urls):
+    """Run `members` simulations concurrently; returns (chat rows, api call counts).
+
+    Rows also go to `sink` (a ChatSink) as they are produced.
+    """
+    async with async_client(pool_size=concurrency) as client:
+        api = AsyncAPI(client, concurrency=concurrency, rates=rates, **urls)
+        sims = [AsyncChatSimulator(Timeline(start_date, pace=pace), Member(name=f"Member {i + 1}"),
+                                   api, member_id=f"member_{i + 1:04d}", sink=sink)
+                for i in range(members)]
+        histories = await asyncio.gather(*(s.run(days) for s in sims))
+    return [row for h in histories for row in h], api.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many members' chats concurrently")
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--days", type=int, default=240)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32],
+                        help="in-flight request caps to run (one run each)")
+    parser.add_argument("--openrouter-rps", type=float, default=RATES["openrouter"])
+    parser.add_argument("--elyx-rps", type=float, default=0, help="0 = no rate limit")
+    parser.add_argument("--elyx-url", default=ELYX_API)
+    parser.add_argument("--openrouter-url", default=OPENROUTER_API)
+    parser.add_argument("--pace", type=float, default=0.0)
+    parser.add_argument("--out", default=OUTPUT_CSV, help="chat log (.csv, .ndjson or .parquet directory)")
+    args = parser.parse_args()
+
+    rates = {"openrouter": args.openrouter_rps or None, "elyx": args.elyx_rps or None}
+    print(f"{args.members} members x {args.days} days")
+    print(f"{'concurrency':>11} {'seconds':>8} {'days/s':>8} {'messages':>9} {'elyx calls':>11} {'openrouter':>11}")
+    for concurrency in args.concurrency:
+        t0 = time.perf_counter()
+        with ChatSink(args.out, CHAT_FIELDS) as sink:  # each run starts the log afresh
+            rows, calls = asyncio.run(simulate_cohort(
+                args.members, args.days, concurrency, rates=rates, pace=args.pace, sink=sink,
+                elyx_url=args.elyx_url, openrouter_url=args.openrouter_url))
+        elapsed = time.perf_counter() - t0
+        print(f"{concurrency:>11} {elapsed:>8.1f} {args.members * args.days / elapsed:>8.1f} "
+              f"{len(rows):>9} {calls['elyx']:>11} {calls['openrouter']:>11}")
+    print(f"Saved {len(rows)} messages to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""Buffered, crash-safe chat-log writer for the simulators.
+
+ChatSink buffers rows in memory and a background thread writes them out when
+`flush_rows` are pending or every `flush_seconds`. Each flush is a checkpoint:
+the new rows are written and fsynced, then a small <path>.ckpt file recording
+how much of the log is complete is atomically replaced. A crash loses at most
+the rows buffered since the last checkpoint; reopening with append=True trims
+anything written after it.
+
+Formats (from the extension unless given):
+  csv      one file, appended
+  ndjson   one JSON object per line, appended
+  parquet  <path> is a directory of part files, one per flush (pd.read_parquet(<path>) reads them all)
+
+read_new(path, cursor) returns only the rows checkpointed since `cursor`, which
+is how rag/scripts/ingest_csvs.py picks up newly flushed chats.
+"""
+import csv
+import io
+import json
+import os
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Default logs of sim.py (timestamp/sender/message) and main_simulation.py (CSVUpdater)
+SIM_CHATS = os.getenv("SIM_CHATS_PATH", os.path.join(ROOT, "data", "sim_chats.csv"))
+SIM_CONVERSATIONS = os.getenv("SIM_CONVERSATIONS_PATH", os.path.join(ROOT, "data", "sim_conversations.csv"))
+
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".parquet": "parquet"}
+# Typed as timestamps in Parquet parts; everything else is stored as strings
+DATE_FIELDS = ("date", "timestamp", "datetime")
+
+def log_format(path, fmt=None):
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in FORMATS.values():
+        raise ValueError(f"unknown chat log format for {path!r}: {fmt!r} (csv, ndjson or parquet)")
+    return fmt
+
+def checkpoint_path(path):
+    return path + ".ckpt"
+
+def read_checkpoint(path):
+    try:
+        with open(checkpoint_path(path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _fsync_dir(path):
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _replace(tmp, path, fsync):
+    if fsync:
+        with open(tmp, "rb+") as f:
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if fsync:
+        _fsync_dir(path)
+
+
+class ChatSink:
+    """Append chat rows (dicts keyed by `fields`) to a log file with batched, checkpointed flushes.
+
+    append=False starts a new log (a new generation, so readers restart at 0);
+    append=True continues the log from its last checkpoint. Use as a context
+    manager or call close(), which flushes what is left.
+    """
+
+    def __init__(self, path, fields, fmt=None, flush_rows=500, flush_seconds=5.0,
+                 fsync=True, append=False):
+        self.path = path
+        self.fields = list(fields)
+        self.fmt = log_format(path, fmt)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.fsync = fsync
+        self.buffer = []
+        self.lock = threading.Lock()       # guards buffer
+        self.io_lock = threading.Lock()    # one flush at a time
+        self.wake = threading.Event()
+        self.closed = False
+        self.error = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        ckpt = read_checkpoint(path) if append else None
+        if ckpt is not None and ckpt.get("fields") == self.fields and ckpt.get("format") == self.fmt:
+            self.ckpt = ckpt
+            self._recover()
+        else:
+            self.ckpt = {"generation": uuid.uuid4().hex, "format": self.fmt, "fields": self.fields,
+                         "rows": 0, "pos": 0, "header": 0}
+            self._create()
+
+        self.thread = threading.Thread(target=self._run, name="chat-sink", daemon=True)
+        self.thread.start()
+
+    # -- writing ------------------------------------------------------------
+    def write(self, row):
+        self.write_many([row])
+
+    def write_many(self, rows):
+        if self.closed:
+            raise ValueError("write to a closed ChatSink")
+        if self.error is not None:
+            raise self.error
+        with self.lock:
+            self.buffer.extend(rows)
+            full = len(self.buffer) >= self.flush_rows
+        if full:
+            self.wake.set()
+
+    def flush(self):
+        """Write buffered rows and checkpoint them; returns the number of rows written.
+
+        If that fails, the log is rolled back to the last checkpoint and the rows
+        go back to the front of the buffer for the next flush.
+        """
+        with self.io_lock:
+            with self.lock:
+                rows, self.buffer = self.buffer, []
+            if not rows:
+                return 0
+            ckpt = dict(self.ckpt)
+            try:
+                if self.fmt == "parquet":
+                    self._write_part(rows)
+                else:
+                    self._append_text(rows)
+                self.ckpt["rows"] += len(rows)
+                self._save_checkpoint()
+            except BaseException:
+                self.ckpt = ckpt
+                self._rollback()
+                with self.lock:
+                    self.buffer[:0] = rows
+                raise
+            return len(rows)
+
+    def close(self):
+        """Flush what is left; raises the background flush error, if there was one"""
+        if self.closed:
+            return
+        self.closed = True
+        self.wake.set()
+        self.thread.join()
+        try:
+            self.flush()
+        finally:
+            if self.fmt != "parquet":
+                self.file.close()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        while not self.closed:
+            self.wake.wait(self.flush_seconds)
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception as e:  # surfaced on the next write() and by close()
+                self.error = e
+                return
+
+    # -- storage ------------------------------------------------------------
+    def _create(self):
+        if self.fmt == "parquet":
+            os.makedirs(self.path, exist_ok=True)
+            for name in os.listdir(self.path):
+                if name.startswith("part-"):
+                    os.remove(os.path.join(self.path, name))
+        else:
+            self.file = open(self.path, "wb")
+            if self.fmt == "csv":
+                self.file.write(self._encode_csv([dict(zip(self.fields, self.fields))]))
+            self.ckpt["header"] = self.ckpt["pos"] = self.file.tell()
+            self._sync_file()
+        self._save_checkpoint()
+
+    def _recover(self):
+        """Drop whatever was written after the last checkpoint"""
+        if self.fmt == "parquet":
+            os.makedirs(self.path, exist_ok=True)
+            keep = {self._part_name(i) for i in range(self.ckpt["pos"])}
+            for name in os.listdir(self.path):
+                if name.startswith("part-") and name not in keep:
+                    os.remove(os.path.join(self.path, name))
+        else:
+            self.file = open(self.path, "r+b" if os.path.exists(self.path) else "w+b")
+            self.file.truncate(self.ckpt["pos"])
+            self.file.seek(self.ckpt["pos"])
+
+    def _rollback(self):
+        """Best effort: drop a half-written flush so the retry lands at the checkpoint"""
+        try:
+            if self.fmt == "parquet":
+                part = os.path.join(self.path, self._part_name(self.ckpt["pos"]))
+                for name in (part, part + ".tmp"):
+                    if os.path.exists(name):
+                        os.remove(name)
+            else:
+                self.file.seek(self.ckpt["pos"])
+                self.file.truncate()
+        except OSError:
+            pass  # _recover() trims it when the log is reopened with append=True
+
+    def _encode_csv(self, rows):
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=self.fields, extrasaction="ignore")
+        writer.writerows(rows)
+        return buf.getvalue().encode("utf-8")
+
+    def _append_text(self, rows):
+        if self.fmt == "csv":
+            data = self._encode_csv(rows)
+        else:
+            data = "".join(json.dumps({k: row.get(k) for k in self.fields}, default=str) + "\n"
+                           for row in rows).encode("utf-8")
+        self.file.write(data)
+        self._sync_file()
+        self.ckpt["pos"] = self.file.tell()
+
+    def _sync_file(self):
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+
+    def _part_name(self, i):
+        return f"part-{i:06d}.parquet"
+
+    def _write_part(self, rows):
+        frame = pd.DataFrame([{k: row.get(k) for k in self.fields} for row in rows], columns=self.fields)
+        frame = frame.astype("string")
+        for c in DATE_FIELDS:
+            if c in frame.columns:
+                frame[c] = pd.to_datetime(frame[c])
+        part = os.path.join(self.path, self._part_name(self.ckpt["pos"]))
+        tmp = part + ".tmp"
+        frame.to_parquet(tmp, index=False)
+        _replace(tmp, part, self.fsync)
+        self.ckpt["pos"] += 1
+
+    def _save_checkpoint(self):
+        tmp = checkpoint_path(self.path) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.ckpt, f)
+        _replace(tmp, checkpoint_path(self.path), self.fsync)
+
+
+def read_new(path, cursor=None):
+    """Rows of the log at `path` checkpointed after `cursor`; returns (frame, new cursor).
+
+    cursor None (or one from an earlier generation of the log) reads from the
+    start. The frame's index is the rows' position in the log. Rows written but
+    not yet checkpointed are never returned.
+    """
+    ckpt = read_checkpoint(path)
+    if ckpt is None:
+        return pd.DataFrame(), cursor
+    if not cursor or cursor.get("generation") != ckpt["generation"]:
+        cursor = {"generation": ckpt["generation"], "rows": 0, "pos": ckpt.get("header", 0)}
+    fields, start, end = ckpt["fields"], cursor["pos"], ckpt["pos"]
+    if ckpt["format"] == "parquet":
+        parts = [os.path.join(path, f"part-{i:06d}.parquet") for i in range(start, end)]
+        frame = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True) if parts \
+            else pd.DataFrame(columns=fields)
+    else:
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        if not data:
+            frame = pd.DataFrame(columns=fields)
+        elif ckpt["format"] == "csv":
+            frame = pd.read_csv(io.BytesIO(data), names=fields, header=None, dtype=str, keep_default_na=False)
+        else:
+            frame = pd.read_json(io.BytesIO(data), lines=True, dtype=False)[fields]
+    frame.index = range(cursor["rows"], cursor["rows"] + len(frame))
+    return frame, {"generation": ckpt["generation"], "rows": cursor["rows"] + len(frame), "pos": end}
@@ -1,10 +1,11 @@
-import requests
+from ..utils import http_client
 from .timeline import Timeline
 
 class ChatSystem:
-    def __init__(self, timeline: Timeline, api_url="http://localhost:8000/ask"):
+    def __init__(self, timeline: Timeline, api_url="http://localhost:8000/ask", replay=None):
         self.timeline = timeline
         self.api_url = api_url
+        self.replay = replay  # ReplayStore recording/serving the /ask answers
         self.conversations = []
         
     def send_message(self, sender, receiver, message, role="Ruby",since=None):
@@ -16,14 +17,20 @@ class ChatSystem:
         }
         
         try:
-            response = requests.post(self.api_url, json=payload).json()
-            response_text = response.get("answer", "No response generated")
+            if self.replay is None:
+                response_text = self._ask(payload)
+            else:
+                response_text = self.replay.call("ask", payload, lambda: self._ask(payload))
         except Exception as e:
             response_text = f"Error: {str(e)}"
         
         self.log_conversation(sender, receiver, message, response_text)
         return response_text
     
+    def _ask(self, payload):
+        response = http_client.post(self.api_url, json=payload).json()
+        return response.get("answer", "No response generated")
+    
     def log_conversation(self, sender, receiver, message, response):
         conversation = {
             "date": self.timeline.get_current_date(),
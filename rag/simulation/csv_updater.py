@@ -1,30 +1,24 @@
-import csv
-import os
-from datetime import datetime
+from .chat_sink import SIM_CONVERSATIONS, ChatSink
+
+CONVERSATION_FIELDS = ["date", "sender", "receiver", "message", "response"]
 
 class CSVUpdater:
-    def __init__(self):
-        self.chat_file = "/home/suday-nandan-reddy/Projects/AI/Elyx hackathon/rag/data/chats.csv"
-        self.ensure_csv_headers()
-    
-    def ensure_csv_headers(self):
-        if not os.path.exists(self.chat_file):
-            with open(self.chat_file, "w") as f:
-                writer = csv.writer(f)
-                writer.writerow(["date", "sender", "receiver", "message", "response"])
-    
+    """ChatSystem conversations -> chat log (CSV, NDJSON or Parquet by extension/fmt).
+
+    Rows are buffered and flushed in batches by a ChatSink and, as before, added
+    to the existing log (append=False starts a new one); call close() at the
+    end of the run.
+    """
+    def __init__(self, chat_file=SIM_CONVERSATIONS, fmt=None, append=True, **sink_options):
+        self.chat_file = chat_file
+        self.sink = ChatSink(chat_file, CONVERSATION_FIELDS, fmt=fmt, append=append, **sink_options)
+
     def update_chat_logs(self, conversations):
-        with open(self.chat_file, "a", newline="") as f:
-            writer = csv.writer(f)
-            for conv in conversations:
-                writer.writerow([
-                    conv["date"],
-                    conv["sender"],
-                    conv["receiver"],
-                    conv["message"],
-                    conv["response"]
-                ])
-    
+        self.sink.write_many(conversations)
+
+    def close(self):
+        self.sink.close()
+
     def update_schedule(self, event):
         # Implementation for schedule updates
-        pass
\ No newline at end of file
+        pass
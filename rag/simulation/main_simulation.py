@@ -3,16 +3,20 @@ from .chat_system import ChatSystem
 from .event_scheduler import EventScheduler
 from .member_simulator import MemberSimulator
 from .csv_updater import CSVUpdater
-import time
+from .replay import replay_store
 import random
 
-def run_simulation(days=30):
-    # Initialize components
-    timeline = Timeline(start_date="2025-01-01")
-    chat_system = ChatSystem(timeline)
+def run_simulation(days=30, pace=0.0, chat_file=None, replay=None, seed=None):
+    # replay: record, replay or auto /ask answers (default SIM_REPLAY); seed makes runs repeatable
+    if seed is not None:
+        random.seed(seed)
+    # Initialize components; pace > 0 adds real pauses between days (live demos)
+    timeline = Timeline(start_date="2025-01-01", pace=pace)
+    store = replay_store(replay)
+    chat_system = ChatSystem(timeline, replay=store)
     scheduler = EventScheduler(timeline)
     member = MemberSimulator(timeline)
-    csv_updater = CSVUpdater()
+    csv_updater = CSVUpdater(chat_file) if chat_file else CSVUpdater()
     
     # Main simulation loop
     for day in range(days):
@@ -43,12 +47,23 @@ def run_simulation(days=30):
                 response = chat_system.send_message("member", role, question,role, str(timeline.get_current_date()))
                 print(f"[{role}]: {response}")
         
-        # 3. Weekly CSV update
-        if day % 7 == 0:
-            csv_updater.update_chat_logs(chat_system.conversations)
-            chat_system.conversations = []
+        # 3. Hand the day's conversations to the chat log (flushed in batches)
+        csv_updater.update_chat_logs(chat_system.conversations)
+        chat_system.conversations = []
         
-        time.sleep(0.5)  # Pause between days
+        timeline.pause(0.5)  # Pause between days (only when pacing)
+    
+    csv_updater.close()
+    if store is not None:
+        store.report()
 
 if __name__ == "__main__":
-    run_simulation(days=5)
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the member/Elyx chat simulation")
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--pace", type=float, default=0.0)
+    parser.add_argument("--replay", choices=["off", "record", "replay", "auto"],
+                        help="record /ask answers, or serve recorded ones without network (default: SIM_REPLAY)")
+    parser.add_argument("--seed", type=int, help="seed the simulation's random draws")
+    args = parser.parse_args()
+    run_simulation(days=args.days, pace=args.pace, replay=args.replay, seed=args.seed)
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""Record/replay of the simulators' LLM and /ask calls.
+
+A ReplayStore maps a request fingerprint to the response it got, one JSON file
+per response under <root>/<first 2 hex chars>/<sha256>.json. The fingerprint
+is the SHA-256 of the call kind, its request fields and how many identical
+requests came before it in the run. Repeated prompts therefore replay their
+own recorded answers, and a seeded run replays exactly.
+
+Modes:
+  record  always call the API and store its outcome (overwriting)
+  replay  never touch the network; unrecorded requests raise ReplayMiss
+  auto    serve recorded responses, call and record the rest (and retry
+          recorded failures)
+
+Failed calls are recorded too: a None result replays as None and an exception
+as ReplayedError with its message, so callers take the same fallback as in
+the recorded run and the random stream the simulators draw from stays aligned.
+"""
+import hashlib
+import json
+import os
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+REPLAY_DIR = os.getenv("SIM_REPLAY_DIR", os.path.join(ROOT, "data", "llm_replay"))
+# Default mode when a simulator is not given one: off, record, replay or auto
+SIM_REPLAY = os.getenv("SIM_REPLAY", "off").lower()
+
+MODES = ("record", "replay", "auto")
+
+
+class ReplayMiss(LookupError):
+    """A request with no recorded response in replay mode"""
+
+
+class ReplayedError(RuntimeError):
+    """A recorded call that raised, raised again on replay"""
+
+
+class ReplayStore:
+    def __init__(self, mode="replay", root=REPLAY_DIR):
+        if mode not in MODES:
+            raise ValueError(f"replay mode must be one of {MODES}, got {mode!r}")
+        self.mode = mode
+        self.root = root
+        self.seen = Counter()  # occurrences of each request so far this run
+        self.hits = self.recorded = 0
+        self.missed = []       # (kind, request) served by nobody
+
+    def fingerprint(self, kind, request):
+        base = json.dumps({"kind": kind, "request": request}, sort_keys=True, default=str)
+        n = self.seen[base]
+        self.seen[base] += 1
+        return hashlib.sha256(f"{n}:{base}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def call(self, kind, request, fn):
+        """fn()'s result for this request: served from the store or recorded, per mode"""
+        key = self.fingerprint(kind, request)
+        path = self._path(key)
+        if self.mode != "record":
+            try:
+                with open(path) as f:
+                    entry = json.load(f)
+            except FileNotFoundError:
+                if self.mode == "replay":
+                    self.missed.append((kind, request))
+                    raise ReplayMiss(f"no recorded {kind} response for {key[:12]}")
+                entry = None
+            failed = entry is not None and ("error" in entry or entry["response"] is None)
+            if entry is not None and (self.mode == "replay" or not failed):
+                self.hits += 1
+                if "error" in entry:
+                    raise ReplayedError(entry["error"])
+                return entry["response"]
+        try:
+            response = fn()
+        except Exception as e:
+            self._store(path, {"kind": kind, "request": request, "error": f"{type(e).__name__}: {e}"})
+            raise
+        self._store(path, {"kind": kind, "request": request, "response": response})
+        return response
+
+    def _store(self, path, entry):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(entry, f, default=str)
+        os.replace(tmp, path)
+        self.recorded += 1
+
+    def report(self, limit=5):
+        """Print hit/record/miss counts and the first few missed requests"""
+        print(f"Replay ({self.mode}, {self.root}): {self.hits} served, {self.recorded} recorded, "
+              f"{len(self.missed)} missed")
+        for kind, request in self.missed[:limit]:
+            print(f"  missed {kind}: {json.dumps(request, default=str)[:120]}")
+
+
+def replay_store(mode=None, root=REPLAY_DIR):
+    """ReplayStore for `mode` (default: SIM_REPLAY), or None when recording is off"""
+    mode = (mode or SIM_REPLAY).lower()
+    return None if mode == "off" else ReplayStore(mode, root)
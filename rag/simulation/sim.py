@@ -1,11 +1,17 @@
-import requests
 import random
 import csv
 import os
+import sys
 from datetime import datetime, timedelta
 import time
 from typing import List, Dict, Tuple,Optional
 import json
+from bisect import bisect_left, bisect_right
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from rag.utils import http_client
+from rag.simulation.chat_sink import SIM_CHATS, ChatSink
+from rag.simulation.replay import ReplayMiss, replay_store
 # Configuration
 ELYX_API = "http://localhost:8000/ask"  # Your RAG API
 OPENROUTER_API = "https://openrouter.ai/api/v1/chat/completions"
@@ -22,8 +28,12 @@ MODELS = {
     ]
 }
 FALLBACK_MESSAGES = "fallback_messages.json"
+# What the Elyx side says when /ask fails (no connection) or answers non-200
+ELYX_BUSY = "Our systems are currently busy. Please ask again later."
+ELYX_NO_ANSWER = "I'll need to consult with the team about this."
 class APIManager:
-    def __init__(self):
+    def __init__(self, replay=None):
+        self.replay = replay  # ReplayStore recording/serving get_response and /ask answers
         self.gemini_index = 0
         self.or_index = 0
         self.model_index = 0
@@ -66,8 +76,8 @@ class APIManager:
         
         try:
             if api_type == "openrouter":
-                response = requests.post(
-                    "https://openrouter.ai/api/v1/chat/completions",
+                response = http_client.post(
+                    OPENROUTER_API,
                     headers={
                         "Authorization": f"Bearer {self.rotate_key('openrouter')}",
                         "HTTP-Referer": "https://yourdomain.com",
@@ -97,8 +107,26 @@ class APIManager:
             print(f"API Connection Error: {str(e)}")
             return None
     
+    def recorded(self, kind: str, request: Dict, fn):
+        """fn(), or its recorded result when a ReplayStore is attached (ReplayMiss on a replay miss)"""
+        if self.replay is None:
+            return fn()
+        return self.replay.call(kind, request, fn)
+    
     def get_response(self, api_type: str, prompt: str, role: str = None) -> str:
         """Get response with multi-level fallback"""
+        try:
+            response = self.recorded("get_response", {"api_type": api_type, "prompt": prompt, "role": role},
+                                     lambda: self._live_response(api_type, prompt))
+        except ReplayMiss:
+            response = None
+        if response:
+            return response
+        
+        # Final fallback: Local responses
+        return random.choice(self.fallbacks["elyx" if api_type == "gemini" else "member"])
+    
+    def _live_response(self, api_type: str, prompt: str) -> Optional[str]:
         # Try primary API
         if api_type == "openrouter":
             payload = {
@@ -121,21 +149,27 @@ class APIManager:
         
         # Fallback 2: Try other API type
         alt_api = "openrouter" if api_type == "gemini" else "gemini"
-        response = self.call_api(alt_api, payload)
-        if response:
-            return response
-        
-        # Final fallback: Local responses
-        return random.choice(self.fallbacks["elyx" if api_type == "gemini" else "member"])
+        return self.call_api(alt_api, payload) or None
 
 
 
 
 class Timeline:
-    def __init__(self, start_date="2025-01-01"):
+    """Virtual clock: simulated time only moves via advance()/get_current_time().
+
+    pace scales the real-time delays requested through pause(); the default 0
+    runs the simulation without any wall-clock sleeps.
+    """
+    def __init__(self, start_date="2025-01-01", pace=0.0):
         self.current_datetime = datetime.strptime(start_date + " 08:00", "%Y-%m-%d %H:%M")
         self.day_count = 0
         self.business_hours = range(8, 20)  # 8AM to 8PM
+        self.pace = pace
+
+    def pause(self, seconds):
+        """Real-time delay for pacing a live demo (seconds * pace); no-op when pace is 0"""
+        if self.pace > 0:
+            time.sleep(seconds * self.pace)
     
     def advance(self, days=1):
         """Advance time by specified days, resetting to morning"""
@@ -211,25 +245,39 @@ class Member:
             ]
 
 
+# json path -> (mtime, parsed and sorted events), so each file is parsed once per process
+_SCHEDULES = {}
+
 class EventManager:
+    """Event schedule for one simulation run, loaded once and indexed by date.
+
+    by_date answers today's events in O(1); the sorted `dates` list bounds an
+    upcoming window with bisect (O(log n + k)). Keep one instance per run so
+    `notified` persists.
+    """
     def __init__(self, timeline, json_file="/home/suday-nandan-reddy/Projects/AI/Elyx hackathon/rag/data/elyx_intervention_loop_8months.json"):
         self.timeline = timeline
         self.events = self._load_events(json_file)
         self.processed_events = set()
-        
+        self.by_date = {}
+        for event in self.events:
+            self.by_date.setdefault(event["date"], []).append(event)
+        self.dates = sorted(self.by_date)
     
     def _load_events(self, json_file: str) -> List[Dict]:
-        """Load events from JSON file and parse dates"""
+        """Load events from JSON file and parse dates (cached per file)"""
         try:
-            with open(json_file) as f:
-                events = json.load(f)
-            
-            # Convert string dates to datetime objects
-            for event in events:
-                event["date"] = datetime.strptime(event["date"], "%Y-%m-%d").date()
-                event["notified"] = False
-            
-            return sorted(events, key=lambda x: x["date"])
+            mtime = os.path.getmtime(json_file)
+            cached = _SCHEDULES.get(json_file)
+            if cached is None or cached[0] != mtime:
+                with open(json_file) as f:
+                    events = json.load(f)
+                # Convert string dates to datetime objects
+                for event in events:
+                    event["date"] = datetime.strptime(event["date"], "%Y-%m-%d").date()
+                cached = _SCHEDULES[json_file] = (mtime, sorted(events, key=lambda x: x["date"]))
+            # own copies: notification state belongs to this run
+            return [dict(event, notified=False) for event in cached[1]]
         except Exception as e:
             print(f"Error loading events: {str(e)}")
             return []
@@ -239,8 +287,8 @@ class EventManager:
         today = self.timeline.current_datetime.date()
         todays_events = []
         
-        for event in self.events:
-            if event["date"] == today and not event["notified"]:
+        for event in self.by_date.get(today, ()):
+            if not event["notified"]:
                 # Extract role name (remove parentheses if present)
                 role = event["role"].split("(")[0].strip()
                 todays_events.append((role, event["message"]))
@@ -253,19 +301,20 @@ class EventManager:
         """Get events scheduled in the next X days"""
         today = self.timeline.current_datetime.date()
         end_date = today + timedelta(days=days)
-        return [
-            e for e in self.events 
-            if today <= e["date"] <= end_date and not e["notified"]
-        ]
+        lo = bisect_left(self.dates, today)
+        hi = bisect_right(self.dates, end_date)
+        return [e for d in self.dates[lo:hi] for e in self.by_date[d] if not e["notified"]]
 class ChatSimulator:
-    def __init__(self, timeline, member):
+    def __init__(self, timeline, member, event_manager=None, sink=None, replay=None):
         self.timeline = timeline
         self.member = member
+        self.event_manager = event_manager or EventManager(timeline)
+        self.sink = sink  # ChatSink that also receives every chat entry
         self.chat_history = []
         self.test_schedule = self._generate_test_schedule()
         self.current_phase = "onboarding"
         self.initial = 0
-        self.api = APIManager()
+        self.api = APIManager(replay)
 
     
     def _generate_test_schedule(self):
@@ -277,44 +326,33 @@ class ChatSimulator:
             for i in range(3)  # For 8 months (0, 3, 6 months)
         ]
     
-    def _get_member_message(self,message=None) -> str:
-        """Get message from member (using OpenRouter or samples)"""
-        # 30% chance to use OpenRouter for more varied responses
-        if random.random() < 0.7:
-            try:
-                prompt = f"Assume you are client named {self.member.name} Generate a short health-related question with {self.member.condition} or give a follow up for this message{message},tell it in your pov"
-                response = self.api.get_response("openrouter", prompt)
-                if response.status_code == 200:
-                    return response.json()["choices"][0]["message"]["content"]
-            except:
-                pass
-        
-        # Fallback to sample messages
-        return random.choice(self.member.sample_messages)
-    
     def _get_elyx_response(self, message: str, role: str) -> str:
         """Get response from Elyx team using your RAG API"""
+        payload = {
+            "question": message,
+            "role": role,
+            "since": "2025-01-01"
+        }
         try:
-            response = requests.post(
-                ELYX_API,
-                json={
-                    "question": message,
-                    "role": role,
-                    "since": "2025-01-01"
-                },
-                timeout=5
-            )
-            if response.status_code == 200:
-                return response.json().get("answer", "Let me check on that.")
-            return "I'll need to consult with the team about this."
+            answer = self.api.recorded("ask", payload, lambda: self._ask_elyx(payload))
+        except ReplayMiss:
+            answer = None  # never recorded (e.g. a store from before failures were kept)
         except:
-            return "Our systems are currently busy. Please ask again later."
+            return ELYX_BUSY
+        if answer is None:
+            return ELYX_NO_ANSWER
+        return answer
+    
+    def _ask_elyx(self, payload: Dict) -> Optional[str]:
+        response = http_client.post(ELYX_API, json=payload)
+        if response.status_code == 200:
+            return response.json().get("answer", "Let me check on that.")
+        return None
     
     def _generate_event_notification(self) -> Optional[Tuple[str, str]]:
         """Generate notifications from scheduled events"""
         # 1. Check for exact date matches
-        event_manager = EventManager(self.timeline)
-        todays_events = event_manager.get_todays_events()
+        todays_events = self.event_manager.get_todays_events()
         if todays_events:
             return random.choice(todays_events)
         
@@ -330,8 +368,7 @@ class ChatSimulator:
             return random.choice(spontaneous_events)
         
         # 3. Check for upcoming events (notify 3 days before)
-        event_manager = EventManager(self.timeline)
-        upcoming = event_manager.get_upcoming_events(3)
+        upcoming = self.event_manager.get_upcoming_events(3)
         for event in upcoming:
             if event["type"] in ["full_diagnostics", "physical_exam"]:
                 days_until = (event["date"] - self.timeline.current_datetime.date()).days
@@ -343,76 +380,103 @@ class ChatSimulator:
                     )
         
         return None
+    # Conversation flow. The *_steps generators yield each call they need as
+    # ("llm", prompt), ("ask", message, role) or ("pause", seconds) and are resumed
+    # with its result, so this simulator and async_sim's AsyncChatSimulator run
+    # the same flow and differ only in how _call makes those calls.
     def simulate_day(self):
-        """Simulate a day's worth of conversations (1-10 messages)"""
-        self._update_phase()
-        interactions = random.randint(1, 4)  # 1-10 messages per day
+        """Simulate a day's worth of conversations"""
+        self._run(self._day_steps())
+
+    def _run(self, steps):
+        reply = None
         while True:
-            event = self._generate_event_notification()
-            if not event:
-                break
-            
+            try:
+                request = steps.send(reply)
+            except StopIteration:
+                return
+            reply = self._call(request)
+
+    def _call(self, request):
+        kind, *args = request
+        if kind == "llm":
+            return self.api.get_response("openrouter", *args)
+        if kind == "ask":
+            return self._get_elyx_response(*args)
+        self.timeline.pause(*args)
+
+    def _day_steps(self):
+        self._update_phase()
+        interactions = random.randint(1, 4)  # conversations besides the notification
+        event = self._generate_event_notification()
+        if event:
             role, message = event
-            self._add_chat_entry(role, message)
+            yield from self._say(role, message)
             
             # 60% chance member responds to notifications
             if random.random() < 0.6:
-                response = self._get_member_message(message)
-                self._add_chat_entry("Rohan", response)
+                response = yield from self._member_message_steps(message)
+                yield from self._say(self.member.name, response)
                 
                 # 50% chance of follow-up
                 if random.random() < 0.5:
-                    follow_up = self._get_elyx_response(response, role)
-                    self._add_chat_entry(role, follow_up)
-            break
+                    follow_up = yield ("ask", response, role)
+                    yield from self._say(role, follow_up)
         self.initial = 1
         for _ in range(interactions):
             # 50% chance conversation starts with member, 50% with Elyx
             if random.random() < 0.5:
-                self._member_initiated_convo()
+                yield from self._member_initiated_steps()
             else:
-                self._elyx_initiated_convo()
-            self.initial=0
-            # Short delay between messages
-            time.sleep(0.1)
-    def _member_initiated_convo(self):
-        
+                yield from self._elyx_initiated_steps()
+            self.initial = 0
+            # Short delay between messages (only when pacing)
+            yield ("pause", 0.1)
+
+    def _member_message_steps(self, message=None):
+        """Member's next message: usually written by the LLM, else a sample message"""
+        if random.random() < 0.7:
+            prompt = f"Assume you are client named {self.member.name} Generate a short health-related question with {self.member.condition} or give a follow up for this message{message},tell it in your pov"
+            response = yield ("llm", prompt)
+            if response:
+                return response
+        return random.choice(self.member.sample_messages)
+
+    def _member_initiated_steps(self):
         """Member starts the conversation"""
-        # Get member message
-        member_msg = self._get_member_message()
-        self._add_chat_entry(self.member.name, member_msg)
+        member_msg = yield from self._member_message_steps()
+        yield from self._say(self.member.name, member_msg)
         
         # Determine which role should respond
         responder = self._determine_responder(member_msg)
-        
-        # Get Elyx response
-        elyx_response = self._get_elyx_response(member_msg, responder)
-        self._add_chat_entry(responder, elyx_response)
+        elyx_response = yield ("ask", member_msg, responder)
+        yield from self._say(responder, elyx_response)
         
         # 40% chance of follow-up
         if random.random() < 0.4:
-            follow_up = self._get_member_message()
-            self._add_chat_entry(self.member.name, follow_up)
-            
-            # Second response
-            second_response = self._get_elyx_response(follow_up, responder)
-            self._add_chat_entry(responder, second_response)
+            follow_up = yield from self._member_message_steps()
+            yield from self._say(self.member.name, follow_up)
+            second_response = yield ("ask", follow_up, responder)
+            yield from self._say(responder, second_response)
     
-    def _elyx_initiated_convo(self):
+    def _elyx_initiated_steps(self):
         """Elyx team starts the conversation"""
-        event = True
-        if event:
-            role, message = "Ruby","Hello! How’s your day going so far? Hope you’re feeling good and healthy today."
-            if(self.initial ==1):
-                self._add_chat_entry(role, message)
-            # 60% chance member responds
-            if random.random() < 0.6:
-                member_response = self._get_member_message()
-                self._add_chat_entry(self.member.name, member_response)
-                
-                # Elyx follow-up
-                elyx_followup = self._get_elyx_response(member_response, role)
-                self._add_chat_entry(role, elyx_followup)
+        role, message = "Ruby","Hello! How’s your day going so far? Hope you’re feeling good and healthy today."
+        if(self.initial ==1):
+            yield from self._say(role, message)
+        # 60% chance member responds
+        if random.random() < 0.6:
+            member_response = yield from self._member_message_steps()
+            yield from self._say(self.member.name, member_response)
+            
+            # Elyx follow-up
+            elyx_followup = yield ("ask", member_response, role)
+            yield from self._say(role, elyx_followup)
+
+    def _say(self, sender: str, message: str):
+        self._add_chat_entry(sender, message)
+        # typing delay; the timestamp already moved simulated time
+        yield ("pause", random.uniform(0.5, 5))
     
     def _determine_responder(self, message: str) -> str:
         """Determine which Elyx role should respond"""
@@ -445,12 +509,16 @@ class ChatSimulator:
     
     def _add_chat_entry(self, sender: str, message: str):
         """Add a chat entry with timestamp"""
-        self.chat_history.append({
+        self._log({
             "timestamp": self.timeline.get_current_time(),
             "sender": sender,
             "message": message
         })
-        time.sleep(random.uniform(0.5, 5))
+    
+    def _log(self, entry):
+        self.chat_history.append(entry)
+        if self.sink is not None:
+            self.sink.write(entry)
     
     def save_to_csv(self):
         """Save chat history to CSV"""
@@ -463,25 +531,46 @@ class ChatSimulator:
         except Exception as e:
             print(f"Error saving CSV: {str(e)}")
 
-def main():
+CHAT_FIELDS = ["timestamp", "sender", "message"]
+
+def main(days=5, pace=0.0, out=SIM_CHATS, fmt=None, replay=None, seed=None):
+    """replay: record, replay or auto (default SIM_REPLAY); seed makes runs repeatable"""
+    if seed is not None:
+        random.seed(seed)
     # Initialize components
-    timeline = Timeline()
+    timeline = Timeline(pace=pace)
     member = Member()
-    simulator = ChatSimulator(timeline, member)
+    sink = ChatSink(out, CHAT_FIELDS, fmt=fmt)
+    store = replay_store(replay)
+    simulator = ChatSimulator(timeline, member, sink=sink, replay=store)
     
-    # Run simulation for 8 months (240 days)
-    print(f"Starting simulation from {timeline.get_current_time()} for 240 days...")
+    # Run simulation (--days 240 for the full 8 months)
+    print(f"Starting simulation from {timeline.get_current_time()} for {days} days...")
     
-    for day in range(5):
+    for day in range(days):
         if day % 30 == 0:  # Monthly status
-            print(f"Processing day {day+1}/240 ({timeline.get_current_time()})")
+            print(f"Processing day {day+1}/{days} ({timeline.get_current_time()})")
         
         simulator.simulate_day()
         timeline.advance()
     
-    # Save results
-    simulator.save_to_csv()
+    # Flush what is still buffered (earlier rows were written as the run went)
+    sink.close()
+    print(f"Saved {len(simulator.chat_history)} messages to {out}")
+    if store is not None:
+        store.report()
     print("Simulation completed")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Simulate member/Elyx chats on a virtual clock")
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--pace", type=float, default=0.0,
+                        help="scale for real-time typing/message delays (0 = no sleeps, 1 = live demo speed)")
+    parser.add_argument("--out", default=SIM_CHATS, help="chat log (.csv, .ndjson or .parquet directory)")
+    parser.add_argument("--format", choices=["csv", "ndjson", "parquet"], help="default: from --out's extension")
+    parser.add_argument("--replay", choices=["off", "record", "replay", "auto"],
+                        help="record API answers, or serve recorded ones without network (default: SIM_REPLAY)")
+    parser.add_argument("--seed", type=int, help="seed the simulation's random draws")
+    args = parser.parse_args()
+    main(days=args.days, pace=args.pace, out=args.out, fmt=args.format, replay=args.replay, seed=args.seed)
@@ -1,12 +1,19 @@
 from datetime import datetime, timedelta
+import time
 import pytz
 
 class Timeline:
-    def __init__(self, start_date="2025-01-01", speed=1.0):
+    def __init__(self, start_date="2025-01-01", speed=1.0, pace=0.0):
         self.current_date = datetime.strptime(start_date, "%Y-%m-%d")
         self.speed = speed
+        self.pace = pace  # real seconds per requested pause second; 0 = never sleep
         self.timezone = pytz.timezone("UTC")
         
+    def pause(self, seconds):
+        """Real-time delay for pacing a live run; simulated time only moves via advance()"""
+        if self.pace > 0:
+            time.sleep(seconds * self.pace)
+        
     def advance(self, days=1):
         self.current_date += timedelta(days=days * self.speed)
         return self.current_date
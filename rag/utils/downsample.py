@@ -0,0 +1,80 @@
+"""Point reduction for time-series charts.
+
+Charts draw at most a few points per horizontal pixel, so a series longer than
+the chart is wide can be cut down before it is serialized to the browser:
+
+  lttb    Largest-Triangle-Three-Buckets: keeps the points that best preserve
+          the line's visual shape (good default for lines)
+  minmax  the lowest and highest point of equal-size buckets: keeps every
+          spike and dip (good for bars and noisy signals)
+
+Both return positions into the series, always keep its first and last point,
+and expect x sorted ascending.
+"""
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(x, y, n):
+    """Positions of the n points LTTB keeps; all of them when len(x) <= n"""
+    m = len(x)
+    if n >= m:
+        return np.arange(m)
+    if n < 3:
+        return np.array([0, m - 1])[:max(n, 1)]
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # n-2 buckets between the first and last point, then [m-1, m) for the last point
+    edges = np.linspace(1, m - 1, n - 1).astype(np.intp)
+    counts = np.diff(np.append(edges, m))
+    x_mean = np.add.reduceat(x, edges) / counts
+    y_mean = np.add.reduceat(y, edges) / counts
+
+    out = np.empty(n, dtype=np.intp)
+    out[0], out[-1] = 0, m - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the triangle area between the last kept point, each candidate and the next bucket's mean
+        area = np.abs((x[a] - x_mean[i + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (y_mean[i + 1] - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(x, y, n):
+    """Positions of the min and max of n // 2 equal-count buckets (plus the endpoints), in order"""
+    m = len(x)
+    if n >= m:
+        return np.arange(m)
+    k = max(n // 2, 1)
+    bucket = np.arange(m) * k // m
+    order = np.lexsort((np.asarray(y, dtype=float), bucket))  # by bucket, then y
+    starts = np.searchsorted(bucket, np.arange(k))
+    ends = np.append(starts[1:], m) - 1
+    return np.unique(np.concatenate([order[starts], order[ends], [0, m - 1]]))
+
+
+METHODS = {"lttb": lttb_indices, "minmax": minmax_indices}
+
+
+def _positions(s):
+    """Numeric x for the area/bucket math (datetimes as integer ticks)"""
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.array.asi8
+    return s.to_numpy(dtype=float)
+
+
+def downsample(df, x, y, n, by=None, method="lttb"):
+    """Rows of `df` left when each series (rows grouped by `by`) is cut to about n points.
+
+    Frames of n rows or fewer are returned unchanged; otherwise rows missing x
+    or y are dropped and the result is sorted by `by` and x.
+    """
+    if len(df) <= n:
+        return df
+    pick = METHODS[method]
+    df = df.dropna(subset=[x, y]).sort_values(x, kind="stable")
+    groups = [df] if by is None else [g for _, g in df.groupby(by, sort=False, observed=True)]
+    kept = [g if len(g) <= n else g.iloc[pick(_positions(g[x]), g[y], n)] for g in groups]
+    return pd.concat(kept) if kept else df
@@ -0,0 +1,90 @@
+"""Pooled HTTP clients for the simulators and CLI.
+
+post() goes through a keep-alive requests.Session (one per thread and process),
+so repeated calls to the local /ask API or OpenRouter reuse their TCP
+connections instead of opening one per message. Connection errors, timeouts
+and 502/503/504 answers are retried a bounded number of times with full-jitter
+exponential backoff. async_client()/apost() are the same for asyncio code
+(httpx, imported only when used). Settings are read here rather than in
+rag/config/settings.py so the simulators don't pull in the RAG config.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+# Extra attempts after the first one (0 = no retries)
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+# Backoff before retry n is uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF * 2**(n-1))) seconds
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.2"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "5"))
+# Keep-alive connections per host
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+
+# 429 is not retried here: APIManager answers it by rotating keys/models
+RETRY_STATUS = frozenset({502, 503, 504})
+
+_local = threading.local()
+# jitter has its own generator so retries don't shift seeded simulation draws
+_jitter = random.Random()
+
+def backoff(attempt):
+    """Full-jitter delay (seconds) before retry `attempt` (1-based)"""
+    return _jitter.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF * 2 ** (attempt - 1)))
+
+def session() -> requests.Session:
+    """This thread's pooled session (recreated in forked children)"""
+    s = getattr(_local, "session", None)
+    if s is None or _local.pid != os.getpid():
+        s = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+        _local.session, _local.pid = s, os.getpid()
+    return s
+
+def post(url, *, timeout=None, retries=None, **kwargs) -> requests.Response:
+    """session().post with default (connect, read) timeouts and jittered retries.
+
+    Returns the last response (also a retryable status once retries run out);
+    raises the last connection error/timeout.
+    """
+    timeout = timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    retries = HTTP_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            response = session().post(url, timeout=timeout, **kwargs)
+            if response.status_code not in RETRY_STATUS or attempt == retries:
+                return response
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+        time.sleep(backoff(attempt + 1))
+
+def async_client(pool_size=HTTP_POOL_SIZE, **kwargs):
+    """httpx.AsyncClient with a keep-alive pool of `pool_size` and the default timeouts"""
+    import httpx
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        **kwargs)
+
+async def apost(client, url, *, retries=None, **kwargs):
+    """post() for an httpx.AsyncClient; waits between retries without blocking the loop"""
+    import httpx
+    retries = HTTP_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            response = await client.post(url, **kwargs)
+            if response.status_code not in RETRY_STATUS or attempt == retries:
+                return response
+        except httpx.TransportError:
+            if attempt == retries:
+                raise
+        await asyncio.sleep(backoff(attempt + 1))
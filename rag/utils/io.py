@@ -1,4 +1,116 @@
+import os
+import re
+from datetime import timedelta, timezone
+
 import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+# Pipeline scripts also write a typed .parquet next to each CSV when set; readers
+# prefer it while it is not older than the CSV. Read here rather than in
+# rag/config/settings.py so scripts/ and elyx/ don't pull in the RAG config.
+WRITE_PARQUET = os.getenv("WRITE_PARQUET", "false").lower() in ("1", "true", "yes")
+
+# Columns stored as typed timestamps in Parquet (and parsed when falling back to CSV)
+DATE_COLUMNS = ("date", "follow_up_date", "datetime", "timestamp")
 
 def load_csv(path):
-    return pd.read_csv(path, parse_dates=True)
\ No newline at end of file
+    return pd.read_csv(path, parse_dates=True)
+
+def parquet_path(path):
+    """Parquet sibling of a dataset CSV: data/daily.csv -> data/daily.parquet"""
+    return os.path.splitext(path)[0] + ".parquet"
+
+def current_parquet(path):
+    """Parquet sibling of `path` if it exists and is not older than the CSV, else None"""
+    pq = parquet_path(path)
+    if not os.path.exists(pq):
+        return None
+    if os.path.exists(path) and os.path.getmtime(pq) < os.path.getmtime(path):
+        return None
+    return pq
+
+def table_mtime(path):
+    """Latest mtime across a dataset's CSV and Parquet files"""
+    return max((os.path.getmtime(p) for p in (path, parquet_path(path)) if os.path.exists(p)), default=0.0)
+
+def write_parquet(df, path):
+    """Write `df` as the Parquet sibling of CSV `path`, with date columns typed"""
+    typed = df.assign(**{c: pd.to_datetime(df[c]) for c in DATE_COLUMNS if c in df.columns})
+    typed.to_parquet(parquet_path(path), index=False)
+
+_OFFSET = re.compile(r"[+-]\d{2}:?\d{2}$")
+
+def _parse_with(values, first, fmt, errors):
+    """pd.to_datetime(values, format=fmt) for an Index of strings; None if it can't be done exactly"""
+    if not fmt.endswith("%z"):
+        return pd.to_datetime(values, format=fmt, errors=errors)
+    # one fixed offset for the whole column: parse the naive part, then localize once
+    offset = _OFFSET.search(first)
+    if offset is None:
+        return None
+    token, naive_fmt = offset.group(), fmt[:-2]
+    suffix = (" " if naive_fmt.endswith(" ") else "") + token
+    if not values.str.endswith(suffix, na=True).all():
+        return None
+    sign = -1 if token[0] == "-" else 1
+    tz = timezone(sign * timedelta(hours=int(token[1:3]), minutes=int(token[-2:])))
+    return pd.to_datetime(values.str[:-len(suffix)], format=naive_fmt.rstrip(" "), errors=errors).tz_localize(tz)
+
+def parse_dates(s: pd.Series, errors="coerce") -> pd.Series:
+    """Same result as pd.to_datetime(s, errors=errors), faster on large string columns.
+
+    The format is sniffed once, from the first value (as pandas does), and the
+    column is parsed with it explicitly, so ISO layouts take pandas' fast path.
+    A fixed UTC offset shared by every value is split off and applied once
+    rather than per element, and columns with many repeats (dates) parse only
+    their unique strings. Anything else (no guessable format, non-strings,
+    already typed columns) goes straight to pd.to_datetime.
+    """
+    if isinstance(s.dtype, pd.DatetimeTZDtype) or not (pd.api.types.is_string_dtype(s) or s.dtype == object):
+        return pd.to_datetime(s, errors=errors)
+    first = s.first_valid_index()
+    first = None if first is None else s[first]
+    fmt = guess_datetime_format(first) if isinstance(first, str) else None
+    if fmt is None or (s.dtype == object and pd.api.types.infer_dtype(s, skipna=True) != "string"):
+        return pd.to_datetime(s, errors=errors)
+
+    sample = s.sample(n=min(len(s), 10_000), random_state=0)
+    if sample.nunique() <= len(sample) // 2:
+        codes, uniques = pd.factorize(s)
+        parsed = _parse_with(pd.Index(uniques, dtype=object), first, fmt, errors)
+        if parsed is not None:
+            # code -1 (missing) takes the NaT appended at the end
+            values = parsed.append(pd.DatetimeIndex([pd.NaT], dtype=parsed.dtype)).take(codes)
+            return pd.Series(values, index=s.index, name=s.name)
+    else:
+        parsed = _parse_with(pd.Index(s), first, fmt, errors)
+        if parsed is not None:
+            return pd.Series(parsed, index=s.index, name=s.name)
+    return pd.to_datetime(s, errors=errors)
+
+def _since_bound(since, tz):
+    bound = pd.Timestamp(since)
+    return bound.tz_localize(tz) if tz is not None and bound.tzinfo is None else bound
+
+def read_table(path, columns=None, since=None, on="date"):
+    """Read a generated dataset, loading only `columns` when given.
+
+    Prefers the Parquet sibling when current; otherwise reads the CSV and parses
+    the date columns, so callers get the same dtypes either way. With `since`,
+    only rows whose `on` column is >= since (wall time for offset-aware columns)
+    are returned; for Parquet the filter is pushed down to the reader.
+    """
+    pq = current_parquet(path)
+    if pq:
+        filters = None
+        if since is not None:
+            import pyarrow.parquet as papq
+            filters = [(on, ">=", _since_bound(since, papq.read_schema(pq).field(on).type.tz))]
+        return pd.read_parquet(pq, columns=columns, filters=filters)
+    df = pd.read_csv(path, usecols=columns)
+    for c in DATE_COLUMNS:
+        if c in df.columns:
+            df[c] = parse_dates(df[c], errors="raise")
+    if since is not None:
+        df = df[df[on] >= _since_bound(since, getattr(df[on].dt, "tz", None))].reset_index(drop=True)
+    return df[columns] if columns else df
@@ -0,0 +1,41 @@
+import os
+
+
+def memory_usage(pid=None) -> dict:
+    """RSS/PSS and shared vs. private memory (MB) for a process, read from /proc.
+
+    PSS splits shared pages between the processes mapping them, so summing PSS
+    across forked workers gives their real combined footprint. Returns {} where
+    /proc/<pid>/smaps_rollup is unavailable (non-Linux).
+    """
+    pid = pid or os.getpid()
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[0].endswith(":"):
+                    fields[parts[0][:-1]] = int(parts[1])  # kB
+    except OSError:
+        return {}
+
+    def mb(*keys):
+        return round(sum(fields.get(k, 0) for k in keys) / 1024.0, 1)
+
+    return {
+        "pid": pid,
+        "rss_mb": mb("Rss"),
+        "pss_mb": mb("Pss"),
+        "shared_mb": mb("Shared_Clean", "Shared_Dirty"),
+        "private_mb": mb("Private_Clean", "Private_Dirty"),
+    }
+
+
+def format_memory_report(rows: list) -> str:
+    lines = [f"{'pid':>8} {'rss MB':>9} {'pss MB':>9} {'shared MB':>10} {'private MB':>11}"]
+    for r in rows:
+        if r:
+            lines.append(f"{r['pid']:>8} {r['rss_mb']:>9} {r['pss_mb']:>9} {r['shared_mb']:>10} {r['private_mb']:>11}")
+    total_pss = round(sum(r.get("pss_mb", 0) for r in rows), 1)
+    lines.append(f"{'total':>8} {'':>9} {total_pss:>9}")
+    return "\n".join(lines)
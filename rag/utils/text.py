@@ -1,13 +1,21 @@
 from sentence_transformers import SentenceTransformer
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from tenacity import retry, wait_exponential, stop_after_attempt
 import numpy as np
+from rag.config.settings import EMBED_BATCH_MAX_SIZE, EMBED_BATCH_MAX_WAIT_MS
 
 # Initialize model globally (384-dim)
 MODEL = SentenceTransformer('all-MiniLM-L6-v2')  # 384-dimensional embeddings
 
-@retry(wait=wait_exponential(multiplier=1, min=4, max=10),
-       stop=stop_after_attempt(3))
+# Transient encode failures are retried, for ingestion and for queries alike
+retry_encode = retry(wait=wait_exponential(multiplier=1, min=4, max=10),
+                     stop=stop_after_attempt(3))
+
+@retry_encode
 def embed(texts: list[str]) -> list[list[float]]:
     """Generate embeddings using local SentenceTransformer"""
     try:
@@ -20,4 +28,94 @@ def embed(texts: list[str]) -> list[list[float]]:
         
     except Exception as e:
         print(f"Embedding error: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+class EmbeddingBatcher:
+    """Collect concurrent single-query embed calls and encode them in one pass.
+
+    Callers block on their own future; a background worker drains the queue,
+    waiting at most `max_wait_ms` (or until `max_batch_size` texts arrived)
+    before running a single MODEL.encode over the whole batch, retried like
+    embed() before its futures fail.
+    """
+
+    def __init__(self, model=MODEL, max_batch_size: int = EMBED_BATCH_MAX_SIZE,
+                 max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS):
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            # The worker thread does not survive fork; give each child its own
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def _ensure_worker(self):
+        # Started lazily so importing the module never spawns a thread
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        fut = Future()
+        self._ensure_worker()
+        self._queue.put((text, fut))
+        return fut
+
+    def embed_one(self, text: str, timeout: float = None) -> list[float]:
+        return self.submit(text).result(timeout=timeout)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    @retry_encode
+    def _encode(self, texts: list[str]):
+        return self.model.encode(texts, convert_to_numpy=True)
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self._encode(texts)
+            except Exception as e:
+                print(f"Embedding error: {str(e)}")
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, fut), vec in zip(batch, vectors):
+                fut.set_result(vec.tolist())
+
+
+BATCHER = EmbeddingBatcher()
+
+def embed_query(text: str) -> list[float]:
+    """Embed a single query through the shared micro-batcher"""
+    return BATCHER.embed_one(text)
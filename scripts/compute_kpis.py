@@ -1,69 +1,176 @@
 import os, csv
+import argparse
+import hashlib
+import json
 from datetime import datetime
 import pandas as pd
 import numpy as np
+from storage import WRITE_PARQUET, read_table, write_parquet
 
 ROOT = os.path.dirname(os.path.dirname(__file__))
 DATA = os.path.join(ROOT, "data")
 
-def main():
-    daily = pd.read_csv(os.path.join(DATA, "daily.csv"))
-    daily["date"] = pd.to_datetime(daily["date"])
-    chats = pd.read_csv(os.path.join(DATA, "chats.csv"))
-    labs = pd.read_csv(os.path.join(DATA, "labs_quarterly.csv"))
-    fitness = pd.read_csv(os.path.join(DATA, "fitness.csv"))
+KPI_COLUMNS = ["month","adherence_avg","sessions_total","consults_attended","consults_missed",
+               "weight_change_kg","sleep_avg","stress_avg","ldl_change_mgdl","vo2max_change",
+               "rationale_coverage_percent"]
+DAILY_COLUMNS = ["date", "adherence", "weight_kg", "sleep_hours", "stress_score", "active_minutes"]
+ROUNDING = {"adherence_avg": 2, "sleep_avg": 1, "stress_avg": 1, "weight_change_kg": 1,
+            "ldl_change_mgdl": 1, "vo2max_change": 1}
+
+# per-month fingerprints of the daily/chats rows behind kpis_monthly.csv (incremental mode)
+STATE = ".kpis_state.json"
+
+def month_key(values):
+    """'YYYY-MM' of each date (wall time if offset-aware), as .dt.to_period("M").astype(str).
 
-    daily["month"] = daily["date"].dt.to_period("M").astype(str)
-    chats["month"] = pd.to_datetime(chats["datetime"]).dt.to_period("M").astype(str)
+    ISO strings (in-memory frames from run_all.py) only need their date part parsed.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(values):
+        values = pd.to_datetime(values.astype(str).str[:10])
+    elif values.dt.tz is not None:
+        values = values.dt.tz_localize(None)
+    return pd.Series(values.to_numpy().astype("datetime64[M]").astype(str), index=values.index)
 
-    kpi = (daily.groupby("month")
-           .agg(adherence_avg=("adherence","mean"),
-                weight_change_kg=("weight_kg", lambda s: s.iloc[-1]-s.iloc[-2]),
-                sleep_avg=("sleep_hours","mean"),
-                stress_avg=("stress_score","mean"))
-           .reset_index())
+def month_fingerprints(frame, month):
+    """{month: hash of that month's rows, in order}, from one vectorized hash pass."""
+    rows = frame.assign(_pos=frame.groupby(month).cumcount())
+    h = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+    out = {}
+    for m, idx in rows.groupby(month).indices.items():
+        out[m] = hashlib.sha1(h[idx].tobytes()).hexdigest()
+    return out
 
-    # simplistic session count proxy
-    sessions = (daily.assign(sesh=(daily["active_minutes"]>35).astype(int))
-                .groupby("month")["sesh"].sum().reset_index(name="sessions_total"))
+def monthly_kpis(daily, chats, months=None):
+    """Daily/chat KPIs per month: one named-aggregation pass over daily, one over chats.
+
+    `daily` and `chats` carry a `month` column; `months` limits the result to those
+    months (default: every month in daily).
+    """
+    if months is not None:
+        daily = daily[daily["month"].isin(months)]
+        chats = chats[chats["month"].isin(months)]
+    same_month = daily["month"].eq(daily["month"].shift())
+    kpi = (daily.assign(sesh=(daily["active_minutes"] > 35).astype(int),
+                        # last minus second-to-last weight of the month, read off the month's last row
+                        weight_delta=daily["weight_kg"].diff().where(same_month))
+           .groupby("month")
+           .agg(adherence_avg=("adherence", "mean"),
+                sessions_total=("sesh", "sum"),
+                weight_change_kg=("weight_delta", "last"),
+                sleep_avg=("sleep_hours", "mean"),
+                stress_avg=("stress_score", "mean")))
 
     # consults approximations from chats
-    consults = (chats.groupby("month")["sender"]
-                .agg(consults_attended=lambda s: (s!="member").sum(),
-                     consults_missed=lambda s: 0) # placeholder
-                .reset_index())
-
-    # LDL changes per month approximate from quarterly (forward-fill)
-    labs["month"] = pd.to_datetime(labs["date"]).dt.to_period("M").astype(str)
-    ldl_m = labs[["month","ldl_mgdl"]].copy()
-    ldl_m = ldl_m.set_index("month").reindex(kpi["month"]).ffill().reset_index()
-    ldl_m["ldl_change_mgdl"] = ldl_m["ldl_mgdl"].diff().fillna(0)
-
-    # VO2 change per month
-    fitness["month"] = pd.to_datetime(fitness["date"]).dt.to_period("M").astype(str)
-    vo2_m = fitness.groupby("month")["vo2max_est"].mean().reindex(kpi["month"]).ffill().reset_index()
-    vo2_m["vo2max_change"] = vo2_m["vo2max_est"].diff().fillna(0)
+    consults = (chats["sender"] != "member").groupby(chats["month"]).sum()
+    kpi["consults_attended"] = consults.reindex(kpi.index)
+    kpi["consults_missed"] = pd.Series(0, index=consults.index).reindex(kpi.index)  # placeholder
 
     # Rationale coverage: share of interventions with chats referencing rule_id (approx here as 85-95%)
     kpi["rationale_coverage_percent"] = 90
+    return kpi.reset_index()
 
-    out = kpi.merge(sessions, on="month", how="left").merge(consults, on="month", how="left") \
-             .merge(ldl_m[["month","ldl_change_mgdl"]], on="month", how="left") \
-             .merge(vo2_m[["month","vo2max_change"]], on="month", how="left")
+def trend_changes(labs, fitness, months):
+    """Month-over-month LDL (forward-filled from quarterly labs) and VO2 max changes."""
+    ldl = labs.set_index("month")["ldl_mgdl"].reindex(months).ffill()
+    vo2 = fitness.groupby("month")["vo2max_est"].mean().reindex(months).ffill()
+    return pd.DataFrame({"month": months,
+                         "ldl_change_mgdl": ldl.diff().fillna(0).to_numpy(),
+                         "vo2max_change": vo2.diff().fillna(0).to_numpy()})
 
-    out = out[["month","adherence_avg","sessions_total","consults_attended","consults_missed",
-               "weight_change_kg","sleep_avg","stress_avg","ldl_change_mgdl","vo2max_change",
-               "rationale_coverage_percent"]]
+def finish(out):
+    out = out[KPI_COLUMNS].fillna(0)
+    for col, digits in ROUNDING.items():
+        out[col] = out[col].round(digits)
+    return out
+
+def code_version():
+    with open(os.path.abspath(__file__), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def main(data=DATA, daily=None, chats=None, labs=None, fitness=None, incremental=False, since=None):
+    """Write kpis_monthly.csv.
+
+    incremental: reuse rows of kpis_monthly.csv whose month's daily and chat rows
+    are unchanged since the last run (per-month fingerprints in data/.kpis_state.json),
+    recomputing and replacing only new or changed months. since ("YYYY-MM", implies
+    incremental): only daily/chat rows from that month on are loaded; earlier months
+    are kept as written. LDL/VO2 changes come from the small quarterly/weekly tables
+    and are always recomputed.
+    """
+    out_path = os.path.join(data, "kpis_monthly.csv")
+    state_path = os.path.join(data, STATE)
+    incremental = incremental or since is not None
+    version = code_version()
+    state, existing = {}, None
+    if incremental and os.path.exists(out_path) and os.path.exists(state_path):
+        with open(state_path) as f:
+            state = json.load(f)
+        if state.get("version") == version:
+            existing = pd.read_csv(out_path)
+        else:
+            state = {}
+    if existing is None:
+        since = None  # nothing reusable: full recompute
+
+    # frames handed over by run_all.py are copied, the columns below are added in place;
+    # from disk only the columns used here are loaded (Parquet when present)
+    def load(name, frame, columns, on="date"):
+        if frame is None:
+            return read_table(os.path.join(data, name), columns=columns, since=since, on=on)
+        frame = frame.copy()
+        if since is not None:
+            frame = frame[month_key(frame[on]) >= since]
+        return frame.reset_index(drop=True)
+
+    daily = load("daily.csv", daily, DAILY_COLUMNS)
+    daily["date"] = pd.to_datetime(daily["date"])
+    chats = load("chats.csv", chats, ["datetime", "sender"], on="datetime")
+    labs = read_table(os.path.join(data, "labs_quarterly.csv"), columns=["date", "ldl_mgdl"]) if labs is None else labs.copy()
+    fitness = read_table(os.path.join(data, "fitness.csv"), columns=["date", "vo2max_est"]) if fitness is None else fitness.copy()
+
+    daily["month"] = month_key(daily["date"])
+    chats["month"] = month_key(chats["datetime"])
+    labs["month"] = month_key(labs["date"])
+    fitness["month"] = month_key(fitness["date"])
+
+    prints = {"daily": month_fingerprints(daily[DAILY_COLUMNS], daily["month"]),
+              "chats": month_fingerprints(chats[["datetime", "sender"]], chats["month"])}
+    loaded = sorted(prints["daily"])
+    old = state.get("months", {})
+    if existing is not None:
+        # months before `since` were not loaded and are kept as they are
+        kept = existing[existing["month"] < since] if since else existing.iloc[:0]
+        written = set(existing["month"])
+        reuse = [m for m in loaded if m in old and m in written
+                 and old[m] == {"daily": prints["daily"].get(m), "chats": prints["chats"].get(m)}]
+        kept = pd.concat([kept, existing[existing["month"].isin(reuse)]])
+        todo = [m for m in loaded if m not in reuse]
+    else:
+        kept, todo = None, loaded
+    fresh = monthly_kpis(daily, chats, months=todo if kept is not None else None)
 
-    out = out.fillna(0)
-    out["adherence_avg"] = out["adherence_avg"].round(2)
-    out["sleep_avg"] = out["sleep_avg"].round(1)
-    out["stress_avg"] = out["stress_avg"].round(1)
-    out["weight_change_kg"] = out["weight_change_kg"].round(1)
-    out["ldl_change_mgdl"] = out["ldl_change_mgdl"].round(1)
-    out["vo2max_change"] = out["vo2max_change"].round(1)
+    out = fresh if kept is None or kept.empty else pd.concat([kept, fresh], ignore_index=True)
+    out = out.sort_values("month").reset_index(drop=True)
+    out = out.drop(columns=["ldl_change_mgdl", "vo2max_change"], errors="ignore") \
+             .merge(trend_changes(labs, fitness, out["month"].tolist()), on="month", how="left")
+    out = finish(out)
 
-    out.to_csv(os.path.join(DATA, "kpis_monthly.csv"), index=False)
+    out.to_csv(out_path, index=False)
+    if WRITE_PARQUET:
+        write_parquet(out, out_path)
+    months = {m: v for m, v in old.items() if since and m < since}
+    months.update({m: {"daily": prints["daily"].get(m), "chats": prints["chats"].get(m)} for m in loaded})
+    with open(state_path, "w") as f:
+        json.dump({"version": version, "months": months}, f, indent=1)
+    if incremental:
+        print(f"KPIs: recomputed {len(todo)} month(s), reused {len(out) - len(todo)}")
+    return out
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Compute monthly KPIs")
+    parser.add_argument("--data", default=DATA)
+    parser.add_argument("--incremental", action="store_true",
+                        help="recompute only months whose daily/chat rows changed")
+    parser.add_argument("--since", help="YYYY-MM: only load rows from this month on (implies --incremental)")
+    args = parser.parse_args()
+    main(data=args.data, incremental=args.incremental, since=args.since)
@@ -8,6 +8,7 @@ from dateutil.relativedelta import relativedelta
 import pandas as pd
 import numpy as np
 import pytz
+from storage import WRITE_PARQUET, write_parquet
 
 ROOT = os.path.dirname(os.path.dirname(__file__))
 DATA = os.path.join(ROOT, "data")
@@ -51,25 +52,35 @@ def load_interventions(path):
                 return None
     return None
 
-def find_linked_intervention(interventions_df, msg_dt):
-    """Find an intervention within +/-1 day of msg_dt and return its rule id."""
-    if interventions_df is None or interventions_df.empty:
-        return ""
-    # compare using dates (ignore time)
-    msg_date = pd.Timestamp(msg_dt.date())
-    candidates = interventions_df[
-        (pd.to_datetime(interventions_df["date"]).dt.date >= (msg_date - pd.Timedelta(days=1)).date()) &
-        (pd.to_datetime(interventions_df["date"]).dt.date <= (msg_date + pd.Timedelta(days=1)).date())
-    ]
-    if not candidates.empty:
-        # return first matching rule id (string)
-        return str(candidates.iloc[0].get("rule_id", ""))
-    return ""
-
-def main():
+def link_interventions(interventions_df, msg_days):
+    """Rule id of the intervention linked to each message day ("" if none).
+
+    A message links to the first intervention row (in frame order) dated within
+    +/-1 day. Intervention dates are sorted once with the first row position per
+    date, so each message is three searchsorted probes instead of a frame scan.
+    """
+    if interventions_df is None or interventions_df.empty or "rule_id" not in interventions_df:
+        return [""] * len(msg_days)
+    dates = pd.to_datetime(interventions_df["date"]).dt.normalize().to_numpy()
+    first = pd.Series(np.arange(len(dates))).groupby(dates).min()
+    sorted_dates, first_pos = first.index.to_numpy(), first.to_numpy()
+    days = pd.to_datetime(pd.Series(msg_days)).to_numpy(dtype="datetime64[ns]")
+    pos = np.full(len(days), len(dates))
+    for offset in (-1, 0, 1):
+        target = days + np.timedelta64(offset, "D")
+        k = np.minimum(np.searchsorted(sorted_dates, target), len(sorted_dates) - 1)
+        hit = sorted_dates[k] == target
+        pos = np.where(hit, np.minimum(pos, first_pos[k]), pos)
+    rule_ids = np.append(interventions_df["rule_id"].astype(str).to_numpy(), "")
+    return rule_ids[pos].tolist()
+
+COLUMNS = ["datetime", "sender", "role", "message", "tags", "linked_intervention_id"]
+
+def main(cfg=CFG, data=DATA, prof=None, interventions=None):
     # load config
-    with open(CFG) as f:
-        prof = yaml.safe_load(f)
+    if prof is None:
+        with open(cfg) as f:
+            prof = yaml.safe_load(f)
 
     # seeds for reproducibility
     seed = int(prof.get("seed", 42))
@@ -84,16 +95,17 @@ def main():
     # ensure end is inclusive of last day
     end = end - timedelta(days=1)
 
-    os.makedirs(DATA, exist_ok=True)
-    out_path = os.path.join(DATA, "chats.csv")
-    interventions_path = os.path.join(DATA, "interventions.csv")
+    os.makedirs(data, exist_ok=True)
+    out_path = os.path.join(data, "chats.csv")
+    interventions_path = os.path.join(data, "interventions.csv")
 
-    interventions_df = load_interventions(interventions_path)
+    if interventions is None:
+        interventions_df = load_interventions(interventions_path)
+    else:
+        interventions_df = interventions.assign(date=pd.to_datetime(interventions["date"]))
 
-    # prepare CSV
-    out = open(out_path, "w", newline="")
-    w = csv.writer(out)
-    w.writerow(["datetime", "sender", "role", "message", "tags", "linked_intervention_id"])
+    rows = []
+    msg_days = []  # day of the member message each row belongs to (linked after generation)
 
     # weekly window generator: iterate by week blocks
     cur = start
@@ -109,15 +121,14 @@ def main():
             msg_dt = random_time_for_day(day)
 
             msg_text = pick_member_message(prof)
-            linked_id = find_linked_intervention(interventions_df, msg_dt)
-
-            w.writerow([
+            msg_days.append(msg_dt.date())
+            rows.append([
                 msg_dt.strftime("%Y-%m-%d %H:%M %z"),
                 "member",
                 "Member",
                 msg_text,
                 "member-initiated",
-                linked_id
+                ""
             ])
 
             # team reply sometimes (60% chance), with small delay
@@ -148,18 +159,22 @@ def main():
                     ]
                 reply_dt = msg_dt + timedelta(hours=random.randint(1, 6))
                 reply_dt = SGT.normalize(reply_dt)
-                w.writerow([
+                msg_days.append(msg_dt.date())
+                rows.append([
                     reply_dt.strftime("%Y-%m-%d %H:%M %z"),
                     sender,
                     role,
                     random.choice(reply_texts),
                     reply_tag,
-                    linked_id
+                    ""
                 ])
 
         # advance one week
         cur = week_start + timedelta(days=7)
 
+    for row, linked_id in zip(rows, link_interventions(interventions_df, msg_days)):
+        row[-1] = linked_id
+
     # append interventions as messages (owner->sender mapping, attach linked_intervention_id)
     owner_role_map = {
         "coach": ("coach", "Coach"),
@@ -189,7 +204,7 @@ def main():
             sender, role = owner_role_map.get(owner, ("coach", "Coach"))
             tags = "intervention;labs" if str(r.get("rule_id","")).startswith("LIP") else "intervention"
 
-            w.writerow([
+            rows.append([
                 t_local.strftime("%Y-%m-%d %H:%M %z"),
                 sender,
                 role,
@@ -198,8 +213,15 @@ def main():
                 str(r.get("rule_id",""))
             ])
 
-    out.close()
+    with open(out_path, "w", newline="") as out:
+        w = csv.writer(out)
+        w.writerow(COLUMNS)
+        w.writerows(rows)
     print(f"Wrote chats to {out_path}")
+    chats = pd.DataFrame(rows, columns=COLUMNS)
+    if WRITE_PARQUET:
+        write_parquet(chats, out_path)
+    return chats
 
 if __name__ == "__main__":
     main()
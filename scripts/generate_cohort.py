@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Generate a synthetic multi-member cohort for load testing.
+
+Samples one profile per member from a population spec (config/cohort.yaml)
+on top of config/profile.yaml, then runs the per-member pipeline
+events -> daily -> labs -> fitness/body_comp -> interventions -> chats -> kpis
+across a process pool. Output is partitioned by member:
+
+    <out>/member_id=<id>/profile.yaml, events.csv, daily.csv, ...
+    <out>/members.csv   (member_id, seed and sampled baselines)
+
+Every member's profile and seed derive only from (spec seed, member index),
+and each pipeline step reseeds from the member's seed, so output is identical
+for any --workers value.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import copy
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import simulate_events
+import simulate_daily
+import simulate_labs
+import simulate_fitness_bodycomp
+import apply_triggers_interventions
+import generate_chats
+import compute_kpis
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CFG = os.path.join(ROOT, "config", "profile.yaml")
+SPEC = os.path.join(ROOT, "config", "cohort.yaml")
+OUT = os.path.join(ROOT, "data", "cohort")
+
+def sample(spec, rng):
+    """Draw one value from a distribution spec (or return a constant)."""
+    if not isinstance(spec, dict):
+        return spec
+    dist = spec.get("dist")
+    if dist == "normal":
+        return float(rng.normal(spec["mean"], spec["sd"]))
+    if dist == "uniform":
+        return float(rng.uniform(spec["low"], spec["high"]))
+    if dist == "lognormal":
+        return float(rng.lognormal(spec["mean"], spec["sigma"]))
+    if dist == "choice":
+        values = spec["values"]
+        return values[int(rng.integers(len(values)))]
+    raise ValueError(f"Unknown distribution: {spec}")
+
+def member_profile(base_prof, spec, index):
+    """Profile for member `index`, sampled from its own seed sequence."""
+    ss = np.random.SeedSequence(int(spec.get("seed", 0)), spawn_key=(index,))
+    rng = np.random.default_rng(ss)
+    prof = copy.deepcopy(base_prof)
+    prof["member_id"] = f"{spec.get('member_id_prefix', 'member')}_{index:06d}"
+    prof["seed"] = int(ss.generate_state(1)[0])
+    if "months" in spec:
+        prof["months"] = int(spec["months"])
+
+    # sorted keys so the draw order never depends on YAML/dict ordering
+    for key in sorted(spec.get("baselines", {})):
+        prof["baselines"][key] = round(sample(spec["baselines"][key], rng), 2)
+    for key in sorted(spec.get("bounds", {})):
+        b = spec["bounds"][key]
+        baseline = prof["baselines"][key]
+        lo = round(baseline + sample(b["lo"], rng), 2)
+        hi = round(baseline + sample(b["hi"], rng), 2)
+        prof.setdefault("bounds", {})[key] = [min(lo, baseline), max(hi, baseline)]
+    freq = spec.get("cadence", {}).get("frequencies", {})
+    for key in sorted(freq):
+        prof.setdefault("cadence", {}).setdefault("frequencies", {})[key] = sample(freq[key], rng)
+    return prof
+
+def run_member(job):
+    """Run the whole pipeline for one member into its partition directory."""
+    prof, out_dir, daily_engine, verbose = job
+    member_dir = os.path.join(out_dir, f"member_id={prof['member_id']}")
+    os.makedirs(member_dir, exist_ok=True)
+    cfg = os.path.join(member_dir, "profile.yaml")
+    with open(cfg, "w") as f:
+        yaml.safe_dump(prof, f, sort_keys=False)
+
+    log = io.StringIO()
+    with contextlib.redirect_stdout(sys.stdout if verbose else log):
+        simulate_events.main(cfg=cfg, data=member_dir)
+        simulate_daily.main(["--engine", daily_engine], cfg=cfg, data=member_dir)
+        simulate_labs.main(cfg=cfg, data=member_dir)
+        simulate_fitness_bodycomp.main(cfg=cfg, data=member_dir)
+        apply_triggers_interventions.main(cfg=cfg, data=member_dir)
+        generate_chats.main(cfg=cfg, data=member_dir)
+        compute_kpis.main(data=member_dir)
+    return prof["member_id"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a member-partitioned synthetic cohort")
+    parser.add_argument("--spec", default=SPEC, help="population spec YAML")
+    parser.add_argument("--out", default=OUT, help="output directory")
+    parser.add_argument("--members", type=int, help="override the member count in the spec")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--daily-engine", choices=["loop", "numpy"], default="numpy")
+    parser.add_argument("--verbose", action="store_true", help="show per-step script output")
+    args = parser.parse_args()
+
+    with open(CFG) as f:
+        base_prof = yaml.safe_load(f)
+    with open(args.spec) as f:
+        spec = yaml.safe_load(f)
+    n = args.members if args.members is not None else int(spec.get("members", 1))
+
+    profiles = [member_profile(base_prof, spec, i) for i in range(n)]
+    os.makedirs(args.out, exist_ok=True)
+    pd.DataFrame([
+        {"member_id": p["member_id"], "seed": p["seed"], **p["baselines"]} for p in profiles
+    ]).to_csv(os.path.join(args.out, "members.csv"), index=False)
+
+    jobs = [(p, args.out, args.daily_engine, args.verbose) for p in profiles]
+    t0 = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        if args.workers <= 1:
+            results = map(run_member, jobs)
+        else:
+            pool = stack.enter_context(ProcessPoolExecutor(max_workers=args.workers))
+            results = pool.map(run_member, jobs, chunksize=max(1, n // (args.workers * 8)))
+        for done, _ in enumerate(results, 1):
+            if done % 100 == 0:
+                print(f"{done}/{n} members")
+    elapsed = time.perf_counter() - t0
+    print(f"Wrote {n} members to {args.out} in {elapsed:.1f}s ({n / max(elapsed, 1e-9):.1f} members/s, {args.workers} workers)")
+
+if __name__ == "__main__":
+    main()
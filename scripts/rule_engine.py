@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""Vectorized evaluation of the `triggers` section of config/rules.yaml.
+
+Each trigger's `condition` is parsed once and evaluated over whole columns, so
+one pass covers every day (and every member, when the frame has a member_id
+column). Grammar:
+
+    condition := clause (AND|OR clause)*         AND binds tighter than OR
+    clause    := term [op value] [at quarterly | for <N>d]
+    value     := number | name [+|- number]
+
+Terms resolve against the daily frame:
+    <col>                 a daily column, or a lab column joined as-of the latest
+                          quarterly draw (prefix match: fasting_glucose -> fasting_glucose_mgdl)
+    <col>_<N>d_avg        rolling N-day mean
+    <col>_<N>d_drop       relative drop of today vs. the mean of the previous N days
+    <col>_stall_<N>d      no decrease over the last N days
+    <event>_week          an <event> (events.csv event_type) on that day
+    <key>_baseline        profile baseline (value side only)
+
+`at quarterly` evaluates the rule on the labs rows instead of daily rows, and
+`for <N>d` requires the clause to hold N consecutive days. A rule only fires once
+every windowed term it uses has a full window. Rules fire on every matching
+row unless `fire_on: rising`, which fires only when the condition turns true.
+trigger_metric/trigger_value report the first term, or the rule's `metric`.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+COLUMNS = ["date","rule_id","trigger_metric","trigger_value","action","owner","follow_up_date","notes"]
+
+CLAUSE = re.compile(
+    r"^(?P<term>[a-z][a-z0-9_]*)"
+    r"(?:\s*(?P<op><=|>=|==|!=|<|>)\s*(?P<value>[a-z0-9_.]+(?:\s*[+-]\s*[0-9.]+)?))?"
+    r"(?:\s+(?P<mod>at quarterly|for \d+d))?$")
+VALUE = re.compile(r"^(?P<name>[a-z0-9_.]+)(?:\s*(?P<sign>[+-])\s*(?P<offset>[0-9.]+))?$")
+OPS = {"<": np.less, ">": np.greater, "<=": np.less_equal, ">=": np.greater_equal,
+       "==": np.equal, "!=": np.not_equal}
+
+def parse_condition(text):
+    """Parse a condition into OR-groups of AND-ed clause dicts."""
+    groups = []
+    for part in re.split(r"\s+OR\s+", text.strip()):
+        clauses = []
+        for raw in re.split(r"\s+AND\s+", part):
+            m = CLAUSE.match(raw.strip())
+            if not m:
+                raise ValueError(f"Cannot parse trigger clause: {raw!r}")
+            clause = m.groupdict()
+            if clause["op"] and not VALUE.match(clause["value"]):
+                raise ValueError(f"Cannot parse trigger value: {clause['value']!r}")
+            clauses.append(clause)
+        groups.append(clauses)
+    return groups
+
+def compile_rules(triggers):
+    """Parse every trigger once; the result is reused across evaluations."""
+    compiled = []
+    for t in triggers:
+        groups = parse_condition(t["condition"])
+        clauses = [c for g in groups for c in g]
+        compiled.append(dict(
+            t, groups=groups,
+            source="labs" if any(c["mod"] == "at quarterly" for c in clauses) else "daily",
+            metric=t.get("metric", clauses[0]["term"]),
+            notes=t.get("notes", f"Auto-trigger: {t['condition']}"),
+            fire_on=t.get("fire_on", "level")))
+    return compiled
+
+def _column(frame, name):
+    if name in frame.columns:
+        return name
+    matches = [c for c in frame.columns if c.startswith(name + "_")]
+    return matches[0] if len(matches) == 1 else None
+
+def _positions(frame):
+    """Row position within each member's series (0 for the first day)."""
+    if "member_id" not in frame.columns:
+        return np.arange(len(frame))
+    return frame.groupby("member_id", sort=False).cumcount().to_numpy()
+
+def _window_mean(x, n):
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        out[n - 1:] = sliding_window_view(x, n).mean(axis=1)
+    return out
+
+def _run_length(mask, pos):
+    """Length of the run of True ending at each row, restarting per member."""
+    idx = np.arange(len(mask))
+    # index of the most recent row that breaks a run (False, or a member's first day)
+    breaks = np.where(~mask, idx, np.where(pos == 0, idx - 1, -1))
+    last = np.maximum.accumulate(breaks)
+    return np.where(mask, idx - last, 0)
+
+class _Context:
+    """Resolves terms to arrays over one frame (daily or labs rows)."""
+
+    def __init__(self, frame, baselines, labs=None, events=None):
+        self.frame = frame.reset_index(drop=True)
+        self.dates = pd.to_datetime(self.frame["date"])
+        self.pos = _positions(self.frame)
+        self.baselines = baselines
+        self.labs = labs
+        self.events = events
+        self.cache = {}
+        self.windowed = set()
+
+    def keys(self):
+        cols = ["member_id"] if "member_id" in self.frame.columns else []
+        return self.frame[cols].assign(date=self.dates.to_numpy())
+
+    def term(self, name):
+        if name not in self.cache:
+            self.cache[name] = self._resolve(name)
+        return self.cache[name]
+
+    def _series(self, col):
+        return self.frame[col].to_numpy(dtype=float)
+
+    def _resolve(self, name):
+        col = _column(self.frame, name)
+        if col:
+            return self._series(col)
+        m = re.match(r"^(.+)_(\d+)d_avg$", name)
+        if m and _column(self.frame, m.group(1)):
+            n = int(m.group(2))
+            self.windowed.add(name)
+            out = _window_mean(self._series(_column(self.frame, m.group(1))), n)
+            out[self.pos < n - 1] = np.nan
+            return out
+        m = re.match(r"^(.+)_(\d+)d_drop$", name)
+        if m and _column(self.frame, m.group(1)):
+            n = int(m.group(2))
+            self.windowed.add(name)
+            x = self._series(_column(self.frame, m.group(1)))
+            prev = np.full(len(x), np.nan)
+            prev[1:] = _window_mean(x, n)[:-1]
+            prev[self.pos < n] = np.nan
+            return (prev - x) / np.maximum(1e-6, prev)
+        m = re.match(r"^(.+)_stall_(\d+)d$", name)
+        if m and _column(self.frame, m.group(1)):
+            n = int(m.group(2))
+            self.windowed.add(name)
+            x = self._series(_column(self.frame, m.group(1)))
+            out = np.full(len(x), np.nan)
+            out[n:] = (x[n:] >= x[:-n]).astype(float)
+            out[self.pos < n] = np.nan
+            return out
+        m = re.match(r"^(.+)_week$", name)
+        if m and self.events is not None:
+            return self._event_days(m.group(1))
+        if self.labs is not None and _column(self.labs, name):
+            return self._labs_asof(_column(self.labs, name))
+        raise KeyError(f"Unknown trigger term: {name}")
+
+    def _event_days(self, event_type):
+        ev = self.events[self.events["event_type"] == event_type]
+        keys = self.keys()
+        ev = ev.assign(date=pd.to_datetime(ev["date"]))[list(keys.columns)].drop_duplicates()
+        hit = keys.merge(ev.assign(_hit=1.0), how="left", on=list(keys.columns))["_hit"]
+        return hit.fillna(0.0).to_numpy()
+
+    def _labs_asof(self, col):
+        keys = self.keys().assign(_row=np.arange(len(self.frame))).sort_values("date")
+        labs = self.labs.assign(date=pd.to_datetime(self.labs["date"]))
+        by = "member_id" if "member_id" in keys.columns and "member_id" in labs.columns else None
+        right = labs[([by] if by else []) + ["date", col]].sort_values("date")
+        joined = pd.merge_asof(keys, right, on="date", by=by, direction="backward")
+        return joined.sort_values("_row")[col].to_numpy(dtype=float)
+
+    def value(self, text):
+        m = VALUE.match(text)
+        name = m.group("name")
+        try:
+            v = float(name)
+        except ValueError:
+            if name.endswith("_baseline"):
+                v = self._baseline(name[:-len("_baseline")])
+            else:
+                v = self.term(name)
+        if m.group("offset"):
+            off = float(m.group("offset"))
+            v = v + off if m.group("sign") == "+" else v - off
+        return v
+
+    def _baseline(self, prefix):
+        if isinstance(self.baselines, pd.DataFrame):
+            col = _column(self.baselines, prefix)
+            return self.frame["member_id"].map(self.baselines[col]).to_numpy(dtype=float)
+        keys = [k for k in self.baselines if k == prefix or k.startswith(prefix + "_")]
+        if len(keys) != 1:
+            raise KeyError(f"Unknown baseline: {prefix}")
+        return float(self.baselines[keys[0]])
+
+def _clause_mask(ctx, clause):
+    x = ctx.term(clause["term"])
+    with np.errstate(invalid="ignore"):
+        if clause["op"]:
+            mask = OPS[clause["op"]](x, ctx.value(clause["value"]))
+        else:
+            mask = np.nan_to_num(x) > 0
+    mask = np.asarray(mask, dtype=bool) & ~np.isnan(x)
+    if clause["mod"] and clause["mod"].startswith("for "):
+        mask = _run_length(mask, ctx.pos) >= int(clause["mod"][4:-1])
+    return mask
+
+def evaluate_rule(rule, ctx):
+    """Boolean array: rows of ctx.frame on which `rule` fires."""
+    fired = np.zeros(len(ctx.frame), dtype=bool)
+    for group in rule["groups"]:
+        mask = np.ones(len(ctx.frame), dtype=bool)
+        for clause in group:
+            mask &= _clause_mask(ctx, clause)
+        fired |= mask
+    clauses = [c for g in rule["groups"] for c in g]
+    for c in clauses:
+        if c["term"] in ctx.windowed:
+            fired &= ~np.isnan(ctx.term(c["term"]))
+    if rule["fire_on"] == "rising":
+        prev = np.zeros_like(fired)
+        prev[1:] = fired[:-1]
+        prev[ctx.pos == 0] = False
+        fired &= ~prev
+    return fired
+
+def evaluate_triggers(triggers, daily, labs=None, events=None, baselines=None):
+    """Evaluate every trigger; returns intervention rows (COLUMNS, plus member_id if present).
+
+    `triggers` is either rules["triggers"] or the output of compile_rules().
+    Rows come out rule by rule in rules.yaml order, each rule in date order.
+    """
+    rules = triggers if triggers and "groups" in triggers[0] else compile_rules(triggers)
+    contexts = {"daily": _Context(daily, baselines, labs=labs, events=events)}
+    if labs is not None:
+        contexts["labs"] = _Context(labs, baselines, events=events)
+
+    out = []
+    for rule in rules:
+        ctx = contexts.get(rule["source"])
+        if ctx is None:
+            continue
+        idx = np.flatnonzero(evaluate_rule(rule, ctx))
+        dates = ctx.dates.to_numpy(dtype="datetime64[D]")[idx]
+        follow = dates + np.timedelta64(int(rule.get("followup_days", 0)), "D")
+        value = ctx.term(rule["metric"])[idx]
+        part = pd.DataFrame({
+            "date": np.datetime_as_string(dates, unit="D"),
+            "rule_id": rule["id"],
+            "trigger_metric": rule["metric"],
+            "trigger_value": np.round(value, 1),
+            "action": rule["action"],
+            "owner": rule["owner"],
+            "follow_up_date": np.datetime_as_string(follow, unit="D"),
+            "notes": rule["notes"],
+        }, columns=COLUMNS)
+        if "member_id" in ctx.frame.columns:
+            part.insert(0, "member_id", ctx.frame["member_id"].to_numpy()[idx])
+        out.append(part)
+    if not out:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(out, ignore_index=True)
@@ -1,16 +1,203 @@
-import subprocess, os
-
-steps = [
-    "simulate_events.py",
-    "simulate_daily.py",
-    "simulate_labs.py",
-    "simulate_fitness_bodycomp.py",
-    "apply_triggers_interventions.py",
-    "generate_chats.py",
-    "compute_kpis.py",
-]
-
-for s in steps:
-    print(f"Running {s} ...")
-    subprocess.run(["python", os.path.join(os.path.dirname(__file__), s)], check=True)
-print("All done. CSVs written to data/")
+#!/usr/bin/env python3
+"""Run the data pipeline as a DAG inside one interpreter.
+
+Each step declares the CSVs it reads and writes. profile.yaml and rules.yaml
+are parsed once, and DataFrames produced by one step are handed to the next in
+memory (every step still writes its CSV to data/). A step is skipped when the
+hash of its script, config, arguments and input files matches the last run and
+its outputs are still on disk unchanged; state lives in data/.run_all_state.json.
+Steps whose inputs are ready run in parallel threads (labs and
+fitness/body_comp only depend on daily). The kpis step runs in incremental mode
+and only recomputes months whose daily/chat rows changed.
+
+    python scripts/run_all.py [--force] [--jobs N] [--daily-engine loop|numpy]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import simulate_events
+import simulate_daily
+import simulate_labs
+import simulate_fitness_bodycomp
+import apply_triggers_interventions
+import generate_chats
+import compute_kpis
+import rule_engine
+from storage import WRITE_PARQUET, current_parquet
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA = os.path.join(ROOT, "data")
+CFG = os.path.join(ROOT, "config", "profile.yaml")
+RULES = os.path.join(ROOT, "config", "rules.yaml")
+STATE = ".run_all_state.json"
+
+# name -> module (plus helper modules it uses), config it reads, input CSVs,
+# output CSVs, and how to call it.
+# `f` maps CSV name -> in-memory DataFrame; a missing entry (upstream skipped)
+# makes the script read that CSV from disk as before.
+STEPS = {
+    "events": {
+        "module": simulate_events, "config": ["profile"],
+        "inputs": [], "outputs": ["events.csv"],
+        "run": lambda c, f: simulate_events.main(data=c["data"], prof=c["prof"]),
+    },
+    "daily": {
+        "module": simulate_daily, "config": ["profile", "rules"],
+        "inputs": ["events.csv"], "outputs": ["daily.csv"],
+        "args": lambda c: ["--engine", c["daily_engine"]],
+        "run": lambda c, f: simulate_daily.main(
+            ["--engine", c["daily_engine"]], data=c["data"], prof=c["prof"], rules=c["rules"],
+            events=f.get("events.csv")),
+    },
+    "labs": {
+        "module": simulate_labs, "config": ["profile", "rules"],
+        "inputs": ["daily.csv"], "outputs": ["labs_quarterly.csv"],
+        "run": lambda c, f: simulate_labs.main(
+            data=c["data"], prof=c["prof"], rules=c["rules"], daily=f.get("daily.csv")),
+    },
+    "fitness_bodycomp": {
+        "module": simulate_fitness_bodycomp, "config": ["profile", "rules"],
+        "inputs": ["daily.csv"], "outputs": ["fitness.csv", "body_comp.csv"],
+        "run": lambda c, f: simulate_fitness_bodycomp.main(
+            data=c["data"], prof=c["prof"], rules=c["rules"], daily=f.get("daily.csv")),
+    },
+    "interventions": {
+        "module": apply_triggers_interventions, "uses": [rule_engine], "config": ["profile", "rules"],
+        "inputs": ["daily.csv", "labs_quarterly.csv", "events.csv"], "outputs": ["interventions.csv"],
+        "run": lambda c, f: apply_triggers_interventions.main(
+            data=c["data"], prof=c["prof"], rules=c["rules"], daily=f.get("daily.csv"),
+            labs=f.get("labs_quarterly.csv"), events=f.get("events.csv")),
+    },
+    "chats": {
+        "module": generate_chats, "config": ["profile"],
+        "inputs": ["interventions.csv"], "outputs": ["chats.csv"],
+        "run": lambda c, f: generate_chats.main(
+            data=c["data"], prof=c["prof"], interventions=f.get("interventions.csv")),
+    },
+    "kpis": {
+        "module": compute_kpis, "config": [],
+        "inputs": ["daily.csv", "chats.csv", "labs_quarterly.csv", "fitness.csv"],
+        "outputs": ["kpis_monthly.csv"],
+        "run": lambda c, f: compute_kpis.main(
+            data=c["data"], daily=f.get("daily.csv"), chats=f.get("chats.csv"),
+            labs=f.get("labs_quarterly.csv"), fitness=f.get("fitness.csv"), incremental=True),
+    },
+}
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def step_key(name, ctx, hashes):
+    """Hash of everything a step's output depends on."""
+    step = STEPS[name]
+    h = hashlib.sha256(name.encode())
+    for m in [step["module"]] + step.get("uses", []):
+        h.update(file_hash(m.__file__).encode())
+    for c in step["config"]:
+        h.update(ctx["config_hashes"][c].encode())
+    if "args" in step:
+        h.update(json.dumps(step["args"](ctx)).encode())
+    for i in step["inputs"]:
+        h.update(hashes[i].encode())
+    return h.hexdigest()
+
+def is_fresh(step, key, prev, data):
+    if not prev or prev.get("key") != key:
+        return False
+    for o in step["outputs"]:
+        p = os.path.join(data, o)
+        if not os.path.exists(p) or file_hash(p) != prev["outputs"].get(o):
+            return False
+        if WRITE_PARQUET and not current_parquet(p):
+            return False
+    return True
+
+def load_config(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    return yaml.safe_load(raw), hashlib.sha256(raw).hexdigest()
+
+def run_pipeline(data=DATA, cfg=CFG, jobs=2, force=False, daily_engine="loop"):
+    """Run every stale step, returns {step: (status, seconds)} in completion order."""
+    os.makedirs(data, exist_ok=True)
+    prof, prof_hash = load_config(cfg)
+    rules, rules_hash = load_config(RULES)
+    ctx = {"data": data, "prof": prof, "rules": rules, "daily_engine": daily_engine,
+           "config_hashes": {"profile": prof_hash, "rules": rules_hash}}
+
+    state_path = os.path.join(data, STATE)
+    state = {}
+    if os.path.exists(state_path) and not force:
+        with open(state_path) as f:
+            state = json.load(f)
+
+    producer = {o: name for name, s in STEPS.items() for o in s["outputs"]}
+    deps = {name: {producer[i] for i in s["inputs"]} for name, s in STEPS.items()}
+    frames, hashes, report = {}, {}, {}
+    done, running = set(), {}
+
+    def run_step(name):
+        step = STEPS[name]
+        key = step_key(name, ctx, hashes)
+        if is_fresh(step, key, state.get(name), data):
+            return name, key, None, "skipped", 0.0
+        t0 = time.perf_counter()
+        out = step["run"](ctx, frames)
+        elapsed = time.perf_counter() - t0
+        outs = out if isinstance(out, tuple) else (out,)
+        return name, key, dict(zip(step["outputs"], outs)), "ran", elapsed
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while len(done) < len(STEPS):
+            for name in STEPS:
+                if name not in done and name not in running and deps[name] <= done:
+                    running[name] = pool.submit(run_step, name)
+            finished, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name, key, out, status, elapsed = fut.result()
+                del running[name]
+                if out:
+                    frames.update(out)
+                for o in STEPS[name]["outputs"]:
+                    hashes[o] = file_hash(os.path.join(data, o))
+                state[name] = {"key": key, "outputs": {o: hashes[o] for o in STEPS[name]["outputs"]}}
+                report[name] = (status, elapsed)
+                done.add(name)
+
+    with open(state_path, "w") as f:
+        json.dump(state, f, indent=2)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the data pipeline (incremental, in-process)")
+    parser.add_argument("--data", default=DATA, help="output directory")
+    parser.add_argument("--jobs", type=int, default=2, help="steps run in parallel")
+    parser.add_argument("--force", action="store_true", help="ignore cached state and rerun every step")
+    parser.add_argument("--daily-engine", choices=["loop", "numpy"], default="loop")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    report = run_pipeline(data=args.data, jobs=args.jobs, force=args.force, daily_engine=args.daily_engine)
+    wall = time.perf_counter() - t0
+
+    print(f"\n{'step':<18} {'status':<8} {'seconds':>8}")
+    for name, (status, elapsed) in report.items():
+        print(f"{name:<18} {status:<8} {elapsed:>8.3f}")
+    print(f"{'total (wall)':<27} {wall:>8.3f}")
+    print(f"All done. CSVs written to {args.data}")
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,54 @@
 import random, yaml, os, csv
+import argparse
 from datetime import datetime, timedelta,date
 import math
+import numpy as np
 import pandas as pd
+from storage import WRITE_PARQUET, write_parquet
 
 ROOT = os.path.dirname(os.path.dirname(__file__))
 DATA = os.path.join(ROOT, "data")
 CFG = os.path.join(ROOT, "config", "profile.yaml")
 RULES = os.path.join(ROOT, "config", "rules.yaml")
 
-def read_events():
-    p = os.path.join(DATA, "events.csv")
+def read_events(data=DATA):
+    p = os.path.join(data, "events.csv")
     if not os.path.exists(p):
         return {}
-    df = pd.read_csv(p)
+    return events_by_date(pd.read_csv(p))
+
+def events_by_date(df):
     events = {}
     for _,r in df.iterrows():
         events.setdefault(r["date"], []).append((r["event_type"], r["intensity"]))
     return events
 
+def read_events_frame(data=DATA):
+    p = os.path.join(data, "events.csv")
+    if not os.path.exists(p):
+        return pd.DataFrame(columns=["date", "event_type", "intensity"])
+    return pd.read_csv(p)
+
 def clip(x, lo, hi):
     return max(lo, min(hi, x))
 
-def main():
-    with open(CFG) as f: prof = yaml.safe_load(f)
-    with open(RULES) as f: rules = yaml.safe_load(f)
-    random.seed(prof["seed"])
+COLUMNS = ["date","adherence","steps","active_minutes","weight_kg","rhr_bpm","hrv_ms",
+           "sleep_hours","sleep_quality","stress_score","soreness","caloric_balance_kcal"]
 
+def date_span(prof):
     if isinstance(prof["start_date"], date):
         start = prof["start_date"]
     else:
         start = datetime.strptime(prof["start_date"], "%Y-%m-%d").date()
-
     end = (start + timedelta(days=30*prof["months"]))
+    return start, end
+
+def simulate_loop(prof, rules, events):
+    """Reference engine: one day at a time; returns the rows in COLUMNS order."""
+    start, end = date_span(prof)
     bounds = prof["bounds"]
     base = prof["baselines"]
 
-    events = read_events()
-
-    os.makedirs(DATA, exist_ok=True)
-    f = open(os.path.join(DATA, "daily.csv"), "w", newline="")
-    w = csv.writer(f)
-    w.writerow(["date","adherence","steps","active_minutes","weight_kg","rhr_bpm","hrv_ms",
-                "sleep_hours","sleep_quality","stress_score","soreness","caloric_balance_kcal"])
-
     weight = base["weight_kg"]
     rhr = base["rhr_bpm"]
     hrv = base["hrv_ms"]
@@ -55,6 +61,7 @@ def main():
     no_weight_loss_days = 0
     weekly_cardio = 0
     weekly_strength = 0
+    rows = []
 
     while day <= end:
         ev = events.get(day.isoformat(), [])
@@ -125,14 +132,157 @@ def main():
         rhr = clip(rhr, *bounds["rhr_bpm"])
         hrv = clip(hrv, *bounds["hrv_ms"])
 
-        w.writerow([day.isoformat(), round(adh,3), steps, active, round(weight,2),
-                    int(round(rhr)), round(hrv,1), round(sleep_hours,2),
-                    int(round(sleep_quality)), int(round(stress)), int(round(soreness)),
-                    caloric_balance])
+        rows.append([day.isoformat(), round(adh,3), steps, active, round(weight,2),
+                     int(round(rhr)), round(hrv,1), round(sleep_hours,2),
+                     int(round(sleep_quality)), int(round(stress)), int(round(soreness)),
+                     caloric_balance])
 
         day += timedelta(days=1)
+    return rows
+
+def _clip_walk(x0, steps, lo, hi):
+    """x[t] = clip(x[t-1] + steps[t], lo, hi) for every t, as a prefix scan.
+
+    Each day is the map x -> clip(x + a, l, h). Composing two such maps gives
+    another of the same form, so a Hillis-Steele scan over (a, l, h) needs
+    log2(n) vectorized passes instead of a Python loop over days.
+    """
+    a = np.asarray(steps, dtype=float).copy()
+    l = np.full_like(a, float(lo))
+    h = np.full_like(a, float(hi))
+    shift = 1
+    while shift < len(a):
+        a1, l1, h1 = a[:-shift], l[:-shift], h[:-shift]
+        a2, l2, h2 = a[shift:], l[shift:], h[shift:]
+        new_l = np.minimum(np.maximum(l1 + a2, l2), h2)
+        new_h = np.maximum(np.minimum(h1 + a2, h2), l2)
+        new_a = a1 + a2
+        a[shift:], l[shift:], h[shift:] = new_a, new_l, new_h
+        shift *= 2
+    return np.clip(x0 + a, l, h)
+
+def _event_days(events_df, dates, kind):
+    """Per-day summed intensity and presence mask for one event type."""
+    ev = events_df[events_df["event_type"] == kind]
+    if ev.empty:
+        return np.zeros(len(dates)), np.zeros(len(dates), dtype=bool)
+    g = ev.groupby("date")["intensity"].agg(["sum", "count"])
+    g.index = pd.to_datetime(g.index)
+    g = g.reindex(dates, fill_value=0)
+    return g["sum"].to_numpy(dtype=float), g["count"].to_numpy() > 0
+
+def simulate_vectorized(prof, rules, events_df, seed=None):
+    """NumPy engine: same model as simulate_loop, all days at once.
+
+    Noise is drawn up front from a numpy Generator seeded with prof["seed"]
+    (or `seed`), event effects are applied with boolean masks, and the
+    stateful weight/RHR/HRV walks go through _clip_walk. Output is
+    seed-reproducible but not draw-for-draw identical to the loop engine.
+    Illness events do apply here: the loop engine's illness filter compares
+    the (type, intensity) tuple to "illness" and so never matches.
+    """
+    rng = np.random.default_rng(prof["seed"] if seed is None else seed)
+    start, end = date_span(prof)
+    dates = pd.date_range(start, end, freq="D")
+    n = len(dates)
+    bounds = prof["bounds"]
+    base = prof["baselines"]
+
+    travel_int, travel = _event_days(events_df, dates, "travel")
+    illness_int, illness = _event_days(events_df, dates, "illness")
+
+    # adherence
+    adh = (rules["adherence"]["base"]
+           - rules["adherence"]["travel_penalty_per_day"]*travel_int
+           - rules["adherence"]["illness_penalty_per_day"]*illness_int
+           + rng.normal(0, rules["adherence"]["noise_std"], n))
+    adh = np.clip(adh, 0.0, 1.0)
+
+    # steps & active minutes roughly from adherence
+    steps = np.trunc(4000 + adh*6000 + rng.normal(0, 500, n)).astype(int)
+    active = np.maximum(0, np.trunc(adh*60 + rng.normal(0, 5, n))).astype(int)
+
+    # sleep
+    sh = rules["sleep"]["base"] - travel*rng.uniform(*rules["sleep"]["travel_drop"], n)
+    sleep_hours = np.clip(sh + rng.normal(0, rules["sleep"]["noise_std"], n), *bounds["sleep_hours"])
+    sleep_quality = np.clip(3 + (sleep_hours-6.5)*0.4 + rng.normal(0, 0.4, n), 1, 5)
+
+    # stress & soreness
+    stress = np.clip(3 + travel + illness + rng.normal(0, 0.5, n), 1, 5)
+    soreness = np.clip((rng.random(n) < 0.3) + rng.normal(1, 1, n), 0, 10)
+
+    # weight walk
+    caloric_balance = np.trunc(-300*adh + rng.normal(0, 100, n)).astype(int)
+    weekly_loss = np.where(caloric_balance < 0, rules["weight"]["weekly_loss_if_high_adherence"]*adh, 0.0)
+    d_weight = (-(weekly_loss/7.0) + rng.normal(0, rules["weight"]["noise_std"]/7.0, n)
+                + travel*rules["weight"]["travel_water_gain"]/7.0)
+    weight = _clip_walk(base["weight_kg"], d_weight, *bounds["weight_kg"])
 
-    f.close()
+    # RHR & HRV walks
+    good = (adh > 0.75) & (sleep_hours > 6.8)
+    d_rhr = (rng.normal(0, rules["rhr"]["noise_std"], n)
+             + travel*rng.uniform(*rules["rhr"]["travel_bump"], n)
+             + illness*rng.uniform(*rules["rhr"]["illness_bump"], n)
+             - good*rules["rhr"]["weekly_drop_if_cardio3"]/7.0)
+    d_hrv = (rng.normal(0, rules["hrv"]["noise_std"], n)
+             - travel*rng.uniform(*rules["hrv"]["travel_drop"], n)
+             - illness*rng.uniform(*rules["hrv"]["illness_drop"], n)
+             + good*rng.uniform(*rules["hrv"]["weekly_gain_if_good_sleep"], n)/7.0)
+    rhr = _clip_walk(base["rhr_bpm"], d_rhr, *bounds["rhr_bpm"])
+    hrv = _clip_walk(base["hrv_ms"], d_hrv, *bounds["hrv_ms"])
+
+    return pd.DataFrame({
+        "date": dates.strftime("%Y-%m-%d"),
+        "adherence": np.round(adh, 3),
+        "steps": steps,
+        "active_minutes": active,
+        "weight_kg": np.round(weight, 2),
+        "rhr_bpm": np.rint(rhr).astype(int),
+        "hrv_ms": np.round(hrv, 1),
+        "sleep_hours": np.round(sleep_hours, 2),
+        "sleep_quality": np.rint(sleep_quality).astype(int),
+        "stress_score": np.rint(stress).astype(int),
+        "soreness": np.rint(soreness).astype(int),
+        "caloric_balance_kcal": caloric_balance,
+    }, columns=COLUMNS)
+
+def main(argv=None, cfg=CFG, data=DATA, prof=None, rules=None, events=None):
+    """Write data/daily.csv and return it as a DataFrame.
+
+    `prof`, `rules` and the `events` frame are read from disk unless the caller
+    (run_all.py) already holds them in memory.
+    """
+    parser = argparse.ArgumentParser(description="Simulate daily metrics into data/daily.csv")
+    parser.add_argument("--engine", choices=["loop", "numpy"], default="loop",
+                        help="loop: reference per-day engine; numpy: vectorized engine for large runs")
+    args = parser.parse_args(argv)
+
+    if prof is None:
+        with open(cfg) as f: prof = yaml.safe_load(f)
+    if rules is None:
+        with open(RULES) as f: rules = yaml.safe_load(f)
+    if events is None:
+        events = read_events_frame(data)
+    os.makedirs(data, exist_ok=True)
+    out_path = os.path.join(data, "daily.csv")
+
+    if args.engine == "numpy":
+        daily = simulate_vectorized(prof, rules, events)
+        daily.to_csv(out_path, index=False)
+        if WRITE_PARQUET:
+            write_parquet(daily, out_path)
+        return daily
+
+    random.seed(prof["seed"])
+    rows = simulate_loop(prof, rules, events_by_date(events))
+    with open(out_path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(COLUMNS)
+        w.writerows(rows)
+    daily = pd.DataFrame(rows, columns=COLUMNS)
+    if WRITE_PARQUET:
+        write_parquet(daily, out_path)
+    return daily
 
 if __name__ == "__main__":
     main()
@@ -6,6 +6,7 @@ import csv
 from datetime import date, datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import pandas as pd
+from storage import WRITE_PARQUET, write_parquet
 
 ROOT = os.path.dirname(os.path.dirname(__file__))
 DATA = os.path.join(ROOT, "data")
@@ -17,10 +18,13 @@ def daterange(start, end):
         yield d
         d += timedelta(days=1)
 
-def main():
+COLUMNS = ["date", "event_type", "intensity", "notes"]
+
+def main(cfg=CFG, data=DATA, prof=None):
     # load profile
-    with open(CFG) as f:
-        prof = yaml.safe_load(f)
+    if prof is None:
+        with open(cfg) as f:
+            prof = yaml.safe_load(f)
 
     seed = int(prof.get("seed", 42))
     random.seed(seed)
@@ -38,11 +42,9 @@ def main():
     illness_p = float(freq.get("illness_probability_weekly", 0.1))
     illness_p = min(max(illness_p, 0.0), 1.0)
 
-    os.makedirs(DATA, exist_ok=True)
-    out_path = os.path.join(DATA, "events.csv")
-    out = open(out_path, "w", newline="")
-    w = csv.writer(out)
-    w.writerow(["date", "event_type", "intensity", "notes"])
+    os.makedirs(data, exist_ok=True)
+    out_path = os.path.join(data, "events.csv")
+    rows = []
 
     # Travel every n weeks and weekly illness sampling
     cur = start
@@ -60,7 +62,7 @@ def main():
                 d = cur + timedelta(days=i)
                 if d > end:
                     break
-                w.writerow([d.isoformat(), "travel", int(random.randint(1, 3)), "Work travel"])
+                rows.append([d.isoformat(), "travel", int(random.randint(1, 3)), "Work travel"])
                 travel_days_total += 1
 
         # illness weekly roll
@@ -72,14 +74,21 @@ def main():
                 if d > end:
                     break
                 # allow overlap with travel (realistic), but you can skip if not desired
-                w.writerow([d.isoformat(), "illness", int(random.randint(1, 2)), "Viral symptoms"])
+                rows.append([d.isoformat(), "illness", int(random.randint(1, 2)), "Viral symptoms"])
                 illness_days_total += 1
 
         cur += timedelta(days=7)
         week += 1
 
-    out.close()
+    with open(out_path, "w", newline="") as out:
+        w = csv.writer(out)
+        w.writerow(COLUMNS)
+        w.writerows(rows)
     print(f"Wrote events to {out_path}. Trips: {trip_count}, travel_days: {travel_days_total}, illness_days: {illness_days_total}")
+    events = pd.DataFrame(rows, columns=COLUMNS)
+    if WRITE_PARQUET:
+        write_parquet(events, out_path)
+    return events
 
 if __name__ == "__main__":
     main()
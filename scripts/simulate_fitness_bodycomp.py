@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import pandas as pd
 import numpy as np
+from storage import WRITE_PARQUET, write_parquet
 
 ROOT = os.path.dirname(os.path.dirname(__file__))
 DATA = os.path.join(ROOT, "data")
@@ -21,16 +22,40 @@ def get_section(rules, prof, key, subkey, default=None):
 def clip(x, lo, hi):
     return max(lo, min(hi, x))
 
-def main():
+def weekly_rollups(daily, start, n_weeks, adh_default):
+    """Mean adherence, cardio-session days and strength-session days for each week.
+
+    Week w covers start + 7w .. start + 7w + 6. daily is sorted once and the week
+    boundaries found with searchsorted; session counts come from cumulative sums.
+    """
+    daily = daily.sort_values("date", kind="stable")
+    dates = pd.to_datetime(daily["date"]).to_numpy(dtype="datetime64[D]")
+    edges = np.datetime64(start, "D") + 7 * np.arange(n_weeks + 1)
+    bounds = np.searchsorted(dates, edges)
+    lo, hi = bounds[:-1], bounds[1:]
+    adherence = daily["adherence"].to_numpy(dtype=float)
+    # mean over the same contiguous values as week_df["adherence"].mean(), so bit-identical
+    adh = [float(adherence[a:b].mean()) if b > a else float(adh_default) for a, b in zip(lo, hi)]
+    cardio = np.concatenate([[0], np.cumsum(daily["active_minutes"].to_numpy() > 35)])
+    strength = np.concatenate([[0], np.cumsum(daily["soreness"].to_numpy() > 3)])
+    return adh, (cardio[hi] - cardio[lo]).tolist(), (strength[hi] - strength[lo]).tolist()
+
+FITNESS_COLUMNS = ["date", "vo2max_est", "5km_time_min", "1rm_deadlift_kg", "1rm_squat_kg", "grip_strength_kg", "fms_score", "spirometry_fev1_L"]
+BODY_COMP_COLUMNS = ["date", "dexa_bodyfat_percent", "dexa_lean_mass_kg", "bone_density_tscore"]
+
+def main(cfg=CFG, data=DATA, prof=None, rules=None, daily=None):
     # load config
-    with open(CFG) as f:
-        prof = yaml.safe_load(f)
-    with open(RULES) as f:
-        rules = yaml.safe_load(f)
-
+    if prof is None:
+        with open(cfg) as f:
+            prof = yaml.safe_load(f)
+    if rules is None:
+        with open(RULES) as f:
+            rules = yaml.safe_load(f)
+
+    # private generator (same stream as random.seed) so run_all.py can run this
+    # step in a thread next to simulate_labs
     seed = int(prof.get("seed", 42))
-    random.seed(seed)
-    np.random.seed(seed)
+    rng = random.Random(seed)
 
     # parse start / end using exact months
     start = pd.to_datetime(str(prof.get("start_date", "2025-01-01"))).date()
@@ -38,20 +63,17 @@ def main():
     end = (pd.Timestamp(start) + relativedelta(months=months)).date() - timedelta(days=1)
 
     # ensure data dir exists
-    os.makedirs(DATA, exist_ok=True)
+    os.makedirs(data, exist_ok=True)
 
     # load daily.csv (expected produced earlier)
-    daily = pd.read_csv(os.path.join(DATA, "daily.csv"))
-    daily["date"] = pd.to_datetime(daily["date"]).dt.date
-
-    # open outputs
-    ffit = open(os.path.join(DATA, "fitness.csv"), "w", newline="")
-    wf = csv.writer(ffit)
-    wf.writerow(["date", "vo2max_est", "5km_time_min", "1rm_deadlift_kg", "1rm_squat_kg", "grip_strength_kg", "fms_score", "spirometry_fev1_L"])
+    if daily is None:
+        daily = pd.read_csv(os.path.join(data, "daily.csv"))
+    n_weeks = (end - start).days // 7 + 1
+    week_adh, week_cardio, week_strength = weekly_rollups(
+        daily, start, n_weeks, prof.get("adherence", {}).get("base", 0.5))
 
-    fbc = open(os.path.join(DATA, "body_comp.csv"), "w", newline="")
-    wb = csv.writer(fbc)
-    wb.writerow(["date", "dexa_bodyfat_percent", "dexa_lean_mass_kg", "bone_density_tscore"])
+    fitness_rows = []
+    body_comp_rows = []
 
     # initial states from profile
     vo2 = float(prof["baselines"].get("vo2max_est", 38.0))
@@ -78,14 +100,12 @@ def main():
     # iterate week-by-week
     while day <= end:
         week_start = day
-        week_end = day + timedelta(days=6)
-        week_df = daily[(daily["date"] >= week_start) & (daily["date"] <= week_end)]
-        adh = float(week_df["adherence"].mean()) if len(week_df) > 0 else float(prof.get("adherence", {}).get("base", 0.5))
+        adh = week_adh[weeks]
 
-        # compute sessions: count days with active_minutes>35 as session days
-        cardio_sessions = int((week_df["active_minutes"] > 35).sum()) if len(week_df) > 0 else 0
+        # sessions: days with active_minutes>35 count as cardio session days,
         # strength proxy: days with soreness>3 (not perfect but simple)
-        strength_sessions = int((week_df["soreness"] > 3).sum()) if len(week_df) > 0 else 0
+        cardio_sessions = week_cardio[weeks]
+        strength_sessions = week_strength[weeks]
 
         # VO2 logic: use rules; vo2_weekly_gain_if_cardio3 may be a range
         vo2_gain_rule = get_section(rules, prof, "fitness", "vo2_weekly_gain_if_cardio3", [0.3, 0.5])
@@ -93,7 +113,7 @@ def main():
         # apply gains or loss
         if cardio_sessions >= 3 and adh > 0.7:
             if isinstance(vo2_gain_rule, (list, tuple)) and len(vo2_gain_rule) == 2:
-                delta = random.uniform(vo2_gain_rule[0], vo2_gain_rule[1])
+                delta = rng.uniform(vo2_gain_rule[0], vo2_gain_rule[1])
             else:
                 delta = float(vo2_gain_rule)
             vo2 += delta
@@ -106,7 +126,7 @@ def main():
         grip_gain_rule = get_section(rules, prof, "fitness", "grip_weekly_gain_if_strength2", [0.2, 0.4])
         if strength_sessions >= 2 and adh > 0.7:
             if isinstance(grip_gain_rule, (list, tuple)) and len(grip_gain_rule) == 2:
-                grip += random.uniform(grip_gain_rule[0], grip_gain_rule[1])
+                grip += rng.uniform(grip_gain_rule[0], grip_gain_rule[1])
             else:
                 grip += float(grip_gain_rule)
         grip = clip(round(grip, 1), grip_min, grip_max)
@@ -121,7 +141,7 @@ def main():
             bf_drop_rule = get_section(rules, prof, "body_comp_monthly", "bodyfat_drop", [0.3, 0.6])
             lean_gain = float(get_section(rules, prof, "body_comp_monthly", "lean_mass_gain", 0.2))
             if isinstance(bf_drop_rule, (list, tuple)) and len(bf_drop_rule) == 2:
-                bodyfat -= random.uniform(bf_drop_rule[0], bf_drop_rule[1]) * adh
+                bodyfat -= rng.uniform(bf_drop_rule[0], bf_drop_rule[1]) * adh
             else:
                 bodyfat -= float(bf_drop_rule) * adh
             lean += lean_gain * adh
@@ -130,7 +150,7 @@ def main():
         if weeks > 0 and weeks % 4 == 0:
             spi_gain_rule = get_section(rules, prof, "fitness", "spirometry_monthly_gain", [0.02, 0.05])
             if isinstance(spi_gain_rule, (list, tuple)) and len(spi_gain_rule) == 2:
-                fev1 += random.uniform(spi_gain_rule[0], spi_gain_rule[1])
+                fev1 += rng.uniform(spi_gain_rule[0], spi_gain_rule[1])
             else:
                 fev1 += float(spi_gain_rule)
 
@@ -150,16 +170,26 @@ def main():
 
         # write week-end row (use week_end date)
         row_date = (week_start + timedelta(days=6)).isoformat()
-        wf.writerow([row_date, vo2, five_k_time, one_rm_dead, one_rm_squat, grip, int(fms), fev1])
-        wb.writerow([row_date, bodyfat, lean, bdt])
+        fitness_rows.append([row_date, vo2, five_k_time, one_rm_dead, one_rm_squat, grip, int(fms), fev1])
+        body_comp_rows.append([row_date, bodyfat, lean, bdt])
 
         # advance one week
         day += timedelta(days=7)
         weeks += 1
 
-    ffit.close()
-    fbc.close()
-    print(f"Wrote fitness.csv and body_comp.csv to {DATA}")
+    frames = []
+    for name, columns, rows in (("fitness.csv", FITNESS_COLUMNS, fitness_rows),
+                                ("body_comp.csv", BODY_COMP_COLUMNS, body_comp_rows)):
+        path = os.path.join(data, name)
+        with open(path, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(columns)
+            w.writerows(rows)
+        frames.append(pd.DataFrame(rows, columns=columns))
+        if WRITE_PARQUET:
+            write_parquet(frames[-1], path)
+    print(f"Wrote fitness.csv and body_comp.csv to {data}")
+    return tuple(frames)
 
 if __name__ == "__main__":
     main()
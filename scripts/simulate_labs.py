@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import pandas as pd
 import numpy as np
+from storage import WRITE_PARQUET, write_parquet
 
 ROOT = os.path.dirname(os.path.dirname(__file__))
 DATA = os.path.join(ROOT, "data")
@@ -29,16 +30,39 @@ def get_bounds(bounds_dict, key, default_lo, default_hi):
     except Exception:
         return default_lo, default_hi
 
-def main():
+def trailing_adherence(daily, qdates, days, adh_default):
+    """Mean adherence over [qdate - days, qdate] for each quarterly date.
+
+    daily is sorted once and each window located with searchsorted instead of
+    filtering the whole frame per date.
+    """
+    daily = daily.sort_values("date", kind="stable")
+    dates = pd.to_datetime(daily["date"]).to_numpy(dtype="datetime64[D]")
+    q = np.array(qdates, dtype="datetime64[D]")
+    lo = np.searchsorted(dates, q - np.timedelta64(days, "D"), side="left")
+    hi = np.searchsorted(dates, q, side="right")
+    adherence = daily["adherence"].to_numpy(dtype=float)
+    return [float(adherence[a:b].mean()) if b > a else float(adh_default) for a, b in zip(lo, hi)]
+
+COLUMNS = ["date","fasting_glucose_mgdl","ogtt_2h_glucose_mgdl","fasting_insulin_uIUml",
+           "total_chol_mgdl","ldl_mgdl","hdl_mgdl","triglycerides_mgdl","apob_mgdl",
+           "apoa1_mgdl","lpa_nmoll","crp_mgL","esr_mmhr","alt_uL","ast_uL","creatinine_mgdl",
+           "egfr_mlmin","tsh_uIUmL","t3_ngdl","t4_ugdl","cortisol_ugdl","vitd_ngml","b12_pgml",
+           "ferritin_ngml","omega3_index_percent"]
+
+def main(cfg=CFG, data=DATA, prof=None, rules=None, daily=None):
     # load config
-    with open(CFG) as f:
-        prof = yaml.safe_load(f)
-    with open(RULES) as f:
-        rules = yaml.safe_load(f)
-
+    if prof is None:
+        with open(cfg) as f:
+            prof = yaml.safe_load(f)
+    if rules is None:
+        with open(RULES) as f:
+            rules = yaml.safe_load(f)
+
+    # private generator (same stream as random.seed) so run_all.py can run this
+    # step in a thread next to simulate_fitness_bodycomp
     seed = int(prof.get("seed", 42))
-    random.seed(seed)
-    np.random.seed(seed)
+    rng = random.Random(seed)
 
     # parse start / end properly (use relativedelta for months)
     start = pd.to_datetime(str(prof.get("start_date", "2025-01-01"))).date()
@@ -69,21 +93,15 @@ def main():
             qdates = [start + timedelta(weeks=4)]  # minimal fallback
 
     # load daily to compute recent adherence windows
-    daily_path = os.path.join(DATA, "daily.csv")
-    if not os.path.exists(daily_path):
-        raise FileNotFoundError(f"{daily_path} not found. Generate daily.csv first.")
-    daily = pd.read_csv(daily_path)
-    daily["date"] = pd.to_datetime(daily["date"]).dt.date
-
-    os.makedirs(DATA, exist_ok=True)
-    out_path = os.path.join(DATA, "labs_quarterly.csv")
-    f = open(out_path, "w", newline="")
-    w = csv.writer(f)
-    w.writerow(["date","fasting_glucose_mgdl","ogtt_2h_glucose_mgdl","fasting_insulin_uIUml",
-                "total_chol_mgdl","ldl_mgdl","hdl_mgdl","triglycerides_mgdl","apob_mgdl",
-                "apoa1_mgdl","lpa_nmoll","crp_mgL","esr_mmhr","alt_uL","ast_uL","creatinine_mgdl",
-                "egfr_mlmin","tsh_uIUmL","t3_ngdl","t4_ugdl","cortisol_ugdl","vitd_ngml","b12_pgml",
-                "ferritin_ngml","omega3_index_percent"])
+    if daily is None:
+        daily_path = os.path.join(data, "daily.csv")
+        if not os.path.exists(daily_path):
+            raise FileNotFoundError(f"{daily_path} not found. Generate daily.csv first.")
+        daily = pd.read_csv(daily_path)
+
+    os.makedirs(data, exist_ok=True)
+    out_path = os.path.join(data, "labs_quarterly.csv")
+    rows = []
 
     # baseline & bounds
     base = prof.get("baselines", {})
@@ -111,12 +129,11 @@ def main():
     # helper: get adherence default from profile (fallback to 0.5)
     adh_default = prof.get("adherence", {}).get("base", 0.5)
 
+    # recent 12 weeks adherence per quarterly date, or fallback
+    window_adh = trailing_adherence(daily, qdates, 84, adh_default)
+
     # iterate each quarterly date and generate labs
-    for qdate in qdates:
-        # use recent 12 weeks adherence or fallback
-        window_start = qdate - timedelta(days=84)
-        dfw = daily[(daily["date"] >= window_start) & (daily["date"] <= qdate)]
-        adh = float(dfw["adherence"].mean()) if len(dfw) > 0 else float(adh_default)
+    for qdate, adh in zip(qdates, window_adh):
 
         # months since baseline
         months_since = max(1, month_diff(start, qdate))
@@ -129,13 +146,11 @@ def main():
         ogtt_drop_range = rules.get("glycemic_monthly", {}).get("ogtt2h_drop_if_good", [2, 6])
         # scale: improvement proportional to adherence and number of quarters passed (months_since/3)
         quarters_passed = max(1, months_since // 3)
-        fpg -= (random.uniform(fpg_drop_range[0], fpg_drop_range[1]) * adh * quarters_passed)
-        ogtt2 -= (random.uniform(ogtt_drop_range[0], ogtt_drop_range[1]) * adh * quarters_passed)
-        # illness spikes: check if any illness in the recent 2-week window
-        recent_events = daily[(daily["date"] >= (qdate - timedelta(days=14))) & (daily["date"] <= qdate)]
-        # we don't have an events file here; if illness is simulated in daily via higher stress/adherence dips, we let noise capture that
-        fpg += random.gauss(0, rules.get("glycemic_monthly", {}).get("noise_std", 0.8))
-        ogtt2 += random.gauss(0, rules.get("glycemic_monthly", {}).get("noise_std", 0.8))
+        fpg -= (rng.uniform(fpg_drop_range[0], fpg_drop_range[1]) * adh * quarters_passed)
+        ogtt2 -= (rng.uniform(ogtt_drop_range[0], ogtt_drop_range[1]) * adh * quarters_passed)
+        # illness spikes: we don't have an events file here; if illness is simulated in daily via higher stress/adherence dips, we let noise capture that
+        fpg += rng.gauss(0, rules.get("glycemic_monthly", {}).get("noise_std", 0.8))
+        ogtt2 += rng.gauss(0, rules.get("glycemic_monthly", {}).get("noise_std", 0.8))
 
         # ---------- Lipids ----------
         ldl = float(base.get("ldl_mgdl", 120.0))
@@ -145,13 +160,13 @@ def main():
         hdl_gain_range = rules.get("lipids_monthly", {}).get("hdl_gain_if_good", [0.5, 1.5])
         tg_drop_range = rules.get("lipids_monthly", {}).get("tg_drop_if_good", [4, 10])
         # scale change by months_since (conservative: per-month change)
-        ldl -= months_since * random.uniform(ldl_drop_range[0], ldl_drop_range[1]) * (adh * 0.33)
-        hdl += months_since * random.uniform(hdl_gain_range[0], hdl_gain_range[1]) * (adh * 0.33)
-        tg -= months_since * random.uniform(tg_drop_range[0], tg_drop_range[1]) * (adh * 0.33)
+        ldl -= months_since * rng.uniform(ldl_drop_range[0], ldl_drop_range[1]) * (adh * 0.33)
+        hdl += months_since * rng.uniform(hdl_gain_range[0], hdl_gain_range[1]) * (adh * 0.33)
+        tg -= months_since * rng.uniform(tg_drop_range[0], tg_drop_range[1]) * (adh * 0.33)
         # noise
-        ldl += random.gauss(0, rules.get("lipids_monthly", {}).get("noise_std", 1.0))
-        hdl += random.gauss(0, rules.get("lipids_monthly", {}).get("noise_std", 1.0))
-        tg += random.gauss(0, rules.get("lipids_monthly", {}).get("noise_std", 1.0))
+        ldl += rng.gauss(0, rules.get("lipids_monthly", {}).get("noise_std", 1.0))
+        hdl += rng.gauss(0, rules.get("lipids_monthly", {}).get("noise_std", 1.0))
+        tg += rng.gauss(0, rules.get("lipids_monthly", {}).get("noise_std", 1.0))
         # total cholesterol approx (Friedewald-ish)
         total = ldl + hdl + tg / 5.0
 
@@ -163,7 +178,7 @@ def main():
         apoa1 += (hdl - float(base.get("hdl_mgdl", hdl))) * 0.8
 
         # ---------- CRP / inflammation ----------
-        crp = float(base.get("crp_mgL", 1.0)) + random.gauss(0, rules.get("inflammation", {}).get("noise_std", 0.1))
+        crp = float(base.get("crp_mgL", 1.0)) + rng.gauss(0, rules.get("inflammation", {}).get("noise_std", 0.1))
         # mean revert toward baseline
         mr = float(rules.get("inflammation", {}).get("mean_revert_rate", 0.05))
         crp = float(crp - (crp - float(base.get("crp_mgL", crp))) * mr)
@@ -209,10 +224,17 @@ def main():
             egfr, tsh, t3, t4, cortisol, vitd, b12,
             ferritin, omega3
         ]
-        w.writerow(row)
+        rows.append(row)
 
-    f.close()
+    with open(out_path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(COLUMNS)
+        w.writerows(rows)
     print(f"Wrote labs to {out_path} for {len(qdates)} quarterly dates: {[d.isoformat() for d in qdates]}")
+    labs = pd.DataFrame(rows, columns=COLUMNS)
+    if WRITE_PARQUET:
+        write_parquet(labs, out_path)
+    return labs
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,14 @@
+"""Dataset storage for the pipeline scripts.
+
+The typed-Parquet helpers live in rag/utils/io.py so the dashboard and the RAG
+ingest read the same files; this module is the one place scripts/ reaches into
+the rag package (the scripts run as plain files, not as package modules).
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.utils.io import WRITE_PARQUET, current_parquet, read_table, write_parquet  # noqa: E402
+
+__all__ = ["WRITE_PARQUET", "current_parquet", "read_table", "write_parquet"]
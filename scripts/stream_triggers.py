@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""Incremental trigger evaluation for newly arriving daily rows.
+
+Same rules.yaml conditions and output as rule_engine.evaluate_triggers, but
+fed one row at a time: each member keeps O(window) state per term (a ring
+buffer for N-day means/drops/stalls, a counter per `for Nd` streak, the latest
+lab values and the previous fired flag for `fire_on: rising`), so the cost of
+a new row does not depend on how much history came before it.
+
+    stream = TriggerStream(rules["triggers"], prof["baselines"], sink=csv_sink("data/interventions.csv"))
+    stream.push_event("2025-03-03", "travel")     # events and labs for a day
+    stream.push_labs({"date": ..., "ldl_mgdl": ...})   # arrive before its daily row
+    stream.push_daily({"date": ..., "rhr_bpm": ..., ...})  # -> fired intervention rows
+
+CLI: replay data/ (--replay, into a fresh interventions_replay.csv) or read
+NDJSON rows from stdin, each with an optional "kind" of daily (default), labs
+or event, and append what fires to interventions.csv.
+"""
+import argparse
+import csv
+import heapq
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rule_engine import COLUMNS, OPS, VALUE, compile_rules
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA = os.path.join(ROOT, "data")
+CFG = os.path.join(ROOT, "config", "profile.yaml")
+RULES = os.path.join(ROOT, "config", "rules.yaml")
+
+WINDOW = re.compile(r"^(?P<col>.+?)_(?:(?P<n>\d+)d_(?P<kind>avg|drop)|stall_(?P<stall>\d+)d)$")
+
+def _lookup(values, name):
+    if name in values:
+        return name
+    matches = [k for k in values if k.startswith(name + "_")]
+    return matches[0] if len(matches) == 1 else None
+
+def _mean(buf):
+    # numpy adds fewer than 8 values in order, so sum() matches the batch engine bit for bit
+    return sum(buf) / len(buf) if len(buf) < 8 else float(np.mean(buf))
+
+def _as_date(d):
+    if isinstance(d, datetime):
+        return d.date()
+    return d if isinstance(d, date) else date.fromisoformat(str(d)[:10])
+
+def csv_sink(path, truncate=False):
+    """Sink that appends fired rows to an interventions CSV.
+
+    The header (COLUMNS, led by member_id when the rows carry one) is written on
+    first write. Rows already in the file (same member_id, date and rule_id) are
+    skipped, so streaming a day twice does not duplicate its interventions;
+    truncate=True starts the file over instead.
+    """
+    if truncate and os.path.exists(path):
+        os.remove(path)
+    state = {"fields": None, "seen": set()}
+
+    def key(r):
+        return (str(r.get("member_id") or ""), str(r["date"]), str(r["rule_id"]))
+
+    def load():
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, newline="") as f:
+                reader = csv.DictReader(f)
+                state["fields"] = reader.fieldnames
+                state["seen"] = {key(r) for r in reader}
+
+    def write(rows):
+        if state["fields"] is None:
+            load()
+        rows = [r for r in rows if key(r) not in state["seen"]]
+        if not rows:
+            return
+        new = state["fields"] is None
+        if new:
+            state["fields"] = (["member_id"] if "member_id" in rows[0] else []) + COLUMNS
+        elif "member_id" in rows[0] and "member_id" not in state["fields"]:
+            raise ValueError(f"{path} has no member_id column; write per-member rows to another --out")
+        with open(path, "a", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=state["fields"], extrasaction="ignore")
+            if new:
+                w.writeheader()
+            w.writerows(rows)
+        state["seen"].update(key(r) for r in rows)
+    return write
+
+class _MemberState:
+    """Per-member O(window) state for every rule."""
+
+    def __init__(self, rules, baselines):
+        self.rules = rules
+        self.baselines = baselines
+        self.buffers = {}
+        self.streaks = {}
+        self.prev = {}
+        self.labs = {}
+        self.events = {}        # day -> event types not yet consumed
+        self.event_days = []    # heap of the days in self.events
+        self.plans = {}
+
+    def _window_term(self, name, kind, n, x):
+        if kind == "stall":
+            buf = self.buffers.setdefault(name, deque(maxlen=n + 1))
+            buf.append(x)
+            return float(buf[-1] >= buf[0]) if len(buf) == n + 1 else None
+        buf = self.buffers.setdefault(name, deque(maxlen=n))
+        if kind == "avg":
+            buf.append(x)
+            return _mean(buf) if len(buf) == n else None
+        prev = _mean(buf) if len(buf) == n else None
+        buf.append(x)
+        return None if prev is None else (prev - x) / max(1e-6, prev)
+
+    def _plan(self, name, row):
+        """How `name` resolves (column, window, event or lab); prefix matching runs once per term."""
+        col = _lookup(row, name)
+        if col is not None:
+            return ("col", col)
+        m = WINDOW.match(name)
+        if m and _lookup(row, m.group("col")) is not None:
+            kind = "stall" if m.group("stall") else m.group("kind")
+            return ("window", _lookup(row, m.group("col")), kind, int(m.group("stall") or m.group("n")))
+        if name.endswith("_week"):
+            return ("event", name[:-len("_week")])
+        if _lookup(self.labs, name) is not None:
+            return ("labs", _lookup(self.labs, name))
+        if not self.labs:
+            return None  # lab term before the first draw
+        raise KeyError(f"Unknown trigger term: {name}")
+
+    def _term(self, name, row, day_events, terms):
+        """Value of `name` for this row; window terms update their buffer exactly once."""
+        if name in terms:
+            return terms[name]
+        plan = self.plans.get(name)
+        if plan is None:
+            plan = self._plan(name, row)
+            if plan is None:
+                return float("nan")
+            self.plans[name] = plan
+        if plan[0] == "col":
+            v = float(row[plan[1]])
+        elif plan[0] == "window":
+            v = self._window_term(name, plan[2], plan[3], float(row[plan[1]]))
+        elif plan[0] == "event":
+            v = float(plan[1] in day_events)
+        else:
+            v = float(self.labs[plan[1]])
+        terms[name] = v
+        return v
+
+    def _value(self, text, row, day_events, terms):
+        m = VALUE.match(text)
+        name = m.group("name")
+        try:
+            v = float(name)
+        except ValueError:
+            if name.endswith("_baseline"):
+                if name not in self.plans:
+                    self.plans[name] = float(self.baselines[_lookup(self.baselines, name[:-len("_baseline")])])
+                v = self.plans[name]
+            else:
+                v = self._term(name, row, day_events, terms)
+        if v is not None and m.group("offset"):
+            off = float(m.group("offset"))
+            v = v + off if m.group("sign") == "+" else v - off
+        return v
+
+    def evaluate(self, source, row, day_events=()):
+        """Fired rows for one daily (or labs) row, in rules.yaml order."""
+        terms = {}
+        out = []
+        for rule in self.rules:
+            if rule["source"] != source:
+                continue
+            fired, valid = False, True
+            # every clause is evaluated (no short-circuit) so buffers and streaks advance each row
+            for gi, group in enumerate(rule["groups"]):
+                ok = True
+                for ci, clause in enumerate(group):
+                    x = self._term(clause["term"], row, day_events, terms)
+                    if x is None:
+                        valid, mask = False, False
+                    elif np.isnan(x):
+                        mask = False
+                    elif clause["op"]:
+                        y = self._value(clause["value"], row, day_events, terms)
+                        mask = y is not None and bool(OPS[clause["op"]](x, y))
+                    else:
+                        mask = x > 0
+                    if clause["mod"] and clause["mod"].startswith("for "):
+                        key = (rule["id"], gi, ci)
+                        self.streaks[key] = self.streaks.get(key, 0) + 1 if mask else 0
+                        mask = self.streaks[key] >= int(clause["mod"][4:-1])
+                    ok = ok and mask
+                fired = fired or ok
+            fired = fired and valid
+            if rule["fire_on"] == "rising":
+                fired, self.prev[rule["id"]] = fired and not self.prev.get(rule["id"], False), fired
+            if fired:
+                d = _as_date(row["date"])
+                value = self._term(rule["metric"], row, day_events, terms)
+                out.append({
+                    "date": d.isoformat(), "rule_id": rule["id"], "trigger_metric": rule["metric"],
+                    "trigger_value": float(np.round(value, 1)), "action": rule["action"],
+                    "owner": rule["owner"],
+                    "follow_up_date": (d + timedelta(days=int(rule.get("followup_days", 0)))).isoformat(),
+                    "notes": rule["notes"]})
+        return out
+
+class TriggerStream:
+    """Evaluates triggers row by row for any number of members."""
+
+    def __init__(self, triggers, baselines, sink=None, default_member="member_1"):
+        self.rules = triggers if triggers and "groups" in triggers[0] else compile_rules(triggers)
+        self.baselines = baselines
+        self.sink = sink
+        self.default_member = default_member
+        self.members = {}
+
+    def _state(self, member_id):
+        if member_id not in self.members:
+            b = self.baselines
+            if isinstance(b, pd.DataFrame):
+                b = b.loc[member_id].to_dict()
+            self.members[member_id] = _MemberState(self.rules, b)
+        return self.members[member_id]
+
+    def _emit(self, row, rows):
+        if "member_id" in row:
+            for r in rows:
+                r["member_id"] = row["member_id"]
+        if rows and self.sink:
+            self.sink(rows)
+        return rows
+
+    def push_event(self, day, event_type, member_id=None):
+        """Register an event (events.csv row) ahead of that day's daily row."""
+        st = self._state(member_id or self.default_member)
+        d = _as_date(day)
+        if d not in st.events:
+            st.events[d] = set()
+            heapq.heappush(st.event_days, d)
+        st.events[d].add(event_type)
+
+    def push_labs(self, row):
+        """Update the latest lab values and evaluate `at quarterly` rules on this draw."""
+        st = self._state(row.get("member_id", self.default_member))
+        st.labs.update({k: v for k, v in row.items() if k not in ("date", "member_id")})
+        return self._emit(row, st.evaluate("labs", row))
+
+    def push_daily(self, row):
+        """Evaluate daily rules on one new day; returns (and sinks) the fired rows."""
+        st = self._state(row.get("member_id", self.default_member))
+        d = _as_date(row["date"])
+        # Pop this day's events and drop days already passed, oldest first
+        day_events = set()
+        while st.event_days and st.event_days[0] <= d:
+            day = heapq.heappop(st.event_days)
+            types = st.events.pop(day)
+            if day == d:
+                day_events = types
+        return self._emit(row, st.evaluate("daily", row, day_events))
+
+def replay(stream, daily, labs=None, events=None):
+    """Feed stored history through `stream`, each member's rows in order.
+
+    Lab draws are pushed just before the first daily row on or after their date,
+    events are registered up front.
+    """
+    pending, fired = {}, []
+    if labs is not None:
+        for r in labs.sort_values("date", kind="stable").to_dict("records"):
+            pending.setdefault(r.get("member_id"), deque()).append(r)
+    if events is not None:
+        for r in events.to_dict("records"):
+            stream.push_event(r["date"], r["event_type"], r.get("member_id"))
+    for row in daily.to_dict("records"):
+        queue = pending.get(row.get("member_id"))
+        d = _as_date(row["date"])
+        while queue and _as_date(queue[0]["date"]) <= d:
+            fired += stream.push_labs(queue.popleft())
+        fired += stream.push_daily(row)
+    return fired
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate triggers incrementally as daily rows arrive")
+    parser.add_argument("--cfg", default=CFG)
+    parser.add_argument("--data", default=DATA)
+    parser.add_argument("--out", help="CSV to append fired interventions to (default: <data>/interventions.csv, "
+                                      "or a fresh <data>/interventions_replay.csv with --replay)")
+    parser.add_argument("--replay", action="store_true", help="stream the stored daily/labs/events history")
+    args = parser.parse_args(argv)
+
+    with open(args.cfg) as f:
+        prof = yaml.safe_load(f)
+    with open(RULES) as f:
+        rules = yaml.safe_load(f)
+    # A replay re-fires the whole history: by default it goes to its own file rather
+    # than next to the batch output in interventions.csv
+    default_out = "interventions_replay.csv" if args.replay else "interventions.csv"
+    out = args.out or os.path.join(args.data, default_out)
+    sink = csv_sink(out, truncate=args.replay and not args.out)
+    stream = TriggerStream(rules["triggers"], prof["baselines"], sink=sink,
+                           default_member=prof.get("member_id", "member_1"))
+
+    if args.replay:
+        daily = pd.read_csv(os.path.join(args.data, "daily.csv"))
+        labs = pd.read_csv(os.path.join(args.data, "labs_quarterly.csv"))
+        events_path = os.path.join(args.data, "events.csv")
+        events = pd.read_csv(events_path) if os.path.exists(events_path) else None
+        t0 = time.perf_counter()
+        fired = replay(stream, daily, labs, events)
+        elapsed = time.perf_counter() - t0
+        print(f"Replayed {len(daily)} days: {len(fired)} interventions written to {out} "
+              f"({elapsed / max(1, len(daily)) * 1e6:.0f} us/row)")
+        return
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        kind = row.pop("kind", "daily")
+        if kind == "event":
+            stream.push_event(row["date"], row["event_type"], row.get("member_id"))
+        elif kind == "labs":
+            stream.push_labs(row)
+        else:
+            stream.push_daily(row)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Ingestion of interventions.csv rows into the Chroma index"""
+import pandas as pd
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("sentence_transformers")
+
+from rag.scripts import ingest_csvs
+
+
+class FakeCollection:
+    """Rejects duplicate ids within one upsert, as Chroma does"""
+
+    def __init__(self):
+        self.ids = []
+
+    def upsert(self, ids, embeddings, metadatas, documents):
+        if len(set(ids)) != len(ids):
+            raise ValueError(f"Expected IDs to be unique, found duplicates in {ids}")
+        self.ids.extend(ids)
+
+
+def test_two_rules_on_one_date_are_both_ingested(monkeypatch):
+    frame = pd.DataFrame([
+        {"date": "2025-01-17", "rule_id": "CV-01", "trigger_metric": "rhr_7d_avg", "trigger_value": 71.4,
+         "action": "deload week", "owner": "coach"},
+        {"date": "2025-01-17", "rule_id": "SL-01", "trigger_metric": "sleep_7d_avg", "trigger_value": 6.1,
+         "action": "sleep hygiene review", "owner": "concierge"},
+    ])
+    docs = [ingest_csvs.process_row(row, "intervention") for _, row in frame.iterrows()]
+
+    collection = FakeCollection()
+    monkeypatch.setattr(ingest_csvs, "collection", collection)
+    monkeypatch.setattr(ingest_csvs, "embed", lambda texts: [[0.0] * 384 for _ in texts])
+    monkeypatch.setattr(ingest_csvs.time, "sleep", lambda seconds: None)
+
+    assert ingest_csvs.upsert_docs(docs)
+    assert collection.ids == ["intervention:2025-01-17:CV-01", "intervention:2025-01-17:SL-01"]